@@ -0,0 +1,167 @@
+#Sudoku Batch
+#Checking puzzles one SudokuBoard at a time is fine for a UI, but far too slow
+#for checking every puzzle of a large corpus.  This file checks a whole batch
+#of grids at once with NumPy: the rows, columns and boxes of every grid are
+#gathered into a single array, sorted, and checked for duplicates without a
+#Python loop per grid (or per square).
+#
+#A batch is an integer array of N grids, either as an (N, 9, 9) array of rows
+#or as an (N, 81) array of values in row order.  Other sizes work the same way
+#(an (N, 16, 16) or (N, 256) array is a batch of 16x16 grids, see
+#SudokuGeometry).  A list of lists (or of bytes) works too, as long as NumPy
+#can turn it into such an array.
+#
+#NumPy is only needed by this file, so it is imported if it is installed.  If
+#it is not, calling any of the functions raises an exception.
+#
+#There are 3 functions you can use:
+#
+#getBatchArray() turns a list of SudokuBoard objects into an (N, numCells)
+#array.
+#
+#isSolvedBatch() returns an array of N bools, True for each grid that is
+#solved (the same as isSolved in SudokuGenerator_5).
+#
+#isValidPuzzleBatch() returns an array of N bools, True for each grid that has
+#no duplicates (the same as isValidPuzzle in SudokuGenerator_5).
+#
+#   values = SudokuBatch.getBatchArray(puzzles)
+#   if not SudokuBatch.isValidPuzzleBatch(values).all():
+#       ...
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from SudokuGeometry import getGeometry, getGeometryOfNumCells
+
+def _requireNumpy(function):
+    '''Raises an exception if NumPy is not installed.'''
+    if numpy == None:
+        raise Exception(f"Sudoku Batch - {function}: NumPy is not installed.")
+
+def _getGrids(grids, function):
+    '''
+    Given:
+    A batch of grids (an (N, size, size) or (N, numCells) integer array).
+    The name of the function that was called (for error messages).
+
+    Returns a tuple of the grids as an (N, size, size) array, and the Geometry
+    of the grids (see SudokuGeometry).
+    '''
+    _requireNumpy(function)
+
+    grids = numpy.asarray(grids)
+    if grids.ndim == 2:
+        numCells = grids.shape[1]
+    elif grids.ndim == 3 and grids.shape[1] == grids.shape[2]:
+        numCells = grids.shape[1] * grids.shape[2]
+    else:
+        raise Exception(f"Sudoku Batch - {function}: expected an (N, size, size) or (N, numCells) array, not {grids.shape}.")
+
+    geometry = getGeometryOfNumCells(numCells)
+    if geometry == None:
+        raise Exception(f"Sudoku Batch - {function}: a grid cannot have {numCells} squares.")
+
+    if grids.dtype.kind not in "iu":
+        raise Exception(f"Sudoku Batch - {function}: expected an integer array, not {grids.dtype}.")
+
+    return grids.reshape(len(grids), geometry.size, geometry.size), geometry
+
+def _getUnits(grids, geometry):
+    '''
+    Given:
+    A batch of grids (an (N, size, size) array).
+    The Geometry of the grids.
+
+    Returns an (N, size * 3, size) array of the values of every unit of every
+    grid.  The units are in the same order as SudokuGeometry.UNITS (the rows,
+    then the columns, then the boxes).
+    '''
+    boxSize = geometry.boxSize
+    size = geometry.size
+
+    #Split each grid into (band, row in band, stack, column in stack), then
+    #bring the 2 box positions next to each other so each box is a single row.
+    boxes = grids.reshape(len(grids), boxSize, boxSize, boxSize, boxSize)
+    boxes = boxes.transpose(0, 1, 3, 2, 4).reshape(len(grids), size, size)
+
+    return numpy.concatenate((grids, grids.transpose(0, 2, 1), boxes), axis = 1)
+
+def _hasDuplicates(units):
+    '''
+    Given:
+    An (N, numUnits, size) array of unit values, where 0 is a blank square.
+
+    Returns an array of N bools, True for each grid where any unit has the
+    same value (other than 0) more than once.
+    '''
+    #Once a unit is sorted, any duplicates are next to each other.
+    units = numpy.sort(units, axis = 2)
+    duplicates = (units[:, :, 1:] == units[:, :, :-1]) & (units[:, :, 1:] != 0)
+    return duplicates.any(axis = (1, 2))
+
+def getBatchArray(puzzles, boxSize = None):
+    '''
+    Given:
+    A list of puzzles (SudokuBoard objects), all of the same size.
+    The number of rows (and columns) of squares in each box of the puzzles
+    (optional).  If it is given, every puzzle must be that size, and an empty
+    list gives an array of that size of puzzle.  An empty list without a
+    boxSize gives an array of 9x9 puzzles.
+
+    Returns an (N, numCells) array of the values of the puzzles (in row
+    order), which can be passed to isSolvedBatch or isValidPuzzleBatch.
+    '''
+    _requireNumpy("getBatchArray")
+
+    if boxSize != None:
+        numCells = getGeometry(boxSize).numCells
+    elif len(puzzles) > 0:
+        numCells = puzzles[0].numCells
+    else:
+        numCells = getGeometry(3).numCells
+
+    for puzzle in puzzles:
+        if puzzle.numCells != numCells:
+            raise Exception(f"Sudoku Batch - getBatchArray: every puzzle must have {numCells} squares, not {puzzle.numCells}.")
+
+    values = b"".join(puzzle.getValues() for puzzle in puzzles)
+    return numpy.frombuffer(values, dtype = numpy.uint8).reshape(len(puzzles), numCells)
+
+def isSolvedBatch(grids):
+    '''
+    Given:
+    A batch of grids (an (N, size, size) or (N, numCells) integer array).
+
+    Returns an array of N bools, True for each grid where every row, column,
+    and box holds the numbers 1 - size (1 - 9 in a 9x9 grid) with no
+    duplicates.
+    '''
+    grids, geometry = _getGrids(grids, "isSolvedBatch")
+
+    #A unit of size squares that only holds the numbers 1 - size, with no
+    #duplicates, must hold each of them exactly once.
+    isInRange = ((grids >= 1) & (grids <= geometry.size)).all(axis = (1, 2))
+    return isInRange & ~_hasDuplicates(_getUnits(grids, geometry))
+
+def isValidPuzzleBatch(grids, blankValue = 0):
+    '''
+    Given:
+    A batch of grids (an (N, size, size) or (N, numCells) integer array).
+    A value for what a blank value in the grids should be (defaults to 0).
+
+    Returns an array of N bools, True for each grid where every square is
+    either blankValue or a number between 1 and size, and there are no
+    duplicates in any of the rows, columns, or boxes.  Ignores blank values.
+    '''
+    grids, geometry = _getGrids(grids, "isValidPuzzleBatch")
+
+    isBlank = grids == blankValue
+    isInRange = (grids >= 1) & (grids <= geometry.size)
+    isAllowed = (isBlank | isInRange).all(axis = (1, 2))
+
+    #Blank squares become 0, so they are never counted as duplicates.
+    grids = numpy.where(isBlank, 0, grids)
+    return isAllowed & ~_hasDuplicates(_getUnits(grids, geometry))
@@ -0,0 +1,368 @@
+#Sudoku Benchmark
+#This file times the parts of the Sudoku files that get called the most, so
+#that a change meant to make something faster can be checked against numbers
+#instead of a feeling.  It covers all 3 versions of the generator:
+#   SudokuGenerator (the class from attempts 3 and 4).
+#   SudokuGenerator_5 (the SudokuBoard version).
+#   Sudoku_Generator_5_0 (the SudokuPuzzle version, which can only validate).
+#
+#There are 4 groups of benchmarks:
+#   "generate" - getHardPuzzle at several numbers of known values, and
+#   getEasyPuzzle.
+#   "solve" - every solver of SudokuGenerator_5 counting the solutions of a set
+#   of well known hard puzzles (HARD_PUZZLES).
+#   "validate" - isSolved, isValidPuzzle and getValidMovesAt (or the closest
+#   function each version has), and the batch functions of SudokuBatch (when
+#   NumPy is installed).
+#   "grade" - gradePuzzle of SudokuGrader on HARD_PUZZLES and on puzzles made
+#   by getHardPuzzle.
+#
+#Every run uses a fixed seed, so running the benchmarks twice does the same
+#work both times.  The results are printed (or saved) as JSON, with the
+#throughput (calls per second) and the 50th, 95th and 99th percentile time of
+#a single call (in milliseconds), so two runs can be compared with any diff
+#tool.  Nothing here needs a network connection.
+#
+#   python SudokuBenchmark.py
+#   python SudokuBenchmark.py --group solve --output before.json
+#   python SudokuBenchmark.py --quick
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import SudokuGenerator
+import SudokuGenerator_5
+import Sudoku_Generator_5_0
+import SudokuDancingLinks
+import SudokuBatch
+import SudokuText
+import SudokuGrader
+from SudokuGeometry import CELL_KEYS
+
+#Well known hard puzzles (0 is blank), each with a single solution.
+HARD_PUZZLES = {
+    "artoInkala": "800000000003600000070090200050007000000045700000100030001000068008500010090000400",
+    "aiEscargot": "100007090030020008009600500005300900010080002600004000300000010040000007007000300",
+    "goldenNugget": "000000039000001005003050800008090006070002000100400000009080050020000600400700000",
+    "easterMonster": "100000002090400050006000700050903000000070000000850040700000600030009080002000001",
+    "platinumBlonde": "000000012000000003002300400001800005060070800000009000008500000900040500470006000",
+}
+
+#The seed of the first run of every benchmark.  Run i uses BASE_SEED + i.
+BASE_SEED = 1
+
+#The numbers of known values getHardPuzzle is timed at.  The class in
+#SudokuGenerator gets much slower with fewer known values, so it stops at 25.
+#At 22 getHardPuzzle often has to start again from a new solution (see
+#maxAttempts), and some puzzles still end up without a single solution, so
+#its times there include the extra attempts.
+HARD_KNOWN_VALUES = (40, 30, 25, 22)
+LEGACY_HARD_KNOWN_VALUES = (40, 30, 25)
+EASY_KNOWN_VALUES = 30
+
+#The longest a single solver is given to count the solutions of a puzzle.
+SOLVER_MAX_DURATION = 30
+
+#The number of grids in each call to the batch functions of SudokuBatch.
+BATCH_SIZE = 1000
+
+#The numbers of known values of the generated puzzles that are graded.  Only
+#puzzles with a single solution can be graded, so these must stay high enough
+#for getHardPuzzle to reliably make one (see requireUnique).
+GRADE_KNOWN_VALUES = (30, 25)
+
+def _getPercentile(sortedTimes, percent):
+    '''
+    Given:
+    A sorted list of times.
+    A percent (0 - 100).
+
+    Returns the time that percent of the times are less than or equal to
+    (the nearest rank method, so the result is always one of the times).
+    '''
+    rank = max(1, -(-len(sortedTimes) * percent // 100))
+    return sortedTimes[rank - 1]
+
+def _benchmark(module, name, params, runs, function):
+    '''
+    Given:
+    The name of the module being timed.
+    The name of the benchmark.
+    A dictionary of the parameters of the benchmark (to tell results apart).
+    The number of times to call the function.
+    A function that takes in the number of the run (0 - runs-1).  If it
+    returns a string (such as a search status), the strings are counted.
+
+    Calls the function runs times, timing each call.
+
+    Returns a dictionary of the results.
+    '''
+    times = []
+    statuses = {}
+    for i in range(runs):
+        start = time.perf_counter_ns()
+        result = function(i)
+        times.append(time.perf_counter_ns() - start)
+        if type(result) is str:
+            statuses[result] = statuses.get(result, 0) + 1
+
+    totalSeconds = sum(times) / 1e9
+    times.sort()
+    result = {
+        "module": module,
+        "name": name,
+        "params": params,
+        "runs": runs,
+        "totalSeconds": round(totalSeconds, 6),
+        "throughput": round(runs / totalSeconds, 3) if totalSeconds > 0 else None,
+        "minMs": round(times[0] / 1e6, 6),
+        "p50Ms": round(_getPercentile(times, 50) / 1e6, 6),
+        "p95Ms": round(_getPercentile(times, 95) / 1e6, 6),
+        "p99Ms": round(_getPercentile(times, 99) / 1e6, 6),
+        "maxMs": round(times[-1] / 1e6, 6),
+    }
+    if len(statuses) > 0:
+        result["statuses"] = statuses
+
+    return result
+
+def _getBoard(puzzleString):
+    '''Returns a SudokuBoard (see SudokuGenerator_5) of a puzzle written as a
+    string of 81 digits in row order.'''
+    return SudokuText.fromString(puzzleString)
+
+def _getSudokuPuzzle(board):
+    '''Returns a SudokuPuzzle (see Sudoku_Generator_5_0) with the same values
+    as a SudokuBoard.'''
+    puzzle = Sudoku_Generator_5_0.SudokuPuzzle()
+    for key in CELL_KEYS:
+        puzzle.setValue(key, board.getValue(key))
+    return puzzle
+
+def _getLegacyPuzzle(board):
+    '''Returns the list of lists (see SudokuGenerator) with the same values as
+    a SudokuBoard.'''
+    return [list(row) for row in board.rows]
+
+def benchmarkGenerate(runs):
+    '''
+    Given:
+    The number of puzzles to generate for each benchmark.
+
+    Times getHardPuzzle and getEasyPuzzle of SudokuGenerator_5, and the same
+    functions of the SudokuGenerator class.  (Those of Sudoku_Generator_5_0
+    were never written, so there is nothing to time.)
+
+    Returns a list of results.
+    '''
+    results = []
+    for numKnownValues in HARD_KNOWN_VALUES:
+        for solver in SudokuGenerator_5.SOLVERS:
+            results.append(_benchmark("SudokuGenerator_5", "getHardPuzzle",
+                                      {"numKnownValues": numKnownValues, "solver": solver}, runs,
+                                      lambda i: SudokuGenerator_5.getHardPuzzle(numKnownValues, solver = solver,
+                                                                                seed = BASE_SEED + i)))
+
+    results.append(_benchmark("SudokuGenerator_5", "getEasyPuzzle", {"numKnownValues": EASY_KNOWN_VALUES}, runs,
+                              lambda i: SudokuGenerator_5.getEasyPuzzle(EASY_KNOWN_VALUES, seed = BASE_SEED + i)))
+
+    for numKnownValues in LEGACY_HARD_KNOWN_VALUES:
+        results.append(_benchmark("SudokuGenerator", "getHardPuzzle", {"numKnownValues": numKnownValues}, runs,
+                                  lambda i: SudokuGenerator.SudokuGenerator(BASE_SEED + i).getHardPuzzle(numKnownValues)))
+
+    results.append(_benchmark("SudokuGenerator", "getEasyPuzzle", {"numKnownValues": EASY_KNOWN_VALUES}, runs,
+                              lambda i: SudokuGenerator.SudokuGenerator(BASE_SEED + i).getEasyPuzzle(EASY_KNOWN_VALUES)))
+
+    return results
+
+def benchmarkSolve(runs):
+    '''
+    Given:
+    The number of times to solve each puzzle with each solver.
+
+    Times every solver of SudokuGenerator_5 counting the solutions (up to 2,
+    the same as a uniqueness check of getHardPuzzle) of each of the
+    HARD_PUZZLES.  The status of each search is counted, so a solver that
+    runs out of time shows up in the results.
+
+    Returns a list of results.
+    '''
+    results = []
+    for puzzleName, puzzleString in HARD_PUZZLES.items():
+        board = _getBoard(puzzleString)
+        for solver, (getPuzzle, getNumSolutions) in SudokuGenerator_5.SOLVERS.items():
+            def run(i):
+                budget = SudokuGenerator_5.SearchBudget(SOLVER_MAX_DURATION)
+                return getNumSolutions(board.getCopy(), 0, budget, [0], 2, SudokuGenerator_5._getRandom(BASE_SEED + i))
+
+            results.append(_benchmark("SudokuGenerator_5", "countSolutions",
+                                      {"puzzle": puzzleName, "solver": solver}, runs, run))
+
+    return results
+
+def benchmarkValidate(runs):
+    '''
+    Given:
+    The number of times to call each function.
+
+    Times isSolved on a solved puzzle, isValidPuzzle on an unsolved puzzle,
+    and getValidMovesAt on every square of the unsolved puzzle (one square per
+    call) for each version of the generator.  Where a version has no such
+    function, the closest one is timed instead:
+        SudokuGenerator has no isValidPuzzle, so _isCurrentPuzzleValid is used,
+        and it has no getValidMovesAt, so isValueInRowOrColumn and
+        getValuesInBoxAt are used to find the valid values.
+        Sudoku_Generator_5_0 has no getValidMovesAt, so isValidMove is called
+        for each value 1 - 9.
+    When NumPy is installed, isSolvedBatch and isValidPuzzleBatch of
+    SudokuBatch are also timed, each checking BATCH_SIZE copies of the puzzle
+    per call.
+
+    Returns a list of results.
+    '''
+    puzzle = _getBoard(HARD_PUZZLES["artoInkala"])
+    solved = SudokuDancingLinks.getDLXSolutions(puzzle)[0]
+
+    results = []
+
+    #SudokuGenerator_5
+    params = {"puzzle": "artoInkala"}
+    results.append(_benchmark("SudokuGenerator_5", "isSolved", params, runs,
+                              lambda i: SudokuGenerator_5.isSolved(solved)))
+    results.append(_benchmark("SudokuGenerator_5", "isValidPuzzle", params, runs,
+                              lambda i: SudokuGenerator_5.isValidPuzzle(puzzle)))
+    results.append(_benchmark("SudokuGenerator_5", "getValidMovesAt", params, runs,
+                              lambda i: SudokuGenerator_5.getValidMovesAt(puzzle, *CELL_KEYS[i % 81])))
+
+    #Sudoku_Generator_5_0
+    oldSolved = _getSudokuPuzzle(solved)
+    oldPuzzle = _getSudokuPuzzle(puzzle)
+    oldGenerator = Sudoku_Generator_5_0.SudokuGenerator
+    results.append(_benchmark("Sudoku_Generator_5_0", "isSolved", params, runs,
+                              lambda i: oldGenerator.isSolved(oldSolved)))
+    results.append(_benchmark("Sudoku_Generator_5_0", "isValidPuzzle", params, runs,
+                              lambda i: oldGenerator.isValidPuzzle(oldPuzzle)))
+    results.append(_benchmark("Sudoku_Generator_5_0", "getValidMovesAt", params, runs,
+                              lambda i: [value for value in range(1, 10)
+                                         if oldGenerator.isValidMove(oldPuzzle, *CELL_KEYS[i % 81], value)]))
+
+    #SudokuGenerator
+    legacySolved = _getLegacyPuzzle(solved)
+    legacyPuzzle = _getLegacyPuzzle(puzzle)
+    legacyGenerator = SudokuGenerator.SudokuGenerator(BASE_SEED)
+
+    def getLegacyValidMovesAt(i):
+        row, column = CELL_KEYS[i % 81]
+        boxValues = legacyGenerator.getValuesInBoxAt(row, column, legacyPuzzle)
+        return [value for value in range(1, 10)
+                if value not in boxValues and not legacyGenerator.isValueInRowOrColumn(value, row, column, legacyPuzzle)]
+
+    results.append(_benchmark("SudokuGenerator", "isSolved", params, runs,
+                              lambda i: legacyGenerator.isSolved(legacySolved)))
+    results.append(_benchmark("SudokuGenerator", "isValidPuzzle", params, runs,
+                              lambda i: legacyGenerator._isCurrentPuzzleValid(legacyPuzzle)))
+    results.append(_benchmark("SudokuGenerator", "getValidMovesAt", params, runs, getLegacyValidMovesAt))
+
+    #SudokuBatch (each call checks BATCH_SIZE grids)
+    if SudokuBatch.numpy != None:
+        batchParams = {"puzzle": "artoInkala", "batchSize": BATCH_SIZE}
+        solvedBatch = SudokuBatch.getBatchArray([solved] * BATCH_SIZE)
+        puzzleBatch = SudokuBatch.getBatchArray([puzzle] * BATCH_SIZE)
+        results.append(_benchmark("SudokuBatch", "isSolvedBatch", batchParams, runs,
+                                  lambda i: SudokuBatch.isSolvedBatch(solvedBatch)))
+        results.append(_benchmark("SudokuBatch", "isValidPuzzleBatch", batchParams, runs,
+                                  lambda i: SudokuBatch.isValidPuzzleBatch(puzzleBatch)))
+
+    return results
+
+def benchmarkGrade(runs):
+    '''
+    Given:
+    The number of times to grade each puzzle.
+
+    Times gradePuzzle (without a cache) on each of the HARD_PUZZLES, and on a
+    different puzzle made by getHardPuzzle for every run at each of
+    GRADE_KNOWN_VALUES.  The hardest technique of each grade is counted, the
+    same way as the status of a search.
+
+    Returns a list of results.
+    '''
+    results = []
+    for puzzleName, puzzleString in HARD_PUZZLES.items():
+        board = _getBoard(puzzleString)
+        results.append(_benchmark("SudokuGrader", "gradePuzzle", {"puzzle": puzzleName}, runs,
+                                  lambda i: SudokuGrader.gradePuzzle(board).hardestTechnique))
+
+    for numKnownValues in GRADE_KNOWN_VALUES:
+        puzzles = [SudokuGenerator_5.getHardPuzzle(numKnownValues, seed = BASE_SEED + i, requireUnique = True)[1]
+                   for i in range(runs)]
+        results.append(_benchmark("SudokuGrader", "gradePuzzle", {"numKnownValues": numKnownValues}, runs,
+                                  lambda i: SudokuGrader.gradePuzzle(puzzles[i]).hardestTechnique))
+
+    return results
+
+#The groups of benchmarks, and the default number of runs of each.
+GROUPS = {
+    "generate": (benchmarkGenerate, 20),
+    "solve": (benchmarkSolve, 5),
+    "validate": (benchmarkValidate, 2000),
+    "grade": (benchmarkGrade, 50),
+}
+
+def runBenchmarks(groups = None, runs = None):
+    '''
+    Given:
+    A list of the names of the groups to run (defaults to all of GROUPS).
+    The number of runs of every benchmark (defaults to the number of each
+    group in GROUPS).
+
+    Returns a dictionary with details of the Python being used, and a list of
+    the results of every benchmark.
+    '''
+    if groups == None:
+        groups = list(GROUPS)
+
+    results = []
+    for group in groups:
+        if group not in GROUPS:
+            raise Exception(f"Sudoku Benchmark - runBenchmarks: unknown group ({group}).")
+
+        function, defaultRuns = GROUPS[group]
+        for result in function(defaultRuns if runs == None else runs):
+            result["group"] = group
+            results.append(result)
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "seed": BASE_SEED,
+        "results": results,
+    }
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Time the Sudoku generators, solvers and validators.")
+    parser.add_argument("--group", action = "append", choices = list(GROUPS),
+                        help = "a group of benchmarks to run (can be given more than once, defaults to all)")
+    parser.add_argument("--runs", type = int, help = "the number of runs of every benchmark")
+    parser.add_argument("--quick", action = "store_true", help = "use very few runs, to check that everything works")
+    parser.add_argument("--output", help = "a file to save the JSON results to (defaults to printing them)")
+    options = parser.parse_args(arguments)
+
+    runs = options.runs
+    if options.quick and runs == None:
+        runs = 2
+
+    report = runBenchmarks(options.group, runs)
+    text = json.dumps(report, indent = 2)
+    if options.output == None:
+        print(text)
+    else:
+        with open(options.output, "w") as file:
+            file.write(text + "\n")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
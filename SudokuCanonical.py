@@ -0,0 +1,248 @@
+#Sudoku Canonical
+#Many different looking puzzles are really the same puzzle.  Relabelling the
+#digits, shuffling the rows inside a band (a set of 3 rows of boxes), shuffling
+#the columns inside a stack (a set of 3 columns of boxes), shuffling the bands,
+#shuffling the stacks, or transposing the grid never changes how a puzzle is
+#solved (see transformPuzzle in SudokuGenerator_5).  This file finds one
+#representative (the canonical form) of every group of puzzles that are the
+#same in this way, so that equivalent puzzles can be found and removed, or
+#used as a single key for a cache.
+#
+#The canonical form is the version of the puzzle whose values, read box by box
+#(and row by row inside each box), are the smallest, where the digits are
+#relabelled in the order they first appear.  Squares that do not hold a value
+#between 1 and 9 are treated as blank and are 0 in the canonical form.
+#
+#The functions in this file take in SudokuBoard objects (see SudokuGenerator_5),
+#but only use the boxSize, getValues, getCopy and setValue functions of the
+#board.  Only 9x9 puzzles have a canonical form here.  Giving any other size
+#of puzzle raises an exception.
+#
+#There are 4 functions you can use:
+#
+#canonicalize() returns a copy of a puzzle in its canonical form.
+#
+#getCanonicalKey() returns the canonical form of a puzzle as 81 bytes, which
+#can be used as a dictionary key.
+#
+#getCanonicalHash() returns a short hash (a hex string) of the canonical form.
+#
+#getUniquePuzzles() removes equivalent puzzles from a list of puzzles.
+
+import hashlib
+from itertools import permutations
+
+from SudokuGeometry import CELL_KEYS
+
+#The 6 orders of the 3 rows in a band (or the 3 columns in a stack).
+_LINE_ORDERS = tuple(permutations(range(3)))
+
+#The boxes in the order their values are read, as (band, stack) positions.
+_BOX_ORDER = tuple((box // 3, box % 3) for box in range(9))
+
+def _requireNineByNine(puzzle, function):
+    '''Raises an exception if the puzzle is not a 9x9 puzzle.'''
+    if puzzle.boxSize != 3:
+        raise Exception(f"Sudoku Canonical - {function}: only 9x9 puzzles have a canonical form (boxSize {puzzle.boxSize}).")
+
+def _getOptions(order, position):
+    '''
+    Given:
+    A list of the 9 rows (or columns) chosen so far, where -1 is a row that
+    has not been chosen yet.
+    The position (0 - 2) of a band (or stack).
+
+    Returns a list of every way to fill in the rows of the band at that
+    position.  If they are already chosen, the list only has the given order
+    in it.
+    '''
+    if order[position * 3] != -1:
+        return [order]
+
+    #The bands that have already been used somewhere else.
+    usedBands = {order[i * 3] // 3 for i in range(3) if order[i * 3] != -1}
+
+    options = []
+    for band in range(3):
+        if band in usedBands:
+            continue
+
+        for lines in _LINE_ORDERS:
+            option = order[:]
+            for i in range(3):
+                option[position * 3 + i] = band * 3 + lines[i]
+            options.append(option)
+
+    return options
+
+def _getSignature(grid, rowOrder, columnOrder, labels):
+    '''
+    Given:
+    A candidate of the search in _getCanonicalValues.
+
+    Returns a tuple of every value of the candidate's grid, relabelled, with the
+    chosen rows and columns in their chosen positions followed by the rows and
+    columns that have not been chosen yet (in their original order).  Digits
+    that have not been relabelled yet are given the label 10 + digit.  Two
+    candidates with the same signature will always read the same values from
+    here on, so only one of them needs to be kept.
+    '''
+    rows = [row for row in rowOrder if row != -1]
+    rows += [row for row in range(9) if row not in rows]
+    columns = [column for column in columnOrder if column != -1]
+    columns += [column for column in range(9) if column not in columns]
+
+    names = [0] + [labels[value] if labels[value] != 0 else 10 + value for value in range(1, 10)]
+    return tuple(names[grid[row * 9 + column]] for row in rows for column in columns)
+
+def _getCanonicalValues(values):
+    '''
+    Given:
+    The 81 values of a puzzle (in row order).
+
+    Searches every transformation of the puzzle one box at a time.  Each time
+    a box is reached, every way of choosing its band and stack (if they have
+    not already been chosen) is tried, and only the choices that give the
+    smallest values for the box are kept.  Almost every choice is thrown away
+    within the first 2 boxes, so only a tiny part of the 3,359,232 ways to
+    move the squares is ever looked at.
+
+    Puzzles with very few values (or a lot of symmetry) can have thousands of
+    choices that tie box after box, but they are mostly the same puzzle
+    reached in different ways.  From the second box on, candidates with the
+    same signature (see _getSignature) are merged.
+
+    Returns a list of the 81 values of the canonical form (in row order).
+    '''
+    #Anything that is not a digit is blank.
+    values = [value if 1 <= value <= 9 else 0 for value in values]
+    transposed = [values[column * 9 + row] for row, column in CELL_KEYS]
+
+    #Each candidate is (grid, rowOrder, columnOrder, labels, nextLabel), where
+    #row i of the transformed grid is row rowOrder[i] of grid, and labels[v]
+    #is the new label of the value v (0 if it has not been seen yet).
+    candidates = [(grid, [-1] * 9, [-1] * 9, [0] * 10, 1) for grid in (values, transposed)]
+
+    #The canonical values, in the order they are read.
+    result = []
+    for band, stack in _BOX_ORDER:
+        best = None
+        survivors = []
+        for grid, rowOrder, columnOrder, labels, nextLabel in candidates:
+            for newRowOrder in _getOptions(rowOrder, band):
+                rows = newRowOrder[band * 3:band * 3 + 3]
+                for newColumnOrder in _getOptions(columnOrder, stack):
+                    columns = newColumnOrder[stack * 3:stack * 3 + 3]
+
+                    #Read the values of the box, relabelling new digits as we
+                    #go.  Stop as soon as the box is bigger than the best one.
+                    newLabels = labels[:]
+                    newNextLabel = nextLabel
+                    boxValues = []
+                    isSmaller = best == None
+                    for row in rows:
+                        for column in columns:
+                            value = grid[row * 9 + column]
+                            if value != 0:
+                                if newLabels[value] == 0:
+                                    newLabels[value] = newNextLabel
+                                    newNextLabel += 1
+                                value = newLabels[value]
+
+                            if not isSmaller:
+                                bestValue = best[len(boxValues)]
+                                if value > bestValue:
+                                    break
+                                if value < bestValue:
+                                    isSmaller = True
+                            boxValues.append(value)
+                        else:
+                            continue
+                        break
+                    else:
+                        candidate = (grid, newRowOrder, newColumnOrder, newLabels, newNextLabel)
+                        if isSmaller:
+                            best = boxValues
+                            survivors = [candidate]
+                        else:
+                            survivors.append(candidate)
+
+        #Merge the candidates that will always read the same values.
+        if len(survivors) > 1 and len(result) > 0:
+            merged = {}
+            for candidate in survivors:
+                merged.setdefault(_getSignature(*candidate[:4]), candidate)
+            survivors = list(merged.values())
+
+        candidates = survivors
+        result += best
+
+    #Put the values back into row order.
+    canonical = [0] * 81
+    for box in range(9):
+        band, stack = _BOX_ORDER[box]
+        for i in range(9):
+            canonical[(band * 3 + i // 3) * 9 + stack * 3 + i % 3] = result[box * 9 + i]
+
+    return canonical
+
+def canonicalize(puzzle):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+
+    Returns a copy of the puzzle in its canonical form (a SudokuBoard object).
+    Two puzzles have the same canonical form only if one can be transformed
+    into the other.  The puzzle is not changed.
+    '''
+    _requireNineByNine(puzzle, "canonicalize")
+
+    canonical = puzzle.getCopy()
+    values = _getCanonicalValues(puzzle.getValues())
+    for i in range(81):
+        canonical.setValue(CELL_KEYS[i], values[i])
+
+    return canonical
+
+def getCanonicalKey(puzzle):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+
+    Returns the 81 values of the canonical form of the puzzle (in row order) as
+    a bytes object, which can be used as a dictionary or set key.
+    '''
+    _requireNineByNine(puzzle, "getCanonicalKey")
+
+    return bytes(_getCanonicalValues(puzzle.getValues()))
+
+def getCanonicalHash(puzzle, digestSize = 16):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The number of bytes in the hash (defaults to 16).
+
+    Returns a hash of the canonical form of the puzzle as a hex string (twice
+    as many characters as digestSize).
+    '''
+    return hashlib.blake2b(getCanonicalKey(puzzle), digest_size=digestSize).hexdigest()
+
+def getUniquePuzzles(puzzles):
+    '''
+    Given:
+    A list of 9x9 puzzles (SudokuBoard objects).
+
+    Returns a list of the puzzles with every puzzle that is equivalent to an
+    earlier puzzle in the list removed.
+    '''
+    seen = set()
+    uniquePuzzles = []
+    for puzzle in puzzles:
+        key = getCanonicalKey(puzzle)
+        if key in seen:
+            continue
+
+        seen.add(key)
+        uniquePuzzles.append(puzzle)
+
+    return uniquePuzzles
@@ -0,0 +1,311 @@
+#Sudoku Corpus
+#A corpus is a file holding a large number of puzzles (and their solutions) in
+#a compact binary format.  Every puzzle takes up the same number of bytes, so
+#the i-th puzzle can be found straight away without reading the puzzles before
+#it, and the reader memory maps the file so that only the pages that are used
+#are ever read from disk.
+#
+#The file starts with a header:
+#   4 bytes: the letters "SDKC".
+#   1 byte: the version of the format (FORMAT_VERSION).
+#   1 byte: the boxSize of the puzzles (3 for 9x9 puzzles, see SudokuGeometry).
+#   1 byte: the blank value of the unsolved puzzles.
+#   1 byte: unused (always 0).
+#   4 bytes: the length of the parameters (little endian).
+#   The parameters the puzzles were generated with, as UTF-8 JSON (for example
+#   {"numKnownValues": 25, "difficulty": "hard", "seed": 1}).
+#
+#Then each puzzle is a record of:
+#   The solved puzzle, with each value stored as value - 1 in the fewest bits
+#   that can hold size - 1 (4 bits for 9x9 and 16x16 puzzles, 5 for 25x25).
+#   Square 0 is in the lowest bits.  This is 41 bytes for a 9x9 puzzle.
+#   The clue mask, with 1 bit per square (square 0 in the lowest bit) that is
+#   set if the square is known in the unsolved puzzle.  This is 11 bytes for a
+#   9x9 puzzle.
+#A 9x9 puzzle takes 52 bytes, compared to about 400 bytes of text for
+#getPuzzleAsString.
+#
+#   with CorpusWriter("hard25.sdk", numKnownValues = 25, seed = 1) as writer:
+#       for solvedPuzzle, puzzle in generatePuzzles(1000000, 25, seed = 1):
+#           writer.add(solvedPuzzle, puzzle)
+#
+#   with CorpusReader("hard25.sdk") as reader:
+#       solvedPuzzle, puzzle = reader[123456]
+
+import json
+import mmap
+import struct
+
+from SudokuGenerator_5 import SudokuBoard
+from SudokuGeometry import getGeometry
+
+#The letters every corpus file starts with.
+MAGIC = b"SDKC"
+
+#The version of the format written by CorpusWriter.
+FORMAT_VERSION = 1
+
+#The fixed part of the header (before the parameters).
+_HEADER = struct.Struct("<4sBBBxI")
+
+def _getRecordLayout(geometry):
+    '''
+    Given:
+    The Geometry of the puzzles (see SudokuGeometry).
+
+    Returns a tuple of (the number of bits per value, the number of bytes of
+    the solved puzzle, the number of bytes of the clue mask).
+    '''
+    bitsPerValue = (geometry.size - 1).bit_length()
+    return bitsPerValue, (geometry.numCells * bitsPerValue + 7) // 8, (geometry.numCells + 7) // 8
+
+
+class CorpusWriter:
+    '''Writes puzzles to a new corpus file, one record at a time.'''
+
+    def __init__(self, path, boxSize = 3, blankValue = 0, **params):
+        '''
+        Given:
+        The path of the file to write (any existing file is replaced).
+        The number of rows (and columns) of squares in each box of the puzzles
+        (defaults to 3, for 9x9 puzzles).
+        The value of the unsolved squares in the puzzles (defaults to 0).
+        The parameters the puzzles were generated with (optional, anything
+        that can be written as JSON).
+
+        Creates the file and writes its header.
+        '''
+        self.__geometry = getGeometry(boxSize)
+        if type(blankValue) is not int or blankValue < 0 or blankValue > 255 or blankValue in self.__geometry.valueBits:
+            raise Exception(f"Sudoku Corpus - CorpusWriter: blankValue must be between 0 and 255, and not between 1 and {self.__geometry.size} ({blankValue}).")
+
+        try:
+            paramBytes = json.dumps(params, sort_keys = True).encode("utf-8")
+        except TypeError as e:
+            raise Exception(f"Sudoku Corpus - CorpusWriter: the parameters cannot be written as JSON ({e}).")
+
+        self.__blankValue = blankValue
+        self.__bitsPerValue, self.__solutionSize, self.__maskSize = _getRecordLayout(self.__geometry)
+        self.__count = 0
+
+        self.__file = open(path, "wb")
+        self.__file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, boxSize, blankValue, len(paramBytes)))
+        self.__file.write(paramBytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.__count
+
+    def add(self, solvedPuzzle, puzzle):
+        '''
+        Given:
+        A solved puzzle (a SudokuBoard object).
+        The unsolved puzzle made from it (a SudokuBoard object), where every
+        square is either the blank value of the corpus or the value of the
+        solved puzzle.
+
+        Adds the puzzle to the end of the file.
+        '''
+        if solvedPuzzle.numCells != self.__geometry.numCells or puzzle.numCells != self.__geometry.numCells:
+            raise Exception(f"Sudoku Corpus - add: the puzzles must have {self.__geometry.numCells} squares.")
+
+        if not solvedPuzzle.isComplete():
+            raise Exception("Sudoku Corpus - add: the solved puzzle is not solved.")
+
+        solution = solvedPuzzle.getValues()
+        values = puzzle.getValues()
+
+        #Build both parts of the record as a single integer each, starting
+        #from the last square so that square 0 ends up in the lowest bits.
+        packed = 0
+        clues = 0
+        for i in range(len(solution) - 1, -1, -1):
+            packed = (packed << self.__bitsPerValue) | (solution[i] - 1)
+            clues <<= 1
+            if values[i] == solution[i]:
+                clues |= 1
+            elif values[i] != self.__blankValue:
+                raise Exception(f"Sudoku Corpus - add: square {i} of the puzzle is neither blank nor the value of the solved puzzle.")
+
+        self.__file.write(packed.to_bytes(self.__solutionSize, "little") + clues.to_bytes(self.__maskSize, "little"))
+        self.__count += 1
+
+    def addAll(self, puzzles):
+        '''
+        Given:
+        An iterable of (solvedPuzzle, puzzle) pairs, such as the one returned
+        by generatePuzzles in SudokuGenerator_5.
+
+        Adds every puzzle to the end of the file.
+
+        Returns the number of puzzles added.
+        '''
+        count = 0
+        for solvedPuzzle, puzzle in puzzles:
+            self.add(solvedPuzzle, puzzle)
+            count += 1
+        return count
+
+    def close(self):
+        '''Finishes writing the file.'''
+        self.__file.close()
+
+
+class CorpusReader:
+    '''Reads puzzles from a corpus file by their position in the file.  The
+    file is memory mapped, so opening it does not read the puzzles, and
+    getting a puzzle only reads its own record.'''
+
+    def __init__(self, path):
+        '''
+        Given:
+        The path of the file to read.
+
+        Opens the file and reads its header.
+        '''
+        self.__file = open(path, "rb")
+        try:
+            self.__data = mmap.mmap(self.__file.fileno(), 0, access = mmap.ACCESS_READ)
+        except ValueError:
+            #An empty file cannot be memory mapped.
+            self.__file.close()
+            raise Exception(f"Sudoku Corpus - CorpusReader: {path} is not a corpus file.")
+
+        try:
+            self.__readHeader(path)
+        except Exception:
+            self.close()
+            raise
+
+    def __readHeader(self, path):
+        '''Reads the header of the file, and works out where the records are.'''
+        if len(self.__data) < _HEADER.size:
+            raise Exception(f"Sudoku Corpus - CorpusReader: {path} is not a corpus file.")
+
+        magic, version, boxSize, self.__blankValue, paramsLength = _HEADER.unpack_from(self.__data)
+        if magic != MAGIC:
+            raise Exception(f"Sudoku Corpus - CorpusReader: {path} is not a corpus file.")
+        if version != FORMAT_VERSION:
+            raise Exception(f"Sudoku Corpus - CorpusReader: {path} is version {version}, only version {FORMAT_VERSION} can be read.")
+
+        self.__offset = _HEADER.size + paramsLength
+        if self.__offset > len(self.__data):
+            raise Exception(f"Sudoku Corpus - CorpusReader: {path} is not a corpus file.")
+
+        #A boxSize that no puzzle can have, or parameters that are not a JSON
+        #object, mean the file is damaged (or was never a corpus).
+        try:
+            self.__geometry = getGeometry(boxSize)
+            self.__params = json.loads(self.__data[_HEADER.size:self.__offset].decode("utf-8"))
+        except Exception:
+            raise Exception(f"Sudoku Corpus - CorpusReader: {path} is not a corpus file.")
+        if not isinstance(self.__params, dict):
+            raise Exception(f"Sudoku Corpus - CorpusReader: {path} is not a corpus file.")
+
+        self.__bitsPerValue, self.__solutionSize, maskSize = _getRecordLayout(self.__geometry)
+        self.__recordSize = self.__solutionSize + maskSize
+
+        numBytes = len(self.__data) - self.__offset
+        if numBytes < 0 or numBytes % self.__recordSize != 0:
+            raise Exception(f"Sudoku Corpus - CorpusReader: {path} ends part way through a puzzle.")
+        self.__count = numBytes // self.__recordSize
+
+        #The position of the bits of each square in the solved puzzle.
+        self.__shifts = tuple(i * self.__bitsPerValue for i in range(self.__geometry.numCells))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.__count
+
+    def __getitem__(self, index):
+        '''Returns the solved and unsolved puzzle at the index (see
+        getPuzzle).'''
+        return self.getPuzzle(index)
+
+    def __iter__(self):
+        for index in range(self.__count):
+            yield self.getPuzzle(index)
+
+    @property
+    def boxSize(self):
+        return self.__geometry.boxSize
+
+    @property
+    def blankValue(self):
+        return self.__blankValue
+
+    @property
+    def params(self):
+        return dict(self.__params)
+
+    def getValues(self, index):
+        '''
+        Given:
+        The position of a puzzle in the file (negative positions count back
+        from the end).
+
+        Returns a tuple of the values (in row order, as bytes) of the solved
+        puzzle and of the unsolved puzzle, without building SudokuBoard
+        objects.
+        '''
+        if index < 0:
+            index += self.__count
+        if index < 0 or index >= self.__count:
+            raise IndexError(f"Sudoku Corpus - getValues: there is no puzzle {index} (the corpus has {self.__count}).")
+
+        start = self.__offset + index * self.__recordSize
+        middle = start + self.__solutionSize
+        packed = int.from_bytes(self.__data[start:middle], "little")
+        clues = int.from_bytes(self.__data[middle:start + self.__recordSize], "little")
+
+        valueMask = (1 << self.__bitsPerValue) - 1
+        solution = bytes([((packed >> shift) & valueMask) + 1 for shift in self.__shifts])
+        blankValue = self.__blankValue
+        values = bytes([solution[i] if (clues >> i) & 1 else blankValue for i in range(len(solution))])
+        return solution, values
+
+    def getPuzzle(self, index):
+        '''
+        Given:
+        The position of a puzzle in the file (negative positions count back
+        from the end).
+
+        Returns both the solved puzzle, as well as an unsolved puzzle (both as
+        a Sudoku Board object).
+        '''
+        solution, values = self.getValues(index)
+        boxSize = self.__geometry.boxSize
+        return SudokuBoard(values = solution, boxSize = boxSize), SudokuBoard(values = values, boxSize = boxSize)
+
+    def close(self):
+        '''Closes the file.  No more puzzles can be read after this.'''
+        self.__data.close()
+        self.__file.close()
+
+def writeCorpus(path, puzzles, boxSize = 3, blankValue = 0, **params):
+    '''
+    Given:
+    The path of the file to write (any existing file is replaced).
+    An iterable of (solvedPuzzle, puzzle) pairs, such as the one returned by
+    generatePuzzles in SudokuGenerator_5.
+    The number of rows (and columns) of squares in each box of the puzzles
+    (defaults to 3, for 9x9 puzzles).
+    The value of the unsolved squares in the puzzles (defaults to 0).
+    The parameters the puzzles were generated with (optional).
+
+    Writes every puzzle to a new corpus file.
+
+    Returns the number of puzzles written.
+    '''
+    with CorpusWriter(path, boxSize, blankValue, **params) as writer:
+        return writer.addAll(puzzles)
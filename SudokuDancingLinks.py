@@ -0,0 +1,417 @@
+#Sudoku Dancing Links
+#This file contains a second, completely separate way of solving a Sudoku
+#puzzle.  Instead of trying values square by square, the puzzle is turned into
+#an exact cover problem and solved with Donald Knuth's Algorithm X, using his
+#"dancing links" trick to quickly remove and restore rows and columns of the
+#exact cover matrix.
+#
+#The exact cover matrix of a 9x9 Sudoku puzzle has 324 columns (constraints)
+#and 729 rows (every value 1 - 9 in every square).  Each row covers 4 columns:
+#   Column 0 - 80: the square has a value.
+#   Column 81 - 161: the row of the square has the value.
+#   Column 162 - 242: the column of the square has the value.
+#   Column 243 - 323: the 3x3 box of the square has the value.
+#A solution is a set of rows that covers every column exactly once.  Larger
+#(or smaller) grids work the same way, with 4 columns per square and a row for
+#every value in every square (see SudokuGeometry).
+#
+#The functions in this file take in and return SudokuBoard objects (see
+#SudokuGenerator_5), but only use the getValues, getCopy and setValue
+#functions of the board.  The size of the grid is worked out from the number of
+#values of the board.
+#
+#There are 2 functions you can use:
+#
+#getDLXSolutions() returns a list of solved copies of a puzzle (up to a given
+#number of solutions).
+#
+#getDLXNumSolutions() returns the number of solutions of a puzzle (up to a
+#given number of solutions) without building the solved boards.
+
+import random
+import time
+
+from SudokuGeometry import getGeometryOfNumCells
+
+#How many nodes of the search are visited between checks of the clock.
+TIME_CHECK_INTERVAL = 256
+
+def _buildMatrix(geometry):
+    '''
+    Given:
+    The Geometry of the grid (see SudokuGeometry).
+
+    Builds the full exact cover matrix of an empty puzzle as a set of lists,
+    where each node of the matrix is an index into the lists.  Node 0 is the
+    root, nodes 1 - 324 (in a 9x9 grid) are the column headers, and every row
+    of the matrix is 4 nodes after that.
+
+    Returns a tuple of (left, right, up, down, column, size, rowOf, rowStarts)
+    lists.
+    '''
+    numCells = geometry.numCells
+    gridSize = geometry.size
+    numHeaders = numCells * 4 + 1
+    #The links of the root and the column headers.  Every header starts out
+    #linked to itself vertically, and to its neighbours horizontally.
+    left = [(i - 1) % numHeaders for i in range(numHeaders)]
+    right = [(i + 1) % numHeaders for i in range(numHeaders)]
+    up = list(range(numHeaders))
+    down = list(range(numHeaders))
+    column = list(range(numHeaders))
+    #The number of nodes in each column.
+    size = [0] * numHeaders
+    #The matrix row (square * size + value - 1) that each node belongs to.
+    rowOf = [-1] * numHeaders
+    #The first node of each matrix row.
+    rowStarts = []
+
+    for square in range(numCells):
+        row, col = geometry.cellKeys[square]
+        for digit in range(gridSize):
+            columns = (square, numCells + row * gridSize + digit, numCells * 2 + col * gridSize + digit,
+                       numCells * 3 + geometry.cellBox[square] * gridSize + digit)
+            first = len(left)
+            rowStarts.append(first)
+            for k in range(4):
+                header = columns[k] + 1
+                node = first + k
+
+                #Add the node to the bottom of its column.
+                up.append(up[header])
+                down.append(header)
+                down[up[header]] = node
+                up[header] = node
+                column.append(header)
+                size[header] += 1
+                rowOf.append(square * gridSize + digit)
+
+                #Link the 4 nodes of the row into a circle.
+                left.append(first + (k - 1) % 4)
+                right.append(first + (k + 1) % 4)
+
+    return left, right, up, down, column, size, rowOf, rowStarts
+
+#The matrix of an empty puzzle is the same every time, so it is built once for
+#each size of grid (the first time it is needed) and copied for each puzzle
+#that is solved.
+_MATRICES = {}
+
+def _getMatrix(geometry):
+    '''
+    Given:
+    The Geometry of the grid (see SudokuGeometry).
+
+    Returns the matrix of an empty puzzle (see _buildMatrix).
+    '''
+    matrix = _MATRICES.get(geometry.boxSize)
+    if matrix == None:
+        matrix = _buildMatrix(geometry)
+        _MATRICES[geometry.boxSize] = matrix
+
+    return matrix
+
+
+class _DancingLinks:
+    '''The exact cover matrix of a single puzzle, along with the state of the
+    search through it.'''
+
+    def __init__(self, values, blankValue, maxSolutions, maxTime, shuffle, rng):
+        '''
+        Given:
+        The values of a puzzle (in row order).
+        The value of the unsolved squares in the puzzle.
+        The maximum number of solutions to look for.
+        A maximum number of seconds since the epoch, or a search budget (an
+        object with a tick function, such as the SearchBudget of
+        SudokuGenerator_5), or None for no limit.
+        If the rows of each column should be tried in a random order.
+        The random number generator to shuffle the rows with.
+
+        Copies the matrix of an empty puzzle and covers the rows of every known
+        value of the puzzle.
+        '''
+        self.geometry = getGeometryOfNumCells(len(values))
+        if self.geometry == None:
+            raise Exception(f"Sudoku Dancing Links - a puzzle cannot have {len(values)} squares.")
+        left, right, up, down, self.column, size, self.rowOf, rowStarts = _getMatrix(self.geometry)
+
+        #The links that change during the search are copied.  The column and
+        #row of each node never change, so those lists are shared.
+        self.left = left[:]
+        self.right = right[:]
+        self.up = up[:]
+        self.down = down[:]
+        self.size = size[:]
+
+        self.maxSolutions = maxSolutions
+        self.maxTime = maxTime
+        #A search budget counts the nodes itself, otherwise we check the clock
+        #every so often.
+        self.tick = None
+        if hasattr(maxTime, "tick"):
+            self.tick = maxTime.tick
+        elif maxTime != None:
+            self.tick = self._tickClock
+        self.shuffle = shuffle
+        self.rng = rng
+        self.numNodes = 0
+        self.isOutOfTime = False
+        #The matrix rows chosen so far, and the rows of each solution found.
+        self.chosenRows = []
+        self.solutions = []
+        #False if the known values of the puzzle break the rules.
+        self.isConsistent = True
+
+        gridSize = self.geometry.size
+        for square in range(self.geometry.numCells):
+            value = values[square]
+            if value == blankValue:
+                continue
+
+            #A value that is not 1 - size can never be part of a solution.
+            if type(value) is not int or value < 1 or value > gridSize:
+                self.isConsistent = False
+                return
+
+            #If any column of the value's row has already been covered, then
+            #another known value breaks the same rule.
+            start = rowStarts[square * gridSize + value - 1]
+            for node in range(start, start + 4):
+                header = self.column[node]
+                if self.right[self.left[header]] != header:
+                    self.isConsistent = False
+                    return
+
+            for node in range(start, start + 4):
+                self._cover(self.column[node])
+
+    def _tickClock(self):
+        '''Counts 1 node of the search, checking the clock every
+        TIME_CHECK_INTERVAL nodes.  Returns True if we are out of time.'''
+        self.numNodes += 1
+        return self.numNodes % TIME_CHECK_INTERVAL == 0 and time.time() >= self.maxTime
+
+    def _cover(self, header):
+        '''Removes a column, and every row that has a node in the column, from
+        the matrix.'''
+        left = self.left
+        right = self.right
+        up = self.up
+        down = self.down
+        size = self.size
+        column = self.column
+
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+
+        i = down[header]
+        while i != header:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, header):
+        '''Puts back a column (and its rows) removed by _cover.  Columns must
+        be uncovered in the reverse order they were covered.'''
+        left = self.left
+        right = self.right
+        up = self.up
+        down = self.down
+        size = self.size
+        column = self.column
+
+        i = up[header]
+        while i != header:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+
+        right[left[header]] = header
+        left[right[header]] = header
+
+    def search(self):
+        '''
+        Searches for solutions using Algorithm X.  Each solution found is added
+        to the list of solutions.
+
+        The search does not use recursion, so it works for any size of grid.
+        Instead, a trail keeps a [column, rows left to try, row being tried]
+        entry for every column that has been covered.  Each step covers the
+        column with the fewest rows left.  When a column has no rows left, or
+        a solution has been found, the search backtracks by giving the column
+        at the top of the trail its next row, uncovering columns that have no
+        rows left.  Each step is a node of the search.
+
+        Returns True if the search stopped early (maxSolutions were found or we
+        ran out of time), otherwise False.
+        '''
+        left = self.left
+        right = self.right
+        down = self.down
+        column = self.column
+        size = self.size
+
+        trail = []
+        stoppedEarly = False
+        while True:
+            #Count the node against the time limit (or search budget).
+            if self.tick != None and self.tick():
+                self.isOutOfTime = True
+                stoppedEarly = True
+                break
+
+            if right[0] == 0:
+                #If every column is covered, the chosen rows are a solution.
+                self.solutions.append(self.chosenRows[:])
+                if len(self.solutions) >= self.maxSolutions:
+                    stoppedEarly = True
+                    break
+            else:
+                #Choose the column with the fewest rows left.
+                header = right[0]
+                bestHeader = header
+                bestSize = size[header]
+                while header != 0 and bestSize > 1:
+                    if size[header] < bestSize:
+                        bestHeader = header
+                        bestSize = size[header]
+                    header = right[header]
+
+                #A column that no row can cover is a dead end, so it is not
+                #added to the trail.
+                if bestSize != 0:
+                    self._cover(bestHeader)
+
+                    rows = []
+                    node = down[bestHeader]
+                    while node != bestHeader:
+                        rows.append(node)
+                        node = down[node]
+                    if self.shuffle:
+                        self.rng.shuffle(rows)
+
+                    #Rows are taken from the end of the list.
+                    rows.reverse()
+                    trail.append([bestHeader, rows, None])
+
+            #Give the column at the top of the trail its next row, backtracking
+            #past any columns that have run out of rows.
+            while len(trail) > 0:
+                entry = trail[-1]
+                self._unchooseRow(entry[2])
+
+                if len(entry[1]) > 0:
+                    #Choose the row, covering the rest of its columns.
+                    node = entry[1].pop()
+                    entry[2] = node
+                    self.chosenRows.append(self.rowOf[node])
+                    j = right[node]
+                    while j != node:
+                        self._cover(column[j])
+                        j = right[j]
+                    break
+
+                self._uncover(entry[0])
+                trail.pop()
+            else:
+                #The trail is empty, so every possibility has been tried.
+                break
+
+        #Put the matrix back the way it was, in the reverse order it was
+        #changed.
+        while len(trail) > 0:
+            header, rows, node = trail.pop()
+            self._unchooseRow(node)
+            self._uncover(header)
+
+        return stoppedEarly
+
+    def _unchooseRow(self, node):
+        '''Unchooses the row of a node chosen by search (if it is not None),
+        uncovering its columns in the reverse order they were covered.'''
+        if node == None:
+            return
+
+        left = self.left
+        column = self.column
+        j = left[node]
+        while j != node:
+            self._uncover(column[j])
+            j = left[j]
+        self.chosenRows.pop()
+
+def _search(puzzle, blankValue, maxSolutions, maxTime, shuffle, rng):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle.
+    The maximum number of solutions to look for.
+    A maximum number of seconds since the epoch, or a search budget, or None
+    for no limit.
+    If the rows of each column should be tried in a random order.
+    The random number generator to shuffle the rows with.
+
+    Returns the _DancingLinks object after searching it.
+    '''
+    links = _DancingLinks(puzzle.getValues(), blankValue, maxSolutions, maxTime, shuffle, rng)
+    if links.isConsistent and maxSolutions > 0:
+        links.search()
+    return links
+
+def getDLXSolutions(puzzle, blankValue = 0, maxSolutions = 1, maxTime = None, shuffle = False, rng = random):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle (defaults to 0).
+    The maximum number of solutions to look for (defaults to 1).
+    A maximum number of seconds since the epoch, or a search budget (an
+    object with a tick function that is called once per node, and returns
+    True when the search has to stop) (defaults to no limit).
+    If the solutions should be searched for in a random order (defaults to
+    False).
+    The random number generator to shuffle with (defaults to the random
+    module).
+
+    Solves the puzzle using dancing links.  The puzzle is not changed.
+
+    Returns a list of solved copies of the puzzle (SudokuBoard objects).  The
+    list is empty if the puzzle has no solution (or none was found in time).
+    '''
+    links = _search(puzzle, blankValue, maxSolutions, maxTime, shuffle, rng)
+
+    gridSize = links.geometry.size
+    cellKeys = links.geometry.cellKeys
+    solutions = []
+    for rows in links.solutions:
+        solution = puzzle.getCopy()
+        for row in rows:
+            solution.setValue(cellKeys[row // gridSize], row % gridSize + 1)
+        solutions.append(solution)
+
+    return solutions
+
+def getDLXNumSolutions(puzzle, blankValue = 0, maxSolutions = 2, maxTime = None):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle (defaults to 0).
+    The maximum number of solutions to look for (defaults to 2).
+    A maximum number of seconds since the epoch, or a search budget (an
+    object with a tick function that is called once per node, and returns
+    True when the search has to stop) (defaults to no limit).
+
+    Counts the solutions of the puzzle using dancing links, stopping once
+    maxSolutions have been found.  The puzzle is not changed.
+
+    Returns the number of solutions found.
+    '''
+    return len(_search(puzzle, blankValue, maxSolutions, maxTime, False, None).solutions)
@@ -38,7 +38,11 @@
 #       returned.
 #
 #   __init__() - sets up the generator's private and protected fields.  This is
-#       called automatically when you create an instance of the class.
+#       called automatically when you create an instance of the class.  The
+#       puzzles are 9x9 unless a different boxSize is given (2 for 4x4
+#       puzzles, 4 for 16x16 puzzles, 5 for 25x25 puzzles and so on).  Large
+#       puzzles with few known values can take a long time to generate with
+#       this class, SudokuGenerator_5 is a lot faster for those.
 #
 #   __str__() - attempts to return getPuzzleAsString().  If for some reason the
 #       puzzle cannot be represented as a string, an error message is instead
@@ -52,15 +56,37 @@
 #Definitly need to import random.  We will be using this a lot.
 import random
 
+#The tables describing which squares are in which row, column and box are
+#built once for each size of puzzle and shared (see SudokuGeometry).
+from SudokuGeometry import SYMMETRY_GROUPS, getGeometry
+
 #This class contains 2 ways to generate a valid sudoku puzzle, as well as a
 #number of functions that are used both to help create the puzzle and that
 #could be used to help validate a puzzle that is unrelated to what this class
 #generates.
 class SudokuGenerator:
 
-    def __init__(self):
-        '''The constructor of the class.  You do not need to manually call
-        this, and this takes in no parameters.'''
+    def __init__(self, seed = None, boxSize = 3):
+        '''The constructor of the class.  Takes in an optional seed (or a
+        random.Random object) for the random numbers, so that the same seed
+        always generates the same puzzles.  Without a seed the random module
+        itself is used.
+        Also takes in the number of rows (and columns) of squares in each box
+        of the puzzles (defaults to 3, for 9x9 puzzles).  Everything below that
+        talks about 9x9 puzzles and 3x3 boxes works the same way for other
+        sizes.'''
+        #The tables of the size of puzzle we are making (see SudokuGeometry).
+        self._geometry = getGeometry(boxSize)
+        self._boxSize = boxSize
+        self._size = self._geometry.size
+
+        if seed == None:
+            self._random = random
+        elif isinstance(seed, random.Random):
+            self._random = seed
+        else:
+            self._random = random.Random(seed)
+
         self._emptyMap = None
         self._puzzleMap = None
         self._puzzle = None
@@ -68,18 +94,26 @@ class SudokuGenerator:
         self.__maxCounter = 1
         self.__maxAttempts = 3
 
-    def getHardPuzzle(self, startingSolvedMoves):
+    def getHardPuzzle(self, startingSolvedMoves, symmetry = None):
         '''Given a number of moves that are known at the start of the puzzle,
-        generate a 9x9 valid sudoku puzzle.  The puzzle is returned as a list
-        of lists with values between 0 and 9.  Values of 0 are considered to be
-        unknown values.
+        generate a 9x9 (or the size given to the constructor) valid sudoku
+        puzzle.  The puzzle is returned as a list of lists with values between
+        0 and 9.  Values of 0 are considered to be unknown values.
 
         The amount of time taken to generate a puzzle is related to how small
         the number of starting solved moves is.  Lower numbers take longer to
         generate a puzzle, and the puzzle may have multiple solutions.
 
         Puzzles with around 30 starting solved moves usually have a unique
-        solution.'''
+        solution.
+
+        If a symmetry is given (one of the keys of
+        SudokuGeometry.SYMMETRY_GROUPS), values are removed in whole groups of
+        squares that mirror or rotate onto each other, so the known values
+        have a symmetric layout.'''
+
+        if symmetry != None and symmetry not in SYMMETRY_GROUPS:
+            raise Exception(f"Unknown symmetry ({symmetry}).")
 
         #If startingSolvedMoves is less than 0 set it to 0 as there is no way
         #to generate a puzzle with less than 0 starting solved moves.
@@ -90,7 +124,7 @@ class SudokuGenerator:
             self._emptyMap = self._generateEmptyMap()
             self._puzzleMap = self._recursivePuzzleGenerator(self._copyPuzzle(self._emptyMap))
             #self._puzzle = self._generateUniqueSolvablePuzzle(self._copyPuzzle(self._puzzleMap), startingSolvedMoves)
-            self._puzzle, numSolvedMoves = self._generateUniqueSolvablePuzzle(self._copyPuzzle(self._puzzleMap), startingSolvedMoves)
+            self._puzzle, numSolvedMoves = self._generateUniqueSolvablePuzzle(self._copyPuzzle(self._puzzleMap), startingSolvedMoves, symmetry)
 
             #At this point we have a uniquely solvable puzzle.  However, we may
             #not have a puzzle with the number of starting moves that we want.
@@ -98,7 +132,7 @@ class SudokuGenerator:
             #randomly remove numbers until we have the given starting number of
             #moves.
             if numSolvedMoves != startingSolvedMoves:
-                self._puzzle = self._generateSolvablePuzzle(self._puzzle, startingSolvedMoves)
+                self._puzzle = self._generateSolvablePuzzle(self._puzzle, startingSolvedMoves, symmetry)
 
             #Make sure that both the starting solved puzzle, and the current
             #unsolved puzzle are both valid.  If they are, return the unsolved
@@ -138,10 +172,10 @@ class SudokuGenerator:
         try:
             #If the puzzle is valid, then make sure that all values are between
             #1 and 9.  If they are, then the puzzle is solved.
-            if self._isCurrentPuzzleValid(puzzleMap):
-                for i in range(9):
-                    for j in range(9):
-                        if puzzleMap[i][j] < 1 or puzzleMap[i][j] > 9:
+            if self._isCurrentPuzzleValid(puzzle):
+                for i in range(self._size):
+                    for j in range(self._size):
+                        if puzzle[i][j] < 1 or puzzle[i][j] > self._size:
                             return False
                 #If the above does not cause False to be returned, then the
                 #puzzle is solved with valid entries, so return True.
@@ -154,23 +188,19 @@ class SudokuGenerator:
 
     def getPuzzleAsString(self):
         '''Returns a human readable string of the current puzzle.'''
-        returnString = ""
         if self._puzzle == None:
             return "A Sudoku puzzle has not yet been generated."
 
+        #Build the format of each row (with a "|" between each box), then join
+        #the formatted rows together rather than adding to a string one value
+        #at a time.
+        lines = []
         for i in range(len(self._puzzle)):
-            if i > 0 and i % 3 == 0:
-                returnString += "\n\n"
-            else:
-                returnString += "\n"
+            rowFormat = "".join(f"{'|':2} {{:2}} " if j > 0 and j % self._boxSize == 0 else "{:2} "
+                                for j in range(len(self._puzzle[i])))
+            lines.append(("\n\n" if i > 0 and i % self._boxSize == 0 else "\n") + rowFormat.format(*self._puzzle[i]))
 
-            for j in range(len(self._puzzle[i])):
-                if j > 0 and j % 3 == 0:
-                    returnString += f"{'|':2} "
-
-                returnString += f"{self._puzzle[i][j]:2} "
-
-        return f"{returnString}\n"
+        return "".join(lines) + "\n"
 
     def isValueInRowOrColumn(self, value, row, column, puzzle):
         '''Given a value, a row number, a column number, and a puzzle, checks
@@ -180,7 +210,7 @@ class SudokuGenerator:
 
         #Check if the value already exists in a given row and or column.  If it
         #does already exist, return True.  Otherwise, return false.
-        for i in range(9):
+        for i in range(self._size):
             if puzzle[row][i] == value or puzzle[i][column] == value:
                 return True
 
@@ -197,8 +227,8 @@ class SudokuGenerator:
 
         #Check if a given puzzle has any values in it that are 0.  If it does,
         #return False, otherwise return True.
-        for i in range(9):
-            for j in range(9):
+        for i in range(self._size):
+            for j in range(self._size):
                 if puzzle[i][j] == 0:
                     return False
 
@@ -210,20 +240,9 @@ class SudokuGenerator:
         a 9x9 grid made up of 3x3 grids.  This function finds the 3x3 box and
         returns a list of values that are in that 3x3 box.'''
 
-        #First we need to figure out which box we are in.
-        currentBox = self._getBox(row, column, puzzleMap)
-
-        #Next we want a list of all values that are in the currentBox.
-        values = []
-        for i in range(9):
-            for j in range(9):
-                lookBox = self._getBox(i, j, puzzleMap)
-                #If the boxes are the same, add the value we are looking at, to
-                #the list to be returned.
-                if lookBox == currentBox:
-                    values.append(puzzleMap[i][j])
-
-        return values
+        #First we need to figure out which box we are in, then we can get the
+        #values of all of the squares in that box.
+        return self._getValuesInBox(self._getBox(row, column, puzzleMap), puzzleMap)
 
     def __str__(self):
         '''Attempts to return a formated string version of what the puzzle
@@ -242,9 +261,9 @@ class SudokuGenerator:
         #We want to generate a list that can hold data in a 9x9 grid, so we will
         #use a double for loop to create a 9x9 list.
         puzzleMap = []
-        for i in range(9):
+        for i in range(self._size):
             puzzleMap.append([])
-            for j in range(9):
+            for j in range(self._size):
                 puzzleMap[i].append(defaultValue)
 
         return puzzleMap
@@ -272,25 +291,26 @@ class SudokuGenerator:
         #First, we are going to generate the top most row of the puzzle with non
         #repeating random numbers between 1 and 9.
         previousRow = []
-        while len(previousRow) != 9:
-            ranNum = random.randint(1,9)
+        while len(previousRow) != self._size:
+            ranNum = self._random.randint(1, self._size)
             if ranNum not in previousRow:
                 previousRow.append(ranNum)
 
         #Next, we are going to set the top row of the puzzle map to these randomly
         #generated values.
-        for i in range(9):
+        for i in range(self._size):
             startingGrid[0][i] = previousRow[i]
 
         #Now to fill in the next 8 rows, we will shift the position of our starting
         #9 numbers by an amount into a new list.  The amount we shift the items is:
         #3, 3, 1, 3, 3, 1, 3, 3.
         #So for the second row, the number at index 0 will be moved to index 3, and
-        #the number at index 8 will be moved to index 2.
-        for i in range(8):
+        #the number at index 8 will be moved to index 2.  (For other sizes of
+        #puzzle the shift is the boxSize, and 1 at the start of each band.)
+        for i in range(self._size - 1):
             #Determin how much to shift the numbers by.
-            shift = 3
-            if i == 2 or i == 5:
+            shift = self._boxSize
+            if (i + 1) % self._boxSize == 0:
                 shift = 1
 
             #Create a new list for the currentRow, and move the items from the
@@ -299,7 +319,7 @@ class SudokuGenerator:
             for j in range(len(previousRow)):
                 index = j + shift
                 if index >= len(previousRow):
-                    index -= 9
+                    index -= self._size
 
                 currentRow.append(previousRow[index])
 
@@ -328,31 +348,26 @@ class SudokuGenerator:
         #make the pattern harder if not impossible to see, while keeping the
         #puzzle solvable.
         
-        randRow = random.randint(0, 2)
+        #(In general, a random band other than the first is swapped with the
+        #band above it.)
+        boxSize = self._boxSize
+        randRow = self._random.randint(0, boxSize - 1)
                 
-        if randRow == 1:
-            for i in range(0, 3):
-                duplicatePuzzleMap[i] = startingGrid[i + 3]
-                duplicatePuzzleMap[i + 3] = startingGrid[i]
-        elif randRow == 2:
-            for i in range(3, 6):
-                duplicatePuzzleMap[i] = startingGrid[i + 3]
-                duplicatePuzzleMap[i + 3] = startingGrid[i]
+        if randRow > 0:
+            for i in range((randRow - 1) * boxSize, randRow * boxSize):
+                duplicatePuzzleMap[i] = startingGrid[i + boxSize]
+                duplicatePuzzleMap[i + boxSize] = startingGrid[i]
 
         #Validate that the puzzle is still solvable.
         if not self._isCurrentPuzzleValid(duplicatePuzzleMap):            
             raise Exception(f"Invalid Puzzle!\n{self.getPuzzleAsString()}")
         
         
-        randColumn = random.randint(0, 2)
-        if randColumn == 1:
-            for i in range(0, 3):
-                duplicatePuzzleMap[i][0] = startingGrid[i + 3][0]
-                duplicatePuzzleMap[i + 3][0] = startingGrid[i][0]
-        elif randColumn == 2:
-            for i in range(3, 6):
-                duplicatePuzzleMap[i][0] = startingGrid[i + 3][0]
-                duplicatePuzzleMap[i + 3][0] = startingGrid[i][0]
+        randColumn = self._random.randint(0, boxSize - 1)
+        if randColumn > 0:
+            for i in range((randColumn - 1) * boxSize, randColumn * boxSize):
+                duplicatePuzzleMap[i][0] = startingGrid[i + boxSize][0]
+                duplicatePuzzleMap[i + boxSize][0] = startingGrid[i][0]
 
         #Validate that the puzzle is still solvable.
         if not self._isCurrentPuzzleValid(duplicatePuzzleMap):
@@ -360,12 +375,14 @@ class SudokuGenerator:
         
         return duplicatePuzzleMap
 
-    def _generateSolvablePuzzle(self, puzzleMap, startingMoves = 17):
+    def _generateSolvablePuzzle(self, puzzleMap, startingMoves = 17, symmetry = None):
         '''Given a fully solved (or completed) puzzle, remove values from the
         puzzle until we are left with a puzzle that only has the given number
         of starting moves left (all other values in the puzzle will be set to
         0).  This function does not make sure that the puzzle only has a sinle
         solution.
+        If a symmetry is given, whole symmetry groups are removed while they
+        fit, and any values left over are removed one at a time.
         Returns a puzzle (list of lists) that follows the rules of a sudoku
         puzzle and is possible to be solved.'''
 
@@ -377,16 +394,33 @@ class SudokuGenerator:
         solvablePuzzle = self._copyPuzzle(puzzleMap)
 
         #Find out how many values have already been removed from the puzzle.
-        solvedMoves = 81
-        for i in range(9):
-            for j in range(9):
+        solvedMoves = self._geometry.numCells
+        for i in range(self._size):
+            for j in range(self._size):
                 if puzzleMap[i][j] == 0:
                     solvedMoves -= 1
+
+        #Remove whole symmetry groups that have not been removed yet, as long
+        #as they do not take us past the number of starting moves.
+        if symmetry != None:
+            groups = list(self._geometry.symmetryGroups[symmetry])
+            self._random.shuffle(groups)
+            for group in groups:
+                if solvedMoves - len(group) < startingMoves:
+                    continue
+
+                squares = [self._geometry.cellKeys[i] for i in group]
+                if any(solvablePuzzle[row][column] == 0 for row, column in squares):
+                    continue
+
+                for row, column in squares:
+                    solvablePuzzle[row][column] = 0
+                solvedMoves -= len(group)
                 
-        while solvedMoves != startingMoves:
+        while solvedMoves > startingMoves:
             #Remove a random value that we have no already removed.
-            ranRow = random.randint(0,8)
-            ranColumn = random.randint(0,8)
+            ranRow = self._random.randint(0, self._size - 1)
+            ranColumn = self._random.randint(0, self._size - 1)
 
             if solvablePuzzle[ranRow][ranColumn] == 0:
                 continue
@@ -415,22 +449,22 @@ class SudokuGenerator:
         if type(currentMap) is not list:
             return False
 
-        if len(currentMap) != 9:
+        if len(currentMap) != self._size:
             return False
 
-        for i in range(9):
+        for i in range(self._size):
             if type(currentMap[i]) is not list:
                 return False
 
-            if len(currentMap[i]) != 9:
+            if len(currentMap[i]) != self._size:
                 return False            
             
 
         #Check if any of the rows or columns have duplicate numbers.  If any value
         #is 0, skip it as 0 is the default value.
-        for i in range(9):
+        for i in range(self._size):
             duplicates = []
-            for j in range(9):
+            for j in range(self._size):
                 if currentMap[i][j] == 0:
                     continue
                     
@@ -446,8 +480,8 @@ class SudokuGenerator:
         #ignoring 0).  To start we want to create a list of all of the boxes, so
         #that we can iterate over them.
         boxes = []
-        for i in range(3):
-            for j in range(3):
+        for i in range(self._boxSize):
+            for j in range(self._boxSize):
                 boxes.append((i, j))
 
         #Now iterate over each box and look at all of the values in the box.  If
@@ -477,36 +511,19 @@ class SudokuGenerator:
         3x3 box (within the 9x9 grid) that the row and column intersect at.
         Returns the (x, y) coordinates of the box ((0 - 2), (0 - 2)).'''
 
-        #Get the rowBox and columnBox value based on a simple if statement.
-        if row >= 0 and row <= 2:
-            rowBox = 0
-        elif row >= 3 and row <= 5:
-            rowBox = 1
-        else:
-            rowBox = 2
-
-        if column >= 0 and column <= 2:
-            columnBox = 0
-        elif column >= 3 and column <= 5:
-            columnBox = 1
-        else:
-            columnBox = 2
-
-        return (rowBox, columnBox)
+        #The box of every square is already in the lookup table.
+        return self._geometry.gridToBox[(row, column)]
 
     def _getValuesInBox(self, currentBox, puzzleMap):
         '''Given a 3x3 box within a given puzzle, gets all of values in the
         3x3 box.  If an invalid box is given, an empty list is returned.
         Returns a list of values within a 3x3 grid.'''
-        #Next we want a list of all values that are in the currentBox.
+        #The lookup table gives us the squares that are in the currentBox, so
+        #we only need to look at those 9 squares.  An invalid box has no
+        #squares.
         values = []
-        for i in range(9):
-            for j in range(9):
-                lookBox = self._getBox(i, j, puzzleMap)
-                #If the boxes are the same, add the value we are looking at, to
-                #the list to be returned.
-                if lookBox == currentBox:
-                    values.append(puzzleMap[i][j])
+        for row, column in self._geometry.boxToGrid.get(currentBox, ()):
+            values.append(puzzleMap[row][column])
 
         return values
 
@@ -514,13 +531,13 @@ class SudokuGenerator:
         '''Returns a deep copy of a given puzzle as a new list of lists.'''
         
         copy = []
-        for i in range(9):
+        for i in range(self._size):
             copy.append([])
-            for j in range(9):
+            for j in range(self._size):
                 copy[i].append(puzzleMap[i][j])
         return copy
     
-    def _generateUniqueSolvablePuzzle(self, puzzle, startingSolvedMoves):
+    def _generateUniqueSolvablePuzzle(self, puzzle, startingSolvedMoves, symmetry = None):
         '''This function takes in a completly solved puzzle, and removes a
         known value from a square of the puzzle until there are only the given
         startingSolvedMoves number of known values.  Each time a value is
@@ -530,25 +547,41 @@ class SudokuGenerator:
 
         Only so many values can be removed from a puzzle.  After a certain
         number of attempts to remove a value from the puzzle, the loop breaks,
-        and the solvable puzzle is returned.'''
+        and the solvable puzzle is returned.
+
+        If a symmetry is given, the value of every square in the symmetry
+        group of the random square is removed at the same time.'''
         MAX_ATTEMPTS = self.__maxAttempts
-        numSolvedMoved = 81
+        numSolvedMoved = self._geometry.numCells
         numAttempts = MAX_ATTEMPTS
         while numSolvedMoved != startingSolvedMoves:
             #Get a random square of the puzzle.
-            ranRow = random.randint(0, 8)
-            ranColumn = random.randint(0, 8)
+            ranRow = self._random.randint(0, self._size - 1)
+            ranColumn = self._random.randint(0, self._size - 1)
 
             #Make sure that the value is not 0.
             if puzzle[ranRow][ranColumn] == 0:
                 continue
 
-            #Store the current value of the square, so that we can put it back
-            #after we remove it, if we need to.
-            value = puzzle[ranRow][ranColumn]
+            #Get every square that has to be removed along with this one.
+            squares = self._getSymmetricSquares(ranRow, ranColumn, symmetry)
+
+            #If removing all of the squares would leave fewer known values than
+            #we want, count it as a failed attempt.
+            if numSolvedMoved - len(squares) < startingSolvedMoves:
+                numAttempts -= 1
+                if numAttempts < 0:
+                    break
+
+                continue
+
+            #Store the current values of the squares, so that we can put them
+            #back after we remove them, if we need to.
+            values = [puzzle[row][column] for row, column in squares]
             
-            #Remove the value from the puzzle.
-            puzzle[ranRow][ranColumn] = 0
+            #Remove the values from the puzzle.
+            for row, column in squares:
+                puzzle[row][column] = 0
 
             #Get a copy of the puzzle, which we will attempt to solve.
             copy = self._copyPuzzle(puzzle)
@@ -564,7 +597,8 @@ class SudokuGenerator:
             #within the puzzle, and continue.
             if self.__counter > self.__maxCounter or self.__counter == 0:
                 numAttempts -= 1
-                puzzle[ranRow][ranColumn] = value
+                for i in range(len(squares)):
+                    puzzle[squares[i][0]][squares[i][1]] = values[i]
 
                 #If numAttempts is less than 0, then we have already tried to
                 #remove a value from the puzzle the maximum number of times
@@ -574,11 +608,11 @@ class SudokuGenerator:
 
                 continue
 
-            #If we reach this point, then we have succeeded in removing a value
+            #If we reach this point, then we have succeeded in removing values
             #from the puzzle, and we still have a unique solution.  Now we want
-            #to increase numMovesRemoved by 1, and reset numAttempts to its
-            #default starting value.
-            numSolvedMoved -= 1
+            #to decrease numSolvedMoved by the number of values removed, and
+            #reset numAttempts to its default starting value.
+            numSolvedMoved -= len(squares)
             numAttempts = MAX_ATTEMPTS
 
         #At this point we hopefully have a puzzle with only startingSolvedMoves
@@ -588,91 +622,168 @@ class SudokuGenerator:
         #puzzle.
         return puzzle, numSolvedMoved
 
+    def _getSymmetricSquares(self, row, column, symmetry):
+        '''Given a square (row, column) and the name of a symmetry (or None),
+        returns a list of the keys (x, y) of the squares that must be removed
+        along with the square to keep the symmetry (including the square
+        itself).'''
+        if symmetry == None:
+            return [(row, column)]
+
+        index = row * self._size + column
+        for group in self._geometry.symmetryGroups[symmetry]:
+            if index in group:
+                return [self._geometry.cellKeys[i] for i in group]
+
+    def _getMostConstrainedSquare(self, puzzle):
+        '''Given a puzzle, finds the empty square (0) that has the fewest valid
+        values (values that are not already in its row, column, or 3x3 box).
+        If no square has a single valid value, but a value only fits in 1
+        square of a row, column, or 3x3 box, that square is returned with just
+        that value instead.  Trying the most constrained square first means
+        most dead ends are found straight away, which is what keeps the
+        searches below fast enough for 16x16 and 25x25 puzzles.
+        Returns a tuple of (row, column, list of valid values) of the square,
+        or None if the puzzle has no empty squares.  The list is empty if the
+        puzzle cannot be solved.'''
+        size = self._size
+        boxSize = self._boxSize
+
+        #First work out which values are already used in each row, column and
+        #box.  Each is stored as a single integer where the value v is bit v.
+        rowMasks = [0] * size
+        columnMasks = [0] * size
+        boxMasks = [0] * size
+        for row in range(size):
+            for column in range(size):
+                value = puzzle[row][column]
+                if value != 0:
+                    bit = 1 << value
+                    rowMasks[row] |= bit
+                    columnMasks[column] |= bit
+                    boxMasks[(row // boxSize) * boxSize + column // boxSize] |= bit
+
+        #A mask with the bits of every value between 1 and size set.
+        allValues = (1 << (size + 1)) - 2
+
+        #Next find the empty square with the fewest values left, keeping the
+        #valid values of every empty square (by index).  A square with 0
+        #values is a dead end, and a square with 1 value cannot be beaten, so
+        #there is no need to keep looking after either.
+        candidates = {}
+        bestSquare = None
+        bestCount = size + 1
+        for i in range(size * size):
+            row = i // size
+            column = i % size
+            if puzzle[row][column] != 0:
+                continue
+
+            mask = allValues & ~(rowMasks[row] | columnMasks[column] | boxMasks[(row // boxSize) * boxSize + column // boxSize])
+            candidates[i] = mask
+            count = bin(mask).count("1")
+            if count < bestCount:
+                bestSquare = (row, column, mask)
+                bestCount = count
+                if count <= 1:
+                    break
+
+        if bestSquare == None:
+            return None
+
+        #Look for a value that only fits in 1 square of a row, column or box.
+        #The units are in the same order as the masks (see SudokuGeometry).
+        if bestCount > 1:
+            unitMasks = rowMasks + columnMasks + boxMasks
+            for unit in range(len(unitMasks)):
+                seenOnce = 0
+                seenTwice = 0
+                for i in self._geometry.units[unit]:
+                    mask = candidates.get(i, 0)
+                    seenTwice |= seenOnce & mask
+                    seenOnce |= mask
+
+                #A value that is not in the unit, and does not fit anywhere in
+                #it, means the puzzle cannot be solved.
+                if allValues & ~unitMasks[unit] & ~seenOnce:
+                    return bestSquare[0], bestSquare[1], []
+
+                singles = seenOnce & ~seenTwice
+                if singles:
+                    value = (singles & -singles).bit_length() - 1
+                    for i in self._geometry.units[unit]:
+                        if candidates.get(i, 0) & (1 << value):
+                            return i // size, i % size, [value]
+
+        row, column, mask = bestSquare
+        return row, column, [value for value in range(1, size + 1) if mask & (1 << value)]
+
     def _recursivePuzzleSolver(self, puzzle):
-        '''This function takes in a puzzle and attempts to solve it, using a
-        backtracking algorithm (the same that can be used to generate the
-        puzzle).  If __maxCounter + 1 solutions have already been found, this
-        function does nothing.
+        '''This function takes in a puzzle and counts its solutions, using a
+        backtracking algorithm (the same that is used to generate the puzzle).
+        Each solution found increases __counter by 1, and once __maxCounter + 1
+        solutions have been found, this function stops looking.
         This function is called by _generateUniqueSolvablePuzzle, and as such
-        will only try so hard before giving up trying to solve a puzzle. ''' 
-
-        #First check that the puzzle is not already solved.
-        if self.isFilledGrid(puzzle) and self.__counter == 0:
-            #If the puzzle is already solved, increase the counter to 1, and
-            #return, ending the function.
-            self.__counter == 1
-            return 
-
-        #Next check if the current puzzle already has a given max number of
-        #solutions.  If it does, simply return and do not look for another
-        #solution to the puzzle.
+        will only try so hard before giving up trying to solve a puzzle.  The
+        puzzle is set back to how it was before the function returns.''' 
+
+        #First check if we have already found the max number of solutions.  If
+        #we have, simply return and do not look for another solution to the
+        #puzzle.
         if self.__counter >= self.__maxCounter + 1:
             return
 
-        #Next go through each square of the puzzle until we find a value that
-        #is not 0.  Once we have a non zero value, set it to a valid value.
-        #Then check if the puzzle is now solved.  If not, this function is
-        #called (recursion!) to solve the puzzle.  If the puzzle is solved, the
-        #given counter is increased by 1, and the value of the square that we
-        #are looking at is reset to 0.
-
-        #For each square in the puzzle.
-        for i in range(81):
-            #Get the current row and column of our puzzle.
-            row = i // 9
-            column = i % 9
-
-            #Check if the current value of the square is 0.  If the current
-            #value is not 0, then continue with the loop.
-            if puzzle[row][column] != 0:
-                continue
+        #Find the empty square with the fewest valid values.  If there are no
+        #empty squares, the puzzle is a solution (every value we place is
+        #valid, so the puzzle always follows the rules).
+        square = self._getMostConstrainedSquare(puzzle)
+        if square == None:
+            self.__counter += 1
+            return
 
-            #Otherwise, we want to set the square to a random valid value.
-            
-            #Get a randomly ordered list of numbers between 1 and 9.
-            possibleValues = list(range(1,10))
-            random.shuffle(possibleValues)
-
-            #Iterate through the values looking for a valid value.
-            for value in possibleValues:
-
-                #Check if the value already exists in the row or column.
-                if not self.isValueInRowOrColumn(value, row, column, puzzle):
-
-                    #Check if the value already exists in the 3x3 grid that
-                    #contains the square that we are looking at.
-                    if value not in self.getValuesInBoxAt(row, column, puzzle):
-                        #At this point we have a valid possible value for the 
-                        #square, and we now want to set the value of the square
-                        #to the value that we have.
-                        puzzle[row][column] = value
-
-                        #Check if the puzzle is completly filled.
-                        if self.isFilledGrid(puzzle):
-                            #If the puzzle is now completed, increase the
-                            #counter by 1 and break out of the loop.
-                            self.__counter += 1
-                            break
-                        else:
-                            #If the puzzle is not yet complete, check if
-                            #calling this function will complete the puzzle.
-                            #If it will, return, to stop modifing the puzzle.
-                            if self.__counter < self.__maxCounter + 1:
-                                if self._recursivePuzzleSolver(puzzle):
-                                    return True                
-
-            #If we make it to this point, then the above loop has executed on
-            #all possible numbers bettwen 1 and 9 for this square of the
-            #puzzle, and found that none of them can be placed in this square.
-            #At this point, we need to backtrack, to undo our work.  So, we
-            #want to break out of the top level loop, which is iterating over
-            #all squares in the puzzle.
-            break
-
-	
-        #This point in the code is called either once the puzzle has been
-        #solved at least once, or the puzzle cannot be solved.  Either way set
-        #the value of the sqaure back to 0.
+        #Try each valid value of the square, and count the solutions of the
+        #rest of the puzzle.  The order does not matter when counting, so the
+        #values are not shuffled.  A square with no valid values skips the
+        #loop, as there are no solutions from here.
+        row, column, possibleValues = square
+        for value in possibleValues:
+            puzzle[row][column] = value
+            self._recursivePuzzleSolver(puzzle)
+
+            if self.__counter >= self.__maxCounter + 1:
+                break
+
+        #Either every value has been tried, or we have found enough solutions.
+        #Either way set the value of the sqaure back to 0.
         puzzle[row][column] = 0
 
     def _recursivePuzzleGenerator(self, puzzle):
+        '''Given a puzzle (which is assumed to be empty of values), uses a
+        backtracking algorithm to fill every square of the puzzle with a valid
+        value.  The empty square with the fewest valid values is given a random
+        valid value, and then this function is called (recursion!) to fill the
+        rest of the puzzle.  If the rest of the puzzle cannot be filled, the
+        next valid value is tried.  If no value works, the square is set back
+        to 0.
+        Returns the completed puzzle, or None if the puzzle cannot be
+        completed.'''
+
+        square = self._getMostConstrainedSquare(puzzle)
+
+        #There were no empty squares, so the puzzle is already complete.
+        if square == None:
+            return puzzle
+
+        #Try the valid values of the square in a random order.
+        row, column, possibleValues = square
+        self._random.shuffle(possibleValues)
+        for value in possibleValues:
+            puzzle[row][column] = value
+
+            #If the rest of the puzzle can be filled, then we are done.
+            if self._recursivePuzzleGenerator(puzzle) != None:
+                return puzzle
+
+        #None of the values worked, so backtrack.
+        puzzle[row][column] = 0
+        return None
@@ -24,6 +24,21 @@
 #how many starting moves given).  This returns both a solved, and an unsolved
 #version of the puzzle.
 
+#If you need a lot of puzzles at once, generatePuzzles() calls either of the
+#above functions many times, spread over several processes, and gives back
+#each solved and unsolved pair in the same order for the same seed.
+#iterPuzzles() does the same, but only generates puzzles as fast as they are
+#taken, so it can be used to make a never ending stream of puzzles (given back
+#as soon as they are finished, unless ordered is True).
+
+#A SolutionCountCache can be given to getHardPuzzle so that checking how many
+#solutions the same puzzle has more than once is a dictionary lookup.  It is
+#built on LRUCache, which other files (such as SudokuGrader) also use.
+
+#getHardPuzzleAsync() and getEasyPuzzleAsync() can be awaited from asyncio
+#code.  They generate the puzzle in an executor so the event loop keeps
+#running, and cancelling the task they run in also stops the search.
+
 
 #In addition the following functions can be useful when setting up a Sudoku UI:
 
@@ -39,88 +54,371 @@
 #getValidMovesAt() given a row, column, and puzzle, returns a list of legal
 #numbers that can be in that square.
 
+#transformPuzzle() shuffles the digits, rows, columns, bands and stacks of a
+#puzzle (and may transpose it) without breaking any rules, which turns one
+#solved puzzle into a new one almost instantly.
+
+#To read or write puzzles as single lines of 81 characters (the format most
+#collections of puzzles use), see SudokuText.
+
+#getHardPuzzle and getEasyPuzzle only say how a puzzle was made.  To find out
+#how hard a puzzle is for a person to solve, see SudokuGrader.
+
+#Boards are 9x9 by default, but any board made of boxSize x boxSize boxes can
+#be used (such as 4x4, 16x16 or 25x25, see SudokuGeometry).  Give boxSize to
+#SudokuBoard, getHardPuzzle or getEasyPuzzle to work with another size.  Every
+#other function works out the size from the board it is given.
+
+import asyncio
+import functools
+import os
 import random
-import math
+import threading
 import time
+from collections import deque, OrderedDict
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+#The geometry of a grid never changes, so rather than building it again for
+#every SudokuBoard, it comes from the shared tables in SudokuGeometry.
+from SudokuGeometry import SYMMETRY_GROUPS
+from SudokuGeometry import getGeometry, getGeometryOfNumCells
+import SudokuDancingLinks
+import SudokuCanonical
+
+#Each value between 1 and 9 is given its own bit in a 9 bit mask.  Value 1 is
+#bit 0, value 2 is bit 1 and so on.  These masks let us describe which values
+#are already used in a row, column or 3x3 box using a single integer.  Larger
+#boards work the same way with more bits (see the valueBits of a Geometry).
+VALUE_BITS = getGeometry(3).valueBits
+
+#A mask with all 9 value bits set.
+ALL_VALUES_MASK = getGeometry(3).allValuesMask
+
+#A lookup of every possible 9 bit mask to the tuple of values whose bits are
+#set in that mask.  This lets us turn a mask back into a list of values without
+#looping over the bits each time.
+MASK_VALUES = tuple(tuple(value for value in range(1, 10) if mask & VALUE_BITS[value])
+                    for mask in range(ALL_VALUES_MASK + 1))
+
+def getMaskValues(mask):
+    '''
+    Given:
+    A mask of values (see VALUE_BITS), of a board of any size.
+
+    Returns a tuple of the values whose bits are set in the mask.  Masks of
+    only the values 1 - 9 are looked up in MASK_VALUES, larger values are found
+    one bit at a time.
+    '''
+    if mask <= ALL_VALUES_MASK:
+        return MASK_VALUES[mask]
+
+    values = []
+    while mask:
+        #The lowest bit of the mask that is set.
+        bit = mask & -mask
+        values.append(bit.bit_length())
+        mask ^= bit
+
+    return tuple(values)
+
+def _getNumMaskValues(mask):
+    '''Returns the number of values whose bits are set in a mask.'''
+    if mask <= ALL_VALUES_MASK:
+        return len(MASK_VALUES[mask])
+
+    return bin(mask).count("1")
+
+class _BoardMapView(Mapping):
+    '''A read only dictionary like view of grid position (x,y) to the value of
+    the square, backed by the values of a SudokuBoard.'''
+
+    __slots__ = ("__values", "__geometry")
+
+    def __init__(self, values, geometry):
+        self.__values = values
+        self.__geometry = geometry
+
+    def __getitem__(self, key):
+        return self.__values[self.__geometry.cellIndex[key]]
+
+    def __iter__(self):
+        return iter(self.__geometry.cellKeys)
+
+    def __len__(self):
+        return self.__geometry.numCells
+
+
+class _BoardLinesView(Sequence):
+    '''A read only list like view of the rows or the columns of a SudokuBoard.
+    Each item is a new list of the values of the row or column.'''
+
+    __slots__ = ("__values", "__isColumns", "__size")
+
+    def __init__(self, values, isColumns, size):
+        self.__values = values
+        self.__isColumns = isColumns
+        self.__size = size
+
+    def __getitem__(self, index):
+        size = self.__size
+        if isinstance(index, slice):
+            return [self[i] for i in range(size)[index]]
+
+        #Let range do the bounds checking (and handle negative indexes).
+        index = range(size)[index]
+        if self.__isColumns:
+            return list(self.__values[index::size])
+        return list(self.__values[index * size:index * size + size])
+
+    def __len__(self):
+        return self.__size
+
 
 class SudokuBoard:
     '''This class is designed to be used instead of a simple list of lists to
     represent the sudoku puzzle board.  This class allows easy access of rows,
     columns and grid locations (x,y).  In addition, it allows access to all
-    values within any of the 3x3 boxes that make up the 9x9 grid.'''
+    values within any of the 3x3 boxes that make up the 9x9 grid.
+
+    A board can also be made of boxes of another size (boxSize x boxSize
+    boxes of boxSize x boxSize squares, see SudokuGeometry), in which case
+    everything below that talks about 9 values and 3x3 boxes is instead about
+    size values and boxSize x boxSize boxes.
+
+    The values of the board are stored in a single bytearray (in row order),
+    so every value must be an integer between 0 and 255.  The rows, columns and
+    map of the board are views of that bytearray.
+
+    The board also keeps track of how many squares are filled with a value
+    between 1 and 9, and how many duplicate values there are in its rows,
+    columns and boxes, so checking if the board is solved does not need to
+    look at every square.'''
+
+    __slots__ = ("__values", "__geometry", "__counts", "__masks", "__numFilled", "__numConflicts")
 
-    def __init__(self, defaultValue = 0, rows = None, columns = None, map = None, boxLookup = None, reverseLookup = None):
-        '''Given:
+    def __init__(self, defaultValue = 0, values = None, boxSize = None):
+        '''
+        Given:
         A default value for each sqaure (defaults to 0).
-        -OR-
-        Several objects used to create a deep clone of this object.
-
-        Creates a Sudoku Board and stores the data in multiple different
-        connected ways.'''
-        if rows != None and columns != None and map != None and boxLookup != None and reverseLookup != None:
-            self.__rows = rows
-            self.__columns = columns
-            self.__map = map
-            self.__boxLookup = boxLookup
-            self.__reverseBoxLookup = reverseLookup
+        A list of values in row order to start the board with (optional, 81
+        values for a 9x9 board).
+        The number of rows (and columns) of squares in each box (optional).
+        Without a boxSize, the size is worked out from the number of values,
+        or is 3 (a 9x9 board) if no values are given.
+
+        Creates a Sudoku Board.'''
+        if values is None:
+            self.__geometry = getGeometry(3 if boxSize == None else boxSize)
+            self.__values = bytearray([defaultValue]) * self.__geometry.numCells
+        else:
+            self.__values = bytearray(values)
+            if boxSize == None:
+                self.__geometry = getGeometryOfNumCells(len(self.__values))
+                if self.__geometry == None:
+                    raise ValueError(f"A Sudoku Board cannot have {len(self.__values)} values.")
+            else:
+                self.__geometry = getGeometry(boxSize)
+                if len(self.__values) != self.__geometry.numCells:
+                    raise ValueError(f"A Sudoku Board needs {self.__geometry.numCells} values, {len(self.__values)} were given.")
+
+        self.__buildMasks()
+
+    def __buildMasks(self):
+        '''
+        Builds the occupancy masks of every row, column and 3x3 box from the
+        current values of the board.
+
+        A mask has the bit of a value (see VALUE_BITS) set if that value is
+        anywhere in the row, column or box.  Because a board is allowed to hold
+        duplicates while it is being edited, we also keep a count of how many
+        times each value is in each row, column and box.  That way removing one
+        of two duplicates does not clear the bit of the value.
+        '''
+        geometry = self.__geometry
+        #A count of each value (1 - size) within each unit (see SudokuGeometry),
+        #stored at index (unit * (size + 1) + value).
+        self.__counts = bytearray(geometry.numUnits * (geometry.size + 1))
+        #The mask of values used within each unit.
+        self.__masks = [0] * geometry.numUnits
+        #The number of squares with a value between 1 and size.
+        self.__numFilled = 0
+        #The number of extra copies of values within the units.  A unit with
+        #3 copies of a value adds 2 to this count.
+        self.__numConflicts = 0
+
+        #The same as calling __addToMasks for every square, but with the
+        #tables in local variables, as every board that is made (or read from
+        #a file) comes through here.
+        valueBits = geometry.valueBits
+        cellUnits = geometry.cellUnits
+        counts = self.__counts
+        masks = self.__masks
+        stride = geometry.size + 1
+        numFilled = 0
+        numConflicts = 0
+        for i, value in enumerate(self.__values):
+            bit = valueBits.get(value)
+            if bit == None:
+                continue
+
+            numFilled += 1
+            for unit in cellUnits[i]:
+                if counts[unit * stride + value] > 0:
+                    numConflicts += 1
+                counts[unit * stride + value] += 1
+                masks[unit] |= bit
+
+        self.__numFilled = numFilled
+        self.__numConflicts = numConflicts
+
+    def __addToMasks(self, index, value):
+        '''
+        Given:
+        The index of a square (0 - 80).
+        The value that was just placed in the square.
+
+        Adds the value to the counts and masks of the row, column and box that
+        contain the square.  Values that are not between 1 and 9 (such as blank
+        values) are not tracked.
+        '''
+        geometry = self.__geometry
+        if value not in geometry.valueBits:
+            return
+
+        self.__numFilled += 1
+        bit = geometry.valueBits[value]
+        stride = geometry.size + 1
+        for unit in geometry.cellUnits[index]:
+            #If the value is already in the unit, this is a duplicate.
+            if self.__counts[unit * stride + value] > 0:
+                self.__numConflicts += 1
+            self.__counts[unit * stride + value] += 1
+            self.__masks[unit] |= bit
+
+    def __removeFromMasks(self, index, value):
+        '''
+        Given:
+        The index of a square (0 - 80).
+        The value that is about to be removed from the square.
+
+        Removes the value from the counts of the row, column and box that
+        contain the square.  The bit of the value is only cleared once there are
+        no more copies of the value left in the row, column or box.
+        '''
+        geometry = self.__geometry
+        if value not in geometry.valueBits:
             return
-                
-        #Standard list of lists that can be used to make up a sudoku puzzle.
-        self.__rows = []
-        #A dictionary of grid position (x,y) to values of the puzzle.
-        self.__map = {}
-        #A list of values of each column of the puzzle.
-        self.__columns = []
-        #A dictionary of grid position (x,y) to 3x3 box position (x2,y2).
-        self.__boxLookup = {}
-        #A dictionary of 3x3 box positions (x,y) to grid position (x2,y2).
-        self.__reverseBoxLookup = {}
-
-        #Make the list of lists and dictionary of values.
-        for i in range(9):
-            self.__rows.append([])
-            self.__columns.append([])
-            for j in range(9):
-                self.__rows[i].append(defaultValue)                
-                self.__map[(i, j)] = defaultValue
-
-        #Make the list of values of the columns.
-        for i in range(9):
-            for j in range(9):
-                self.__columns[i].append(self.__rows[j][i])
-
-        #Using our existing data structures, make the list of columns, as well
-        #as the dictionaries to lookup box positions of any grid position, or
-        #the reverse.
-        for key in self.__map:
-            xPosition = int(math.floor(key[0] / 3))
-            yPosition = int(math.floor(key[1] / 3))
-            position = (xPosition, yPosition)
-            if position not in self.__reverseBoxLookup:
-                self.__reverseBoxLookup[position] = []
-            self.__reverseBoxLookup[position].append(key)
-
-            self.__boxLookup[key] = position
+
+        self.__numFilled -= 1
+        bit = geometry.valueBits[value]
+        stride = geometry.size + 1
+        for unit in geometry.cellUnits[index]:
+            self.__counts[unit * stride + value] -= 1
+            if self.__counts[unit * stride + value] == 0:
+                self.__masks[unit] &= ~bit
+            else:
+                #There is still a copy of the value in the unit, so we have
+                #removed a duplicate.
+                self.__numConflicts -= 1
+
+    @property
+    def geometry(self):
+        return self.__geometry
+
+    @property
+    def boxSize(self):
+        return self.__geometry.boxSize
+
+    @property
+    def size(self):
+        return self.__geometry.size
+
+    @property
+    def numCells(self):
+        return self.__geometry.numCells
 
     @property
     def map(self):
-        return self.__map
+        return _BoardMapView(self.__values, self.__geometry)
 
     @property
     def rows(self):
-        return self.__rows
+        return _BoardLinesView(self.__values, False, self.__geometry.size)
 
     @property
     def columns(self):
-        return self.__columns
+        return _BoardLinesView(self.__values, True, self.__geometry.size)
 
     @property
     def boxToGridMap(self):
-        return self.__reverseBoxLookup
+        return self.__geometry.boxToGrid
 
     @property
     def gridToBoxMap(self):
-        return self.__boxLookup
+        return self.__geometry.gridToBox
+
+    def getValue(self, key):
+        '''
+        Given:
+        A key (x, y) position in the puzzle.
+
+        Returns the value of the square.
+        '''
+        return self.__values[self.__geometry.cellIndex[key]]
+
+    def getValues(self):
+        '''Returns the values of the board (in row order) as bytes.'''
+        return bytes(self.__values)
+
+    def getNumFilled(self):
+        '''Returns the number of squares with a value between 1 and 9.'''
+        return self.__numFilled
+
+    def getNumConflicts(self):
+        '''Returns the number of duplicate values in the rows, columns and 3x3
+        boxes of the board (0 if the board follows the rules).'''
+        return self.__numConflicts
+
+    def isComplete(self):
+        '''Returns True if every square has a value between 1 and 9, and there
+        are no duplicates in any row, column or 3x3 box.'''
+        return self.__numFilled == self.__geometry.numCells and self.__numConflicts == 0
+
+    def getUsedMask(self, row, column):
+        '''
+        Given:
+        A row number (0 - 8).
+        A column number (0 - 8).
+
+        Returns the 9 bit mask (see VALUE_BITS) of every value that is already
+        used in the row, column, or 3x3 box that contains the square.
+        '''
+        masks = self.__masks
+        geometry = self.__geometry
+        rowUnit, columnUnit, boxUnit = geometry.cellUnits[row * geometry.size + column]
+        return masks[rowUnit] | masks[columnUnit] | masks[boxUnit]
+
+    def getUnitMask(self, unit):
+        '''
+        Given:
+        A unit number (0 - 26, see SudokuGeometry).
+
+        Returns the 9 bit mask (see VALUE_BITS) of every value that is already
+        used in the row, column, or 3x3 box.
+        '''
+        return self.__masks[unit]
+
+    def getCandidateMask(self, row, column):
+        '''
+        Given:
+        A row number (0 - 8).
+        A column number (0 - 8).
+
+        Returns the 9 bit mask (see VALUE_BITS) of every value that is not yet
+        used in the row, column, or 3x3 box that contains the square.
+        '''
+        return self.__geometry.allValuesMask & ~self.getUsedMask(row, column)
 
     def setValue(self, key, value):
         '''
@@ -129,9 +427,11 @@ class SudokuBoard:
         A value to set the square in the grid to.
 
         Changes the current value in the grid to the new value.'''
-        self.__rows[key[0]][key[1]] = value
-        self.__columns[key[1]][key[0]] = value
-        self.__map[key] = value
+        index = self.__geometry.cellIndex[key]
+        oldValue = self.__values[index]
+        self.__values[index] = value
+        self.__removeFromMasks(index, oldValue)
+        self.__addToMasks(index, value)
 
     def setRowValues(self, row, values):
         '''
@@ -141,7 +441,7 @@ class SudokuBoard:
 
         Changes the current value in each square in a given row to a new value.
         '''
-        for i in range(9):
+        for i in range(self.__geometry.size):
             self.setValue((row, i), values[i])
 
     def setColumnValues(self, column, values):
@@ -153,48 +453,280 @@ class SudokuBoard:
         Changes the current value in each sqaure in a given column to a new
         value.
         '''
-        for i in range(9):
+        for i in range(self.__geometry.size):
             self.setValue((i, column), values[i])
 
     def getCopy(self):
         '''Returns a deep copy of the SudokuBoard that can be modified without
         changing the original.'''
-        cRows = []
-        cColumns = []
-        cMap = {}
-        cLookup = {}
-        cReverse = {}
-
-        #Copy the rows and columns.
-        for i in range(9):
-            cRows.append([])
-            cColumns.append([])
-            for j in range(9):
-                cRows[i].append(self.__rows[i][j])
-                cColumns[i].append(self.__columns[j][i])
-
-        #Copy the dictionaries.
-        for key in self.__map:
-            cMap[key] = self.__map[key]
-
-        for key in self.__boxLookup:
-            cLookup[key] = self.__boxLookup[key]
-
-        #This dictionary is slightly more complicated as it is a dictionary of
-        #lists.
-        for key in self.__reverseBoxLookup:
-            for value in self.__reverseBoxLookup[key]:
-                if key not in cReverse:
-                    cReverse[key] = []
-
-                cReverse[key].append(value)
-
-        return SudokuBoard(0, cRows, cColumns, cMap, cLookup, cReverse)
-        
+        #The values, counts and masks are each copied in one go, so there is no
+        #need to rebuild anything for the copy.
+        copy = SudokuBoard.__new__(SudokuBoard)
+        copy.__values = self.__values[:]
+        copy.__geometry = self.__geometry
+        copy.__counts = self.__counts[:]
+        copy.__masks = self.__masks[:]
+        copy.__numFilled = self.__numFilled
+        copy.__numConflicts = self.__numConflicts
+        return copy
+
+    def __getstate__(self):
+        return bytes(self.__values)
+
+    def __setstate__(self, state):
+        #The size of the board is worked out from the number of values.
+        self.__values = bytearray(state)
+        self.__geometry = getGeometryOfNumCells(len(self.__values))
+        self.__buildMasks()
 
     def __str__(self):
-        return str(self.__rows)
+        return str(list(self.rows))
+
+
+class LRUCache:
+    '''A bounded cache, so that asking the same question again is a
+    dictionary lookup instead of working out the answer again.  When the cache
+    is full, the entry that was used the longest time ago is removed (least
+    recently used).
+
+    What an entry is stored under is worked out by getKey, which calls the key
+    function given to the cache (or is replaced by a subclass, such as
+    SolutionCountCache).'''
+
+    def __init__(self, maxSize = 4096, keyFunction = None):
+        '''
+        Given:
+        The maximum number of entries to remember (defaults to 4096).
+        A function that turns the parameters of getKey into a key (optional,
+        without it the key is the tuple of the parameters).
+
+        Creates an empty cache.'''
+        if maxSize < 1:
+            raise Exception(f"Sudoku Generator - {type(self).__name__}: maxSize must be at least 1 ({maxSize}).")
+
+        self.__entries = OrderedDict()
+        self.__maxSize = maxSize
+        self.__keyFunction = keyFunction
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def maxSize(self):
+        return self.__maxSize
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def misses(self):
+        return self.__misses
 
+    def __len__(self):
+        return len(self.__entries)
+
+    def getKey(self, *args):
+        '''
+        Given:
+        The parameters of the key function of the cache.
+
+        Returns the key an entry is stored under.
+        '''
+        if self.__keyFunction == None:
+            return args
+        return self.__keyFunction(*args)
+
+    def get(self, key):
+        '''
+        Given:
+        A key (see getKey).
+
+        Returns the value stored for the key, or None if the key is not in the
+        cache.
+        '''
+        value = self.__entries.get(key)
+        if value == None:
+            self.__misses += 1
+            return None
+
+        self.__hits += 1
+        self.__entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        '''
+        Given:
+        A key (see getKey).
+        The value to store (not None).
+
+        Stores the value, removing the least recently used entry if the cache
+        is full.
+        '''
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+        if len(self.__entries) > self.__maxSize:
+            self.__entries.popitem(last=False)
+
+    def clear(self):
+        '''Removes every entry from the cache and resets the statistics.'''
+        self.__entries.clear()
+        self.__hits = 0
+        self.__misses = 0
+
+    def getStats(self):
+        '''
+        Returns a dictionary of the number of entries (size), the maximum number
+        of entries (maxSize), the number of lookups that were found (hits) and
+        the number that were not (misses).
+        '''
+        return {"size": len(self.__entries), "maxSize": self.__maxSize,
+                "hits": self.__hits, "misses": self.__misses}
+
+
+class SolutionCountCache(LRUCache):
+    '''An LRUCache of how many solutions puzzles have.
+
+    Puzzles are looked up by their values and blank value.  If canonical is
+    True, 9x9 puzzles are looked up by their canonical form instead (see
+    SudokuCanonical), so equivalent puzzles share a single entry.  Finding the
+    canonical form takes a few milliseconds, so this is only worth it when
+    equivalent puzzles are expected to come up often.
+
+    A cache can be given to getHardPuzzle.  Each process has its own copy of
+    the cache, so a cache given to generatePuzzles is not shared between
+    workers.'''
+
+    def __init__(self, maxSize = 4096, canonical = False):
+        '''
+        Given:
+        The maximum number of puzzles to remember (defaults to 4096).
+        If puzzles should be looked up by their canonical form (defaults to
+        False).
+
+        Creates an empty cache.'''
+        super().__init__(maxSize)
+        self.__canonical = canonical
+
+    def getKey(self, puzzle, blankValue, maxSolutions):
+        '''
+        Given:
+        A puzzle (a SudokuBoard object).
+        The value of the unsolved squares in the puzzle.
+        The maximum number of solutions that were looked for.
+
+        Returns the key the puzzle is stored under.
+        '''
+        #Canonical forms are only worked out for 9x9 puzzles.
+        if self.__canonical and puzzle.boxSize == 3:
+            return (SudokuCanonical.getCanonicalKey(puzzle), maxSolutions)
+
+        return (puzzle.getValues(), blankValue, maxSolutions)
+
+
+#How many nodes of a search are visited between checks of the clock (and of
+#the cancel event) of a SearchBudget.
+TIME_CHECK_INTERVAL = 256
+
+#The status a search gives back when it stops.
+#   FOUND - the search found what it was looking for (a solution, or the
+#   maximum number of solutions).
+#   EXHAUSTED - every possibility was tried.
+#   TIMED_OUT - the search ran out of time or nodes, or was cancelled, before
+#   it could finish.
+FOUND = "found"
+EXHAUSTED = "exhausted"
+TIMED_OUT = "timedOut"
+
+class SearchBudget:
+    '''How much work a search is allowed to do.  A search calls tick once for
+    every node (every square it tries to fill) and stops as soon as tick
+    returns True.
+
+    A budget can limit the search by time, by number of nodes, or both.
+    Reading the clock is slow compared to the rest of a node, so it is only
+    read every checkInterval nodes, using a monotonic clock so that changes to
+    the system time do not matter.  A node limit does not depend on the clock
+    at all, so a search with a node limit (and a seed) does exactly the same
+    work on a busy machine as on an idle one.
+
+    The search can also be cancelled (from any thread) by setting the cancel
+    event.  Once a budget is spent it stays spent.'''
+
+    def __init__(self, maxDuration = None, cancelEvent = None, maxNodes = None, checkInterval = TIME_CHECK_INTERVAL):
+        '''
+        Given:
+        The maximum amount of time the search can take (in seconds, or None for
+        no limit).
+        A threading.Event that cancels the search when it is set (optional).
+        The maximum number of nodes the search can visit (or None for no
+        limit).
+        How many nodes are visited between checks of the clock (defaults to
+        TIME_CHECK_INTERVAL).
+        '''
+        self.endTime = None if maxDuration == None else time.monotonic() + maxDuration
+        self.cancelEvent = cancelEvent
+        self.maxNodes = maxNodes
+        self.checkInterval = max(checkInterval, 1)
+        self.numNodes = 0
+        self.__isSpent = False
+
+    @property
+    def isSpent(self):
+        '''True once tick or isExpired has found that the budget ran out.'''
+        return self.__isSpent
+
+    def isCancelled(self):
+        '''Returns True if the cancel event has been set.'''
+        return self.cancelEvent != None and self.cancelEvent.is_set()
+
+    def isExpired(self):
+        '''Checks the clock, the number of nodes and the cancel event right
+        now.  Returns True if the budget is spent.'''
+        if not self.__isSpent:
+            self.__isSpent = ((self.endTime != None and time.monotonic() >= self.endTime) or
+                              self.__isOutOfNodes() or self.isCancelled())
+        return self.__isSpent
+
+    def __isOutOfNodes(self):
+        '''Returns True if more than maxNodes nodes have been counted.  Both
+        tick and isExpired use this, so they always agree on when the nodes
+        have run out.'''
+        return self.maxNodes != None and self.numNodes > self.maxNodes
+
+    def tick(self):
+        '''Counts 1 node of the search.  Returns True if the search has to
+        stop.'''
+        self.numNodes += 1
+        if self.__isSpent:
+            return True
+
+        if self.__isOutOfNodes():
+            self.__isSpent = True
+        elif self.numNodes % self.checkInterval == 0:
+            self.__isSpent = ((self.endTime != None and time.monotonic() >= self.endTime) or
+                              self.isCancelled())
+        return self.__isSpent
+
+
+def _getRandom(seed):
+    '''
+    Given:
+    A seed: None, an integer (or anything else random.seed accepts), or a
+    random number generator (a random.Random object, or the random module).
+
+    Returns the random number generator to use.  None gives the random module
+    itself, so that nothing changes for code that seeds the random module.  A
+    random number generator is used as it is, so a caller can share a
+    generator between several calls.  Anything else makes a new generator
+    with that seed.
+    '''
+    if seed == None:
+        return random
+
+    if seed is random or isinstance(seed, random.Random):
+        return seed
+
+    return random.Random(seed)
 
 def validatePuzzleObject(puzzle):
     '''
@@ -204,12 +736,30 @@ def validatePuzzleObject(puzzle):
     if type(puzzle) is not SudokuBoard:
         raise Exception(f"Given Puzzle: ({puzzle}) is not a valid Sudoku Board.")
 
-def getHardPuzzle(numKnownValues, blankValue = 0, attemptUniqueSolution = True, maxDuration = 60):
+def getHardPuzzle(numKnownValues, blankValue = 0, attemptUniqueSolution = True, maxDuration = 60, solver = "mrv", symmetry = None, seedGrid = None, cache = None, cancelEvent = None, maxNodes = None, seed = None, boxSize = 3, maxAttempts = 25, requireUnique = False):
     '''
     Given:
     A number of known values in the puzzle.
     If the puzzle should have only a single solution.
-    The maximum amount of time to try and make a puzzle (in seconds).
+    The maximum amount of time to try and make a puzzle (in seconds, or None
+    for no limit).
+    The name of the solver to use (one of the keys of SOLVERS).
+    The symmetry the known values should have (one of the keys of
+    SudokuGeometry.SYMMETRY_GROUPS, or None for no symmetry).
+    A solved puzzle to build the solution from (optional).
+    A SolutionCountCache to look up and store solution counts in (optional).
+    A threading.Event that cancels the search when it is set (optional).
+    The maximum number of nodes all of the searches can visit together
+    (optional, see SearchBudget).
+    A seed or a random.Random object for the random numbers (optional, see
+    _getRandom).
+    The number of rows (and columns) of squares in each box of the puzzle
+    (defaults to 3, for a 9x9 puzzle).  If a seedGrid is given, the puzzle is
+    the same size as the seedGrid instead.
+    The most solutions to start from when looking for a puzzle with a single
+    solution (defaults to 25).
+    If an exception should be raised when a puzzle with a single solution
+    could not be made (defaults to False).
 
     Generates a valid Sudoku puzzle using a backtracking recursive
     algorithm.
@@ -217,184 +767,400 @@ def getHardPuzzle(numKnownValues, blankValue = 0, attemptUniqueSolution = True,
     exception is raised.
 
     If attemptUniqueSolution is True, a unique puzzle is attempted to be
-    generated, however if time runs out, the puzzle is not gaurenteed to have
-    a unique solution.
+    generated.  Values are removed from a solution one at a time as long as
+    the puzzle keeps a single solution, but with few known values (fewer than
+    about 25 in a 9x9 puzzle) every value left often becomes essential before
+    numKnownValues is reached.  When that happens, we start again from a new
+    solution, up to maxAttempts solutions.  If none of them reach
+    numKnownValues, or time runs out, the extra values are removed without
+    checking, so the puzzle is not gaurenteed to have a unique solution.  Set
+    requireUnique to True to get an exception instead.
+
+    If a symmetry is given, values are removed in whole symmetry groups (pairs
+    or groups of 4 squares that mirror or rotate onto each other), with a
+    single check of the solutions for each group.  If numKnownValues cannot
+    be reached using whole groups, the last few values are removed one at a
+    time, so the layout may not be perfectly symmetric.
+
+    If a seedGrid is given, the solution is a random transformation of it (see
+    transformPuzzle) rather than a new grid found by the solver.  This skips
+    the slowest part of making a solution, but every solution made from the
+    same seedGrid is one of its transformations.
+
+    If the cancelEvent is set (for example from another thread), the search
+    stops as soon as it next checks the time, and an exception is raised.
+
+    Running out of nodes is treated the same as running out of time.  Unlike
+    time, the number of nodes does not depend on how busy the machine is, so
+    with a seed the same puzzle is made every time.
+
+    Larger puzzles take a lot longer to make.  The "mrv", "iterative" and
+    "dlx" solvers can make 16x16 puzzles in well under a second and 25x25
+    puzzles in a few seconds, but checking every removed value of a 25x25
+    puzzle for a unique solution can take a lot longer than that.
 
     Returns both the solved puzzle, as well as an unsolved puzzle (both as
     a Sudoku Board object).
     '''
-    #Calculate when our end time is.
-    endTime = time.time() + maxDuration
+    #Look up the functions of the solver we were asked to use.
+    if solver not in SOLVERS:
+        raise Exception(f"Sudoku Generator - getHardPuzzle: unknown solver ({solver}).")
+    getPuzzle, getNumSolutions = SOLVERS[solver]
+
+    if symmetry != None and symmetry not in SYMMETRY_GROUPS:
+        raise Exception(f"Sudoku Generator - getHardPuzzle: unknown symmetry ({symmetry}).")
+
+    if seedGrid != None:
+        validatePuzzleObject(seedGrid)
+        boxSize = seedGrid.boxSize
+    geometry = getGeometry(boxSize)
+    numCells = geometry.numCells
+
+    #First validate that numKnownValue is at between 0 and the number of
+    #squares (81 in a 9x9 puzzle).
+    if numKnownValues < 0:
+        numKnownValues = 0
+    elif numKnownValues > numCells:
+        numKnownValues = numCells
+
+    #The budget is shared by every search, so it limits the whole function.
+    budget = SearchBudget(maxDuration, cancelEvent, maxNodes)
+    #Every random choice comes from the same generator, so the same seed
+    #always gives the same puzzle (as long as the budget does not run out).
+    rng = _getRandom(seed)
     
-    #Get a soon to be solved puzzle.
-    solvedPuzzle = SudokuBoard()
+    if seedGrid != None and not isSolved(seedGrid):
+        raise Exception("Sudoku Generator - getHardPuzzle: the seed grid is not solved.")
+
+    #Removing values from a solution in a random order does not always reach
+    #numKnownValues: sometimes every value left is essential first.  When that
+    #happens we start again from a new solution (while there is budget left),
+    #keeping the attempt that got closest in case none of them make it.
+    numValuesToRemove = numCells - numKnownValues
+    bestSolvedPuzzle = None
+    bestPuzzle = None
+    bestNumValuesRemoved = -1
+    for attempt in range(max(maxAttempts, 1) if attemptUniqueSolution else 1):
+        if attempt > 0 and budget.isExpired():
+            break
+
+        if seedGrid != None:
+            #Shuffle the given solved puzzle into a new one.
+            solvedPuzzle = transformPuzzle(seedGrid, rng)
+        else:
+            #Get a soon to be solved puzzle.
+            solvedPuzzle = SudokuBoard(blankValue, boxSize = boxSize)
+
+            #Get a fully solved and valid puzzle.
+            getPuzzle(solvedPuzzle, blankValue, budget, rng)
+
+        if budget.isCancelled():
+            raise Exception("Sudoku Generator - getHardPuzzle: cancelled.")
+
+        #Check that the puzzle is fully solved.  If the first one is not, raise
+        #an exception.  If a later one is not, we ran out of budget, so use the
+        #best attempt so far.
+        if not isSolved(solvedPuzzle):
+            if attempt > 0:
+                break
 
-    #Get a fully solved and valid puzzle.
-    _getRecursivePuzzle(solvedPuzzle, blankValue, endTime)
+            #Only mention the limits that were actually set.
+            limits = []
+            if maxDuration != None:
+                limits.append(f"{maxDuration} seconds")
+            if maxNodes != None:
+                limits.append(f"{maxNodes} nodes")
+            within = f" within {' and '.join(limits)}" if len(limits) > 0 else ""
+            raise Exception(f"Sudoku Generator - getHardPuzzle: unable to generate a puzzle{within}.")
+
+        #Now take our solved puzzle and remove moves from it until we only have
+        #numKnownValues squares left filled in the puzzle.  If we are trying to
+        #force a unique solution we will use the solver to check if removing a
+        #number keeps the solution unique.
+        puzzle = solvedPuzzle.getCopy()
+        numValuesRemoved = 0
+        if attemptUniqueSolution:
+            numValuesRemoved = _removeValues(puzzle, numValuesToRemove, blankValue, budget, getNumSolutions,
+                                             _getRemovalGroups(symmetry, geometry), cache, rng)
+
+        if budget.isCancelled():
+            raise Exception("Sudoku Generator - getHardPuzzle: cancelled.")
+
+        if numValuesRemoved > bestNumValuesRemoved:
+            bestSolvedPuzzle = solvedPuzzle
+            bestPuzzle = puzzle
+            bestNumValuesRemoved = numValuesRemoved
+
+        if numValuesRemoved == numValuesToRemove:
+            break
+
+    solvedPuzzle = bestSolvedPuzzle
+    puzzle = bestPuzzle
+    if bestNumValuesRemoved != numValuesToRemove:
+        if attemptUniqueSolution and requireUnique:
+            raise Exception(f"Sudoku Generator - getHardPuzzle: unable to make a puzzle with {numKnownValues} known values and a single solution (the closest had {numCells - bestNumValuesRemoved}).")
+
+        #If either we have run out of time, every remaining square was
+        #essential in every attempt, or we were never looking for a unique
+        #solution, remove values from the puzzle until we have the correct
+        #number of known starting values.
+        puzzle = _getAnyUnsolvedPuzzle(puzzle, numKnownValues, blankValue, symmetry, rng)
 
-    #Check that the puzzle is fully solved.  If it is not, raise an exception.
-    if not isSolved(solvedPuzzle):
-        print(getPuzzleAsString(solvedPuzzle))
-        raise Exception(f"Sudoku Generator - getHardPuzzle: unable to generate a puzzle in {maxDuration} seconds.")
+    #Return both the solved and unsolved puzzle.
+    return solvedPuzzle, puzzle
 
-    #Now take our solved puzzle and remove moves from it until we only have
-    #numKnownValues squares left filled in the puzzle.  If we are trying to
-    #force a unique solution we will use an our backtracking recursive function
-    #to check if removing a number makes the solution unique.
+def _removeValues(puzzle, numValuesToRemove, blankValue, budget, getNumSolutions, groups, cache, rng):
+    '''
+    Given:
+    A solved puzzle (a SudokuBoard object) to remove values from.
+    The number of values to remove.
+    The value of the unsolved squares in the puzzle.
+    The budget of the search.
+    The function of the solver that counts solutions (see SOLVERS).
+    The groups of squares that must be removed together (see
+    _getRemovalGroups).
+    A SolutionCountCache to look up and store solution counts in (or None).
+    The random number generator to use.
+
+    Removes values from the puzzle while it keeps a single solution, until
+    numValuesToRemove values are removed, every group left is essential, or
+    the budget runs out.
+
+    Returns the number of values that were removed.
+    '''
+    #Try to remove each group of squares once, in a random order.  Without a
+    #symmetry each group is a single square.  If removing a group gives the
+    #puzzle more than 1 solution, that group is essential.  Removing more
+    #squares can never make the solution unique again, so an essential group
+    #never needs to be tried a second time, and we check the solutions of the
+    #puzzle at most once per group.
     numValuesRemoved = 0
-    puzzle = solvedPuzzle.getCopy()
-    if attemptUniqueSolution:
-        #While we have not removed enough values from the solved puzzle.
-        while numValuesRemoved != (81 - numKnownValues):
-            #Check that we are not out of time.  If we are, break from the
-            #loop.
-            if _isOutOfTime(endTime):
-                break
+    groups = list(groups)
+    rng.shuffle(groups)
+    for group in groups:
+        #Stop once we have removed enough values, or we are out of time.
+        if numValuesRemoved == numValuesToRemove or budget.isExpired():
+            break
+
+        #Skip groups that would take us past the number of values we want to
+        #remove.
+        if numValuesRemoved + len(group) > numValuesToRemove:
+            continue
 
-            #A slight hack to allow us to pass an integer by ref, we are
-            #wrapping it in a list (which is passed by ref as we want).
-            numSolutions = [0]
-            maxSolutions = 2
+        #Set the value of the squares to blankValue and check if the puzzle
+        #has a single unique solution.  Make sure to store the values of the
+        #squares in case we need to change them back.
+        oldValues = [puzzle.getValue(key) for key in group]
+        for key in group:
+            puzzle.setValue(key, blankValue)
+        numSolutions, status = _countSolutions(puzzle, blankValue, budget, getNumSolutions, 2, cache, rng)
+
+        #If we ran out of time while counting, we cannot trust the count, so
+        #put the values back and stop.
+        if status == TIMED_OUT:
+            _restoreSquares(puzzle, group, oldValues)
+            break
+
+        #If there is more than 1 solution, the group is essential, so set it
+        #back to its values and move on to the next group.
+        if numSolutions > 1:
+            _restoreSquares(puzzle, group, oldValues)
+            continue
 
-            #Pick a random square in the grid to remove the value of.
-            ranRow = random.randint(0, 8)
-            ranCol = random.randint(0, 8)
+        #At this point we have removed values from the puzzle and still have a
+        #unique solution.  We just want to increase the counter of how many
+        #values we have removed.
+        numValuesRemoved += len(group)
 
-            #If the randomly chosen square has already had its value removed,
-            #continue and choose a different square.
-            if puzzle.map[(ranRow, ranCol)] == blankValue:
-                continue
+    return numValuesRemoved
 
-            #Set the value of the square to blankValue and check if the puzzle
-            #has a single unique solution.  Make sure to store the value of the
-            #square in case we need to change it back.
-            oldValue = puzzle.map[(ranRow, ranCol)]
-            puzzle.setValue((ranRow, ranCol), blankValue)
-
-            #Now check how many solutions the puzzle has.
-            _getRecursiveNumSolutions(puzzle.getCopy(), blankValue, endTime, numSolutions, maxSolutions)
+def _getRemovalGroups(symmetry, geometry):
+    '''
+    Given:
+    The name of a symmetry (one of the keys of SudokuGeometry.SYMMETRY_GROUPS,
+    or None for no symmetry).
+    The Geometry of the puzzle (see SudokuGeometry).
 
-            #If there is more than 1 solution, set the square back to its
-            #value, and continue the loop to try a new square.
-            if numSolutions[0] > 1:
-                puzzle.setValue((ranRow, ranCol), oldValue)
-                continue
+    Returns a list of the groups of squares that must be removed together to
+    keep the symmetry.  Each group is a tuple of keys (x, y).  With no
+    symmetry, each square is in a group of its own.
+    '''
+    cellKeys = geometry.cellKeys
+    if symmetry == None:
+        return [(key,) for key in cellKeys]
 
-            #At this point we have removed a value from the puzzle and still
-            #have a unique solution.  We just want to increase the counter of
-            #how many values we have removed.
-            numValuesRemoved += 1
+    return [tuple(cellKeys[i] for i in group) for group in geometry.symmetryGroups[symmetry]]
 
-    if numValuesRemoved != numKnownValues:
-        #If either we have run out of time, to use our backtracking function or
-        #we were never lookking for a unique solution, remove values from the
-        #puzzle until we have the correct number of known starting values.
-        puzzle = _getAnyUnsolvedPuzzle(puzzle, numKnownValues, blankValue)
+def _restoreSquares(puzzle, squares, values):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    A list of keys (x, y) of squares in the puzzle.
+    A list of the values to put back into those squares.
 
-    #Return both the solved and unsolved puzzle.
-    return solvedPuzzle, puzzle
+    Sets each of the squares back to its value.
+    '''
+    for i in range(len(squares)):
+        puzzle.setValue(squares[i], values[i])
 
-def _isOutOfTime(maxTime):
+def _countSolutions(puzzle, blankValue, budget, getNumSolutions, maxSolutions, cache = None, rng = random):
     '''
     Given:
-    A number of seconds since the epoch.
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle.
+    The SearchBudget of the search.
+    The function of a solver that counts solutions (see SOLVERS).
+    An integer of the maximum number of solutions to look for.
+    A SolutionCountCache (optional).
+    The random number generator of the search (defaults to the random module).
 
-    Returns true if the number of seconds has passed.
-    Returns false if the number of seconds has not passed.
-    '''
-    return time.time() >= maxTime
+    Fills in the squares of the puzzle that are forced (see propagate).  If
+    that fills in every square, the solution is unique and there is no need to
+    search.  Otherwise, getNumSolutions is used to count the solutions.  The
+    puzzle is put back the way it was before returning, so there is no need
+    to copy it first.
 
-def _getRecursiveNumSolutions(puzzle, blankValue, maxTime, numSolutions, maxSolutions):
+    If a cache is given, the count is looked up in it first, and stored in it
+    afterwards (unless we ran out of time, in which case the count may be
+    wrong).
+
+    Returns a tuple of (the number of solutions found (at most maxSolutions),
+    the status of the search (see FOUND)).
+    '''
+    if cache != None:
+        key = cache.getKey(puzzle, blankValue, maxSolutions)
+        cachedNumSolutions = cache.get(key)
+        if cachedNumSolutions != None:
+            return cachedNumSolutions, FOUND if cachedNumSolutions >= maxSolutions else EXHAUSTED
+
+    numSolutions = [0]
+    status = EXHAUSTED
+    filledSquares = []
+    if propagate(puzzle, blankValue, filledSquares) != -1:
+        if puzzle.getNumFilled() != puzzle.numCells:
+            status = getNumSolutions(puzzle, blankValue, budget, numSolutions, maxSolutions, rng)
+        elif puzzle.isComplete():
+            numSolutions[0] = 1
+            if numSolutions[0] >= maxSolutions:
+                status = FOUND
+
+    _clearSquares(puzzle, filledSquares, blankValue)
+
+    if cache != None and status != TIMED_OUT:
+        cache.put(key, numSolutions[0])
+
+    return numSolutions[0], status
+
+def _getRecursiveNumSolutions(puzzle, blankValue, budget, numSolutions, maxSolutions, rng = random):
     '''
     Given:
     A solved puzzle (a SudokuBoard object).
     The value of the unsolved squares in the puzzle
-    A maximum number of seconds since the epoch.
+    The SearchBudget of the search.
     A list of a single integer (so that it can be passed by ref).
     An integer of the maximum number of solutions to look for.
+    The random number generator to use (defaults to the random module).
 
     Attempts to solve a given sudoku board.  Each time a soltion is found, the
     integer inside of numSolutions is increased by 1.  If either maxSolutions
-    are found or, maxTime is reached, the function stops.
+    are found or, the budget is spent, the function stops.
 
     Uses the same type of recusive logic as is used to generate the puzzle.
+    Every square that this function changes is set back to blankValue before
+    it returns.
 
-    Returns no actual data, but changes the integer within the numSolutions
-    list.
+    Returns FOUND if maxSolutions were found, TIMED_OUT if the budget ran out,
+    or EXHAUSTED if every possibility was tried.  The number of solutions
+    found is stored in the numSolutions list.
     '''
     #Make sure we are working on a valid sudoku object.
     validatePuzzleObject(puzzle)
-    #Because this function is recursive, we want to start by checking if we are
-    #out of time.
-    if _isOutOfTime(maxTime):
-        return True
+    #Each call of this function is a node of the search, so count it against
+    #the budget.
+    if budget.tick():
+        return TIMED_OUT
 
     #Next check if we have already found the maximum number of solutions that
     #we are looking for.
     if numSolutions[0] >= maxSolutions:
-        return True
+        return FOUND
+
+    #Fill in any squares whose values are forced before we start guessing.
+    #If that shows the puzzle cannot be solved, there are no solutions here.
+    filledSquares = []
+    if propagate(puzzle, blankValue, filledSquares) == -1:
+        _clearSquares(puzzle, filledSquares, blankValue)
+        return EXHAUSTED
 
     #Loop through all squares in the grid.
-    for i in range(81):
+    size = puzzle.size
+    for i in range(puzzle.numCells):
         #Get the current row and column of our puzzle.
-        row = i // 9
-        column = i % 9
+        row = i // size
+        column = i % size
 
         #If the value of the square is not a blank value, continue to the next
         #square.
-        if puzzle.map[(row, column)] != blankValue:
+        if puzzle.getValue((row, column)) != blankValue:
             continue
 
         #Get the possible moves that can be at the sqaure.
         possibleValues = getValidMovesAt(puzzle, row, column)
         
         #Shuffle the list of possible moves.
-        random.shuffle(possibleValues)
+        rng.shuffle(possibleValues)
 
         #For each possible move, set the value of the square to the value and
-        #check if the puzzle is solved.  If it is, we are done.  If not, see if
-        #calling this function 1 more time will solve the puzzle.  If it will,
-        #again we are done.  If not, set the value of the sqaure to a different
-        #possible value, and try the entire recursive logic again.
+        #check if the puzzle is solved.  If it is, we have found a solution.
+        #If not, call this function again to count the solutions of the rest
+        #of the puzzle.  Unlike when generating a puzzle, we keep going after a
+        #solution is found, as we want to know if there are any others.
         for value in possibleValues:
-            #Because of how this recursive function works, this block of code
-            #can be executed after we have run out of time, so it is important
-            #to check if we have run out of time at the start of each iteration
-            #of this loop.
-            if _isOutOfTime(maxTime):
-                return True
-
             #Set the value of the sqaure to a valid value and then look at the
             #puzzle as a whole.
             puzzle.setValue((row, column), value)
 
             #Check if the puzzle is completly solved.
-            if isSolved(puzzle):
+            if puzzle.isComplete():
                 #If the puzzle is solved, increase the number of solutions
                 #found by 1.
                 numSolutions[0] += 1
-                return True
             else:
-                #Otherwise, call this function to continue trying to generate
-                #the puzzle.  If 1 more call of the function completes the 
-                #puzzle then we are done.  Otherwise, try a different valid
-                #value in the sqaure.
-                #print(getPuzzleAsString(puzzle))
-                if _getRecursivePuzzle(puzzle, blankValue, maxTime):
-                    numSolutions[0] += 1
-                    return True
-
-        #If this square has no valid moves, then set this square to a blank
-        #value and return False.
+                status = _getRecursiveNumSolutions(puzzle, blankValue, budget, numSolutions, maxSolutions, rng)
+                if status != EXHAUSTED:
+                    #The rest of the puzzle stopped the search early, so we
+                    #stop as well.
+                    puzzle.setValue((row, column), blankValue)
+                    _clearSquares(puzzle, filledSquares, blankValue)
+                    return status
+
+            #If we have now found the maximum number of solutions, stop.
+            if numSolutions[0] >= maxSolutions:
+                puzzle.setValue((row, column), blankValue)
+                _clearSquares(puzzle, filledSquares, blankValue)
+                return FOUND
+
+        #We have tried every value in this square, so set this square (and any
+        #squares filled in by propagate) back to a blank value and return.
         puzzle.setValue((row, column), blankValue) 
-        return False
+        _clearSquares(puzzle, filledSquares, blankValue)
+        return EXHAUSTED
+
+    #If there are no blank squares, the puzzle is its own only solution (as
+    #long as it is solved).
+    if puzzle.isComplete():
+        numSolutions[0] += 1
 
-def _getRecursivePuzzle(puzzle, blankValue, maxTime):
+    _clearSquares(puzzle, filledSquares, blankValue)
+    return FOUND if numSolutions[0] >= maxSolutions else EXHAUSTED
+
+def _getRecursivePuzzle(puzzle, blankValue, budget, rng = random):
     '''
     Given:
     A solved puzzle (a SudokuBoard object).
     The value of the unsolved squares in the puzzle
-    A maximum number of seconds since the epoch.
+    The SearchBudget of the search.
+    The random number generator to use (defaults to the random module).
 
     Uses a backtracking recursive algorithm to generate a legal Sudoku puzzle.
     First it looks for the first unsolved square in the puzzle and then tries
@@ -404,33 +1170,42 @@ def _getRecursivePuzzle(puzzle, blankValue, maxTime):
     then backtracks by setting the square that it is looking at to a blank
     value.
 
-    Returns value does not contain information.
+    Returns FOUND if the puzzle was solved, EXHAUSTED if it has no solution,
+    or TIMED_OUT if the budget ran out (the puzzle is left part way filled).
     Changes the SudokuBoard object that is passed by reference into this
     function.
     '''
     #Make sure we are working on a valid sudoku object.
     validatePuzzleObject(puzzle)
-    #Because this function is recursive, we want to start by checking if we are
-    #out of time.
-    if _isOutOfTime(maxTime):
-        return True
+    #Each call of this function is a node of the search, so count it against
+    #the budget.
+    if budget.tick():
+        return TIMED_OUT
+
+    #Fill in any squares whose values are forced before we start guessing.
+    #If that shows the puzzle cannot be solved, undo it and backtrack.
+    filledSquares = []
+    if propagate(puzzle, blankValue, filledSquares) == -1:
+        _clearSquares(puzzle, filledSquares, blankValue)
+        return EXHAUSTED
 
     #Loop through all squares in the grid.
-    for i in range(81):
+    size = puzzle.size
+    for i in range(puzzle.numCells):
         #Get the current row and column of our puzzle.
-        row = i // 9
-        column = i % 9
+        row = i // size
+        column = i % size
 
         #If the value of the square is not a blank value, continue to the next
         #square.
-        if puzzle.map[(row, column)] != blankValue:
+        if puzzle.getValue((row, column)) != blankValue:
             continue
 
         #Get the possible moves that can be at the sqaure.
         possibleValues = getValidMovesAt(puzzle, row, column)
         
         #Shuffle the list of possible moves.
-        random.shuffle(possibleValues)
+        rng.shuffle(possibleValues)
 
         #For each possible move, set the value of the square to the value and
         #check if the puzzle is solved.  If it is, we are done.  If not, see if
@@ -438,133 +1213,842 @@ def _getRecursivePuzzle(puzzle, blankValue, maxTime):
         #again we are done.  If not, set the value of the sqaure to a different
         #possible value, and try the entire recursive logic again.
         for value in possibleValues:
-            #Because of how this recursive function works, this block of code
-            #can be executed after we have run out of time, so it is important
-            #to check if we have run out of time at the start of each iteration
-            #of this loop.
-            if _isOutOfTime(maxTime):
-                return True
-
             #Set the value of the sqaure to a valid value and then look at the
             #puzzle as a whole.
             puzzle.setValue((row, column), value)
 
             #Check if the puzzle is completly solved.
-            if isSolved(puzzle):
+            if puzzle.isComplete():
                 #If the puzzle is solved, we are done.
-                return True
-            else:
-                #Otherwise, call this function to continue trying to generate
-                #the puzzle.  If 1 more call of the function completes the 
-                #puzzle then we are done.  Otherwise, try a different valid
-                #value in the sqaure.
-                #print(getPuzzleAsString(puzzle))
-                if _getRecursivePuzzle(puzzle, blankValue, maxTime):
-                    return True
-
-        #If this square has no valid moves, then set this square to a blank
-        #value and return False.
+                return FOUND
+
+            #Otherwise, call this function to continue trying to generate the
+            #puzzle.  If 1 more call of the function completes the puzzle (or
+            #runs out of budget) then we are done.  Otherwise, try a different
+            #valid value in the sqaure.
+            status = _getRecursivePuzzle(puzzle, blankValue, budget, rng)
+            if status != EXHAUSTED:
+                return status
+
+        #If this square has no valid moves, then set this square (and any
+        #squares filled in by propagate) to a blank value and backtrack.
         puzzle.setValue((row, column), blankValue) 
-        return False
+        _clearSquares(puzzle, filledSquares, blankValue)
+        return EXHAUSTED
+
+    #There are no blank squares left (propagate filled them all in), so we
+    #are done as long as the puzzle is solved.
+    if puzzle.isComplete():
+        return FOUND
+
+    _clearSquares(puzzle, filledSquares, blankValue)
+    return EXHAUSTED
+
+def propagate(puzzle, blankValue = 0, filledSquares = None):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle (optional).
+    A list to add the key (x, y) of each square that gets filled to (optional).
+
+    Fills in every square whose value is forced, using 2 simple rules over and
+    over until neither of them can fill any more squares:
+        Naked single - a blank square with only 1 valid value.
+        Hidden single - a value that only fits in 1 blank square of a row,
+        column, or 3x3 box.
+
+    Returns the number of squares that were filled, or -1 if the puzzle has a
+    contradiction (a blank square with no valid values, or a value that does
+    not fit anywhere in a row, column, or 3x3 box).  When there is a
+    contradiction, the squares filled so far are left filled in, so pass in
+    filledSquares if you need to undo them.
+    '''
+    #Make sure we are working on a valid sudoku object.
+    validatePuzzleObject(puzzle)
+
+    geometry = puzzle.geometry
+    cellKeys = geometry.cellKeys
+    units = geometry.units
+
+    numFilled = 0
+    madeProgress = True
+    while madeProgress:
+        madeProgress = False
 
-def getEasyPuzzle(numKnownValues, blankValue = 0):
+        #First fill every naked single.
+        values = puzzle.getValues()
+        for i in range(geometry.numCells):
+            if values[i] != blankValue:
+                continue
+
+            row, column = cellKeys[i]
+            mask = puzzle.getCandidateMask(row, column)
+            if mask == 0:
+                return -1
+
+            #A mask with only 1 bit set is a single value (the number of the
+            #bit).
+            if mask & (mask - 1) == 0:
+                puzzle.setValue((row, column), mask.bit_length())
+                if filledSquares != None:
+                    filledSquares.append((row, column))
+                numFilled += 1
+                madeProgress = True
+
+        #Next fill every hidden single.
+        values = puzzle.getValues()
+        for unit in range(geometry.numUnits):
+            #Work out which values are valid in at least 1, and in at least 2
+            #of the blank squares of the unit.
+            seenOnce = 0
+            seenTwice = 0
+            for i in units[unit]:
+                if values[i] == blankValue:
+                    mask = puzzle.getCandidateMask(*cellKeys[i])
+                    seenTwice |= seenOnce & mask
+                    seenOnce |= mask
+
+            #Every value that is not yet in the unit must fit somewhere.
+            missing = geometry.allValuesMask & ~puzzle.getUnitMask(unit)
+            if missing & ~seenOnce:
+                return -1
+
+            #Place each value that only fits in 1 square of the unit.
+            for value in getMaskValues(seenOnce & ~seenTwice):
+                for i in units[unit]:
+                    row, column = cellKeys[i]
+                    if puzzle.getValue((row, column)) == blankValue and puzzle.getCandidateMask(row, column) & (1 << (value - 1)):
+                        break
+                else:
+                    #The only square this value fitted in was just given a
+                    #different value.
+                    return -1
+
+                puzzle.setValue((row, column), value)
+                if filledSquares != None:
+                    filledSquares.append((row, column))
+                numFilled += 1
+                madeProgress = True
+
+            if madeProgress:
+                values = puzzle.getValues()
+
+    return numFilled
+
+def _clearSquares(puzzle, squares, blankValue):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    A list of keys (x, y) of squares in the puzzle.
+    The value of the unsolved squares in the puzzle.
+
+    Sets each of the squares back to blankValue (used to undo propagate).
+    '''
+    for key in squares:
+        puzzle.setValue(key, blankValue)
+
+def _getMostConstrainedSquare(puzzle, blankValue):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle.
+
+    Finds the blank square that has the fewest valid values (the most
+    constrained square).  If a blank square with no valid values is found, it
+    is returned straight away, as the puzzle cannot be solved.
+
+    Returns a tuple of the (row, column, candidate mask) of the square, or None
+    if the puzzle has no blank squares.
+    '''
+    #A full board has no blank squares, so there is no need to look.
+    geometry = puzzle.geometry
+    if puzzle.getNumFilled() == geometry.numCells and blankValue not in geometry.valueBits:
+        return None
+
+    size = geometry.size
+    values = puzzle.getValues()
+    bestSquare = None
+    bestCount = size + 1
+    for i in range(geometry.numCells):
+        if values[i] != blankValue:
+            continue
+
+        row = i // size
+        column = i % size
+        mask = puzzle.getCandidateMask(row, column)
+        count = _getNumMaskValues(mask)
+        if count < bestCount:
+            bestSquare = (row, column, mask)
+            bestCount = count
+            #A square with 0 values is a dead end, and a square with 1 value
+            #cannot be beaten, so there is no need to keep looking.
+            if count <= 1:
+                break
+
+    return bestSquare
+
+def _getMRVPuzzle(puzzle, blankValue, budget, rng = random):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle
+    The SearchBudget of the search.
+    The random number generator to use (defaults to the random module).
+
+    Uses the same backtracking recursive algorithm as _getRecursivePuzzle,
+    except that instead of filling the first blank square, it fills the blank
+    square with the fewest valid values (the minimum remaining values
+    heuristic).  As soon as any blank square has no valid values, it
+    backtracks.
+
+    Returns FOUND if the puzzle was solved, EXHAUSTED if it has no solution,
+    or TIMED_OUT if the budget ran out (the puzzle is left part way filled).
+    Changes the SudokuBoard object that is passed by reference into this
+    function.
+    '''
+    #Make sure we are working on a valid sudoku object.
+    validatePuzzleObject(puzzle)
+    #Each call of this function is a node of the search, so count it against
+    #the budget.
+    if budget.tick():
+        return TIMED_OUT
+
+    #Fill in any squares whose values are forced before we start guessing.
+    filledSquares = []
+    if propagate(puzzle, blankValue, filledSquares) == -1:
+        _clearSquares(puzzle, filledSquares, blankValue)
+        return EXHAUSTED
+
+    square = _getMostConstrainedSquare(puzzle, blankValue)
+
+    #If there are no blank squares left, we are done as long as the puzzle is
+    #solved.
+    if square == None:
+        if puzzle.isComplete():
+            return FOUND
+        _clearSquares(puzzle, filledSquares, blankValue)
+        return EXHAUSTED
+
+    row, column, mask = square
+
+    #Try each valid value of the square in a random order.  A square with no
+    #valid values skips the loop, and we backtrack straight away.
+    possibleValues = list(getMaskValues(mask))
+    rng.shuffle(possibleValues)
+    for value in possibleValues:
+        puzzle.setValue((row, column), value)
+        status = _getMRVPuzzle(puzzle, blankValue, budget, rng)
+        if status != EXHAUSTED:
+            return status
+
+    #None of the values worked, so set this square (and any squares filled in
+    #by propagate) back to a blank value.
+    puzzle.setValue((row, column), blankValue)
+    _clearSquares(puzzle, filledSquares, blankValue)
+    return EXHAUSTED
+
+def _getMRVNumSolutions(puzzle, blankValue, budget, numSolutions, maxSolutions, rng = random):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle
+    The SearchBudget of the search.
+    A list of a single integer (so that it can be passed by ref).
+    An integer of the maximum number of solutions to look for.
+    The random number generator (not used, as the values of each square are
+    always tried in order).
+
+    Counts the solutions of the puzzle the same way _getRecursiveNumSolutions
+    does, but always branches on the blank square with the fewest valid values
+    (see _getMRVPuzzle).  Every square that this function changes is set back
+    to blankValue before it returns.
+
+    Returns FOUND if maxSolutions were found, TIMED_OUT if the budget ran out,
+    or EXHAUSTED if every possibility was tried.  The number of solutions
+    found is stored in the numSolutions list.
+    '''
+    #Make sure we are working on a valid sudoku object.
+    validatePuzzleObject(puzzle)
+    if budget.tick():
+        return TIMED_OUT
+
+    if numSolutions[0] >= maxSolutions:
+        return FOUND
+
+    #Fill in any squares whose values are forced before we start guessing.
+    filledSquares = []
+    if propagate(puzzle, blankValue, filledSquares) == -1:
+        _clearSquares(puzzle, filledSquares, blankValue)
+        return EXHAUSTED
+
+    square = _getMostConstrainedSquare(puzzle, blankValue)
+
+    #If there are no blank squares left, we have found a solution (as long as
+    #the puzzle is solved).
+    if square == None:
+        if puzzle.isComplete():
+            numSolutions[0] += 1
+        _clearSquares(puzzle, filledSquares, blankValue)
+        return FOUND if numSolutions[0] >= maxSolutions else EXHAUSTED
+
+    row, column, mask = square
+    status = EXHAUSTED
+    for value in getMaskValues(mask):
+        puzzle.setValue((row, column), value)
+        status = _getMRVNumSolutions(puzzle, blankValue, budget, numSolutions, maxSolutions, rng)
+        if status != EXHAUSTED:
+            break
+
+    puzzle.setValue((row, column), blankValue)
+    _clearSquares(puzzle, filledSquares, blankValue)
+    return status
+
+def _iterativeSearch(puzzle, blankValue, budget, numSolutions, maxSolutions, rng):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object) that follows the rules of sudoku.
+    The value of the unsolved squares in the puzzle
+    The SearchBudget of the search.
+    A list of a single integer (so that it can be passed by ref).
+    An integer of the maximum number of solutions to look for.
+    A random number generator to shuffle the values of each square with, or
+    None to try them in order.
+
+    Backtracking search without recursion.  Instead of a call per square, a
+    trail keeps a [key, values left to try] entry for every square that has
+    been filled.  Each step fills the blank square with the fewest valid values
+    (see _getMostConstrainedSquare).  When a square has no valid values, or a
+    solution has been found, the search backtracks by giving the square at the
+    top of the trail its next value, removing entries that have no values left
+    (and setting their squares back to blankValue).
+
+    Because every value placed comes from the candidate mask of the square,
+    the puzzle can never break the rules, so a puzzle with no blank squares
+    left is always a solution.  Each step is a node of the search.
+
+    Returns a tuple of (the status of the search (see FOUND), the trail).  If
+    the search stopped because maxSolutions were found, the puzzle is left
+    filled in with the last solution, and the trail lists the squares that
+    were filled.
+    '''
+    trail = []
+    while True:
+        if budget.tick():
+            return TIMED_OUT, trail
+
+        square = _getMostConstrainedSquare(puzzle, blankValue)
+        if square == None:
+            #Every square is filled, so this is a solution.
+            numSolutions[0] += 1
+            if numSolutions[0] >= maxSolutions:
+                return FOUND, trail
+        elif square[2] != 0:
+            #Add the square to the trail, with all of its values to try.
+            row, column, mask = square
+            values = list(getMaskValues(mask))
+            if rng != None:
+                rng.shuffle(values)
+            trail.append([(row, column), values])
+
+        #Give the square at the top of the trail its next value, backtracking
+        #past any squares that have run out of values.
+        while len(trail) > 0:
+            key, values = trail[-1]
+            if len(values) > 0:
+                puzzle.setValue(key, values.pop())
+                break
+
+            puzzle.setValue(key, blankValue)
+            trail.pop()
+        else:
+            #The trail is empty, so every possibility has been tried.
+            return EXHAUSTED, trail
+
+def _getIterativePuzzle(puzzle, blankValue, budget, rng = random):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle
+    The SearchBudget of the search.
+    The random number generator to use (defaults to the random module).
+
+    Fills in the puzzle with a random solution, the same way as _getMRVPuzzle,
+    but using the non recursive search of _iterativeSearch.
+
+    Returns FOUND if the puzzle was solved, EXHAUSTED if it has no solution,
+    or TIMED_OUT if the budget ran out (the puzzle is left part way filled).
+    Changes the SudokuBoard object that is passed by reference into this
+    function.
+    '''
+    #Make sure we are working on a valid sudoku object.
+    validatePuzzleObject(puzzle)
+
+    #The search relies on the puzzle following the rules to begin with.
+    if not isValidPuzzle(puzzle, blankValue):
+        return EXHAUSTED
+
+    status, trail = _iterativeSearch(puzzle, blankValue, budget, [0], 1, rng)
+    return status
+
+def _getIterativeNumSolutions(puzzle, blankValue, budget, numSolutions, maxSolutions, rng = random):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle
+    The SearchBudget of the search.
+    A list of a single integer (so that it can be passed by ref).
+    An integer of the maximum number of solutions to look for.
+    The random number generator (not used, as the values of each square are
+    always tried in order).
+
+    Counts the solutions of the puzzle the same way as
+    _getRecursiveNumSolutions, but using the non recursive search of
+    _iterativeSearch.  Every square that this function changes is set back to
+    blankValue before it returns.
+
+    Returns FOUND if maxSolutions were found, TIMED_OUT if the budget ran out,
+    or EXHAUSTED if every possibility was tried.  The number of solutions
+    found is stored in the numSolutions list.
+    '''
+    #Make sure we are working on a valid sudoku object.
+    validatePuzzleObject(puzzle)
+
+    if numSolutions[0] >= maxSolutions:
+        return FOUND
+
+    #A puzzle that already breaks the rules has no solutions.
+    if not isValidPuzzle(puzzle, blankValue):
+        return EXHAUSTED
+
+    status, trail = _iterativeSearch(puzzle, blankValue, budget, numSolutions, maxSolutions, None)
+    for key, values in trail:
+        puzzle.setValue(key, blankValue)
+
+    return status
+
+def _getDLXPuzzle(puzzle, blankValue, budget, rng = random):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle
+    The SearchBudget of the search.
+    The random number generator to use (defaults to the random module).
+
+    Fills in the puzzle with a random solution found using dancing links (see
+    SudokuDancingLinks).
+
+    Returns FOUND if the puzzle was solved, EXHAUSTED if it has no solution,
+    or TIMED_OUT if the budget ran out.
+    Changes the SudokuBoard object that is passed by reference into this
+    function.
+    '''
+    #Make sure we are working on a valid sudoku object.
+    validatePuzzleObject(puzzle)
+
+    solutions = SudokuDancingLinks.getDLXSolutions(puzzle, blankValue, 1, budget, shuffle = True, rng = rng)
+    if len(solutions) == 0:
+        return TIMED_OUT if budget.isSpent else EXHAUSTED
+
+    values = solutions[0].getValues()
+    cellKeys = puzzle.geometry.cellKeys
+    for i in range(puzzle.numCells):
+        puzzle.setValue(cellKeys[i], values[i])
+
+    return FOUND
+
+def _getDLXNumSolutions(puzzle, blankValue, budget, numSolutions, maxSolutions, rng = random):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle
+    The SearchBudget of the search.
+    A list of a single integer (so that it can be passed by ref).
+    An integer of the maximum number of solutions to look for.
+    The random number generator (not used, as counting does not need to
+    shuffle anything).
+
+    Counts the solutions of the puzzle using dancing links (see
+    SudokuDancingLinks).  The puzzle is not changed.
+
+    Returns FOUND if maxSolutions were found, TIMED_OUT if the budget ran out,
+    or EXHAUSTED if every possibility was tried.  The number of solutions
+    found is added to the numSolutions list.
+    '''
+    #Make sure we are working on a valid sudoku object.
+    validatePuzzleObject(puzzle)
+
+    if numSolutions[0] >= maxSolutions:
+        return FOUND
+
+    numSolutions[0] += SudokuDancingLinks.getDLXNumSolutions(puzzle, blankValue, maxSolutions - numSolutions[0], budget)
+    if numSolutions[0] >= maxSolutions:
+        return FOUND
+
+    return TIMED_OUT if budget.isSpent else EXHAUSTED
+
+#The solvers that getHardPuzzle can use.  Each solver is a pair of functions:
+#one that fills in a puzzle, and one that counts the solutions of a puzzle.
+#Both functions of a solver take the same parameters as _getRecursivePuzzle
+#and _getRecursiveNumSolutions (including the random number generator, which
+#every random choice must come from), and return one of FOUND, EXHAUSTED or
+#TIMED_OUT.
+#   "recursive" always fills the first blank square of the puzzle.
+#   "mrv" always fills the blank square with the fewest valid values.
+#   "iterative" fills the same squares as "mrv" without using recursion.
+#   "dlx" solves the puzzle as an exact cover problem with dancing links.
+#"recursive" is only practical for 9x9 puzzles (and smaller), as filling the
+#first blank square leaves far too many dead ends to search in a 16x16 puzzle.
+#"mrv", "iterative" and "dlx" each fill in a 25x25 puzzle in under a second.
+#"recursive" and "mrv" recurse once per blank square, which still fits in the
+#default recursion limit at 25x25 (625 squares).
+SOLVERS = {
+    "recursive": (_getRecursivePuzzle, _getRecursiveNumSolutions),
+    "mrv": (_getMRVPuzzle, _getMRVNumSolutions),
+    "iterative": (_getIterativePuzzle, _getIterativeNumSolutions),
+    "dlx": (_getDLXPuzzle, _getDLXNumSolutions),
+}
+
+def getEasyPuzzle(numKnownValues, blankValue = 0, seed = None, boxSize = 3):
     '''
     Given:
     A number of known values in the puzzle.
     The value of the unsolved squares in the puzzle (optional).
+    A seed or a random.Random object for the random numbers (optional, see
+    _getRandom).
+    The number of rows (and columns) of squares in each box of the puzzle
+    (defaults to 3, for a 9x9 puzzle).
 
     Generates a valid Sudoku puzzle using a simple pattern.
 
     Returns both the solved puzzle, as well as an unsolved puzzle (both as
     a Sudoku Board object).
     '''
-    #First validate that numKnownValue is at between 0 and 81.
+    #First validate that numKnownValue is at between 0 and the number of
+    #squares (81 in a 9x9 puzzle).
+    numCells = getGeometry(boxSize).numCells
     if numKnownValues < 0:
         numKnownValues = 0
-    elif numKnownValues > 81:
-        numKnownValues = 81
+    elif numKnownValues > numCells:
+        numKnownValues = numCells
 
     #Get a completed sudoku puzzle.  This puzzle is generated by using a simple
     #pattern.  This makes the puzzle rather easy to solve if you know the
     #pattern, or are aware how the puzzle was generated.
-    solvedPuzzle = _getSolvedPatternPuzzle(blankValue)
+    rng = _getRandom(seed)
+    solvedPuzzle = _getSolvedPatternPuzzle(blankValue, rng, boxSize)
 
     #Given our solved puzzle, get a non unique solvable puzzle by removing
     #numbers at random from the puzzle, until there are only the given number
     #of known values in the puzzle.
-    unsolvedPuzzle = _getAnyUnsolvedPuzzle(solvedPuzzle, numKnownValues, blankValue)
+    unsolvedPuzzle = _getAnyUnsolvedPuzzle(solvedPuzzle, numKnownValues, blankValue, None, rng)
 
     #Return both the solved puzzle, and the unsolved puzzle.
     return solvedPuzzle, unsolvedPuzzle
 
-def _getSolvedPatternPuzzle(blankValue):
+#The functions that generatePuzzles can use to make a puzzle, by difficulty.
+DIFFICULTIES = {
+    "hard": getHardPuzzle,
+    "easy": getEasyPuzzle,
+}
+
+def _generatePuzzleTask(numKnownValues, difficulty, taskSeed, options):
+    '''
+    Given:
+    A number of known values in the puzzle.
+    The difficulty of the puzzle (one of the keys of DIFFICULTIES).
+    The seed to use for the random numbers of this puzzle.
+    A dictionary of extra parameters for the function of the difficulty.
+
+    Generates a single puzzle for generatePuzzles.  This runs inside of a
+    worker process (or the current process when there are no workers).  The
+    puzzle gets its own random number generator seeded with taskSeed, so the
+    same seed always makes the same puzzle, no matter which worker makes it
+    or what else is running.
+
+    Returns both the solved puzzle, as well as an unsolved puzzle.
     '''
-    Generates a valid completed Sudoku puzzle using a simple pattern with a
-    random start.
+    return DIFFICULTIES[difficulty](numKnownValues, seed = random.Random(taskSeed), **options)
+
+def iterPuzzles(numKnownValues, count = None, difficulty = "hard", workers = 1, maxInFlight = None, ordered = False, seed = None, **options):
+    '''
+    Given:
+    A number of known values in each puzzle.
+    The number of puzzles to generate (defaults to no limit).
+    The difficulty of the puzzles (one of the keys of DIFFICULTIES).
+    The number of worker processes to use (defaults to 1, which generates the
+    puzzles in this process).
+    The most puzzles that can be in progress at once (defaults to twice the
+    number of workers).
+    If the puzzles should be given back in the order they were started
+    (defaults to False, which gives them back as soon as they are finished).
+    A seed (or a random.Random object) for the random numbers (optional).
+    Any other parameters of getHardPuzzle or getEasyPuzzle (optional).
+
+    Lazily generates puzzles by calling getHardPuzzle or getEasyPuzzle.  No
+    puzzle is started until it is needed: at most maxInFlight puzzles are
+    being generated (or are finished but not yet given back) at any time, and
+    a new puzzle is only started once a finished one has been taken.  So a
+    caller that is slow to take puzzles (for example, one writing them to
+    disk) slows down generation instead of puzzles building up in memory.
+
+    Each puzzle gets its own seed, taken from a random number generator seeded
+    with the given seed, in the same way as generatePuzzles.
+
+    Yields both the solved puzzle, as well as an unsolved puzzle (both as a
+    Sudoku Board object) for each puzzle.
+    '''
+    if difficulty not in DIFFICULTIES:
+        raise Exception(f"Sudoku Generator - iterPuzzles: unknown difficulty ({difficulty}).")
+
+    seedRandom = seed if isinstance(seed, random.Random) else random.Random(seed)
+    numStarted = 0
+
+    #Without workers, each puzzle is only generated once it is asked for.
+    if workers <= 1:
+        while count == None or numStarted < count:
+            numStarted += 1
+            yield _generatePuzzleTask(numKnownValues, difficulty, seedRandom.getrandbits(64), options)
+        return
+
+    if maxInFlight == None:
+        maxInFlight = workers * 2
+    maxInFlight = max(maxInFlight, 1)
+
+    pool = ProcessPoolExecutor(max_workers = workers)
+    #The puzzles that have been started, in the order they were started.
+    pending = deque()
+    try:
+        while True:
+            #Start puzzles until we have as many in progress as we allow.
+            while len(pending) < maxInFlight and (count == None or numStarted < count):
+                pending.append(pool.submit(_generatePuzzleTask, numKnownValues, difficulty, seedRandom.getrandbits(64), options))
+                numStarted += 1
+
+            if len(pending) == 0:
+                return
+
+            #Give back either the oldest puzzle, or any puzzle that is done.
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, notDone = wait(pending, return_when = FIRST_COMPLETED)
+                future = next(iter(done))
+                pending.remove(future)
+
+            yield future.result()
+    finally:
+        #If we stopped early (the caller stopped asking for puzzles, or a
+        #puzzle raised an exception) do not wait for the puzzles that have not
+        #started yet.
+        pool.shutdown(wait = True, cancel_futures = True)
+
+def generatePuzzles(count, numKnownValues, difficulty = "hard", workers = None, seed = None, ordered = True, **options):
+    '''
+    Given:
+    The number of puzzles to generate.
+    A number of known values in each puzzle.
+    The difficulty of the puzzles (one of the keys of DIFFICULTIES).
+    The number of worker processes to use (defaults to the number of CPUs).
+    A seed (or a random.Random object) for the random numbers (optional).
+    If the puzzles should be given back in the order they were started
+    (defaults to True).
+    Any other parameters of getHardPuzzle or getEasyPuzzle (optional).
+
+    Generates count puzzles by calling getHardPuzzle or getEasyPuzzle, spread
+    over a pool of worker processes (see iterPuzzles).  If workers is 1 or
+    less, the puzzles are generated one at a time in this process instead.
+
+    Each puzzle gets its own seed, taken from a random number generator seeded
+    with the given seed.  So the same seed always generates the same puzzles in
+    the same order, no matter how many workers are used (as long as no puzzle
+    runs out of time), and the i-th puzzle can be written to the i-th place of
+    a file (such as a CorpusWriter in SudokuCorpus).  If ordered is False, the
+    puzzles are given back as soon as they are finished instead, which keeps
+    every worker busy, but only the set of puzzles is the same for a seed.
+
+    Yields both the solved puzzle, as well as an unsolved puzzle (both as a
+    Sudoku Board object) for each puzzle.
+    '''
+    if workers == None:
+        workers = os.cpu_count() or 1
+
+    return iterPuzzles(numKnownValues, count, difficulty, workers, ordered = ordered, seed = seed, **options)
+
+async def getHardPuzzleAsync(numKnownValues, executor = None, **options):
+    '''
+    Given:
+    A number of known values in the puzzle.
+    A concurrent.futures executor to generate the puzzle in (defaults to the
+    default executor of the event loop).
+    Any other parameters of getHardPuzzle (optional).
+
+    Generates a puzzle with getHardPuzzle without blocking the event loop.  If
+    the task awaiting this is cancelled (for example because the client went
+    away), the search is told to stop and the cancellation is passed on.
+
+    The search can only be stopped early when it runs in a thread of this
+    process (a ThreadPoolExecutor, which is what the default executor is).
+    With a ProcessPoolExecutor, cancelling only stops waiting for the puzzle,
+    and the worker keeps going until maxDuration.
+
+    Returns both the solved puzzle, as well as an unsolved puzzle (both as
+    a Sudoku Board object).
+    '''
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ProcessPoolExecutor):
+        return await loop.run_in_executor(executor, functools.partial(getHardPuzzle, numKnownValues, **options))
+
+    cancelEvent = threading.Event()
+    try:
+        return await loop.run_in_executor(executor, functools.partial(getHardPuzzle, numKnownValues, cancelEvent = cancelEvent, **options))
+    except asyncio.CancelledError:
+        cancelEvent.set()
+        raise
+
+async def getEasyPuzzleAsync(numKnownValues, executor = None, **options):
+    '''
+    Given:
+    A number of known values in the puzzle.
+    A concurrent.futures executor to generate the puzzle in (defaults to the
+    default executor of the event loop).
+    Any other parameters of getEasyPuzzle (optional).
+
+    Generates a puzzle with getEasyPuzzle without blocking the event loop.
+    Easy puzzles do not search, so there is nothing to stop early, but the
+    awaiting task can still be cancelled.
+
+    Returns both the solved puzzle, as well as an unsolved puzzle (both as
+    a Sudoku Board object).
+    '''
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(getEasyPuzzle, numKnownValues, **options))
+
+def transformPuzzle(puzzle, seed = None):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    A seed or a random.Random object for the random numbers (optional, see
+    _getRandom).
+
+    Makes a new puzzle by applying a random mix of the changes that can never
+    break the rules of a Sudoku puzzle:
+        Relabelling the digits 1 - 9.
+        Shuffling the rows within each band (each set of 3 rows of boxes).
+        Shuffling the columns within each stack (each set of 3 columns of
+        boxes).
+        Shuffling the bands, and shuffling the stacks.
+        Transposing the puzzle (swapping its rows and columns).
+    Values that are not between 1 and 9 (blank values) are moved but not
+    relabelled, so an unsolved puzzle keeps the same number of solutions.
+    Puzzles of other sizes are changed the same way, with their own digits,
+    bands and stacks.
+
+    Returns the new puzzle (a SudokuBoard object).  The given puzzle is not
+    changed.
+    '''
+    #Make sure we are working on a valid sudoku object.
+    validatePuzzleObject(puzzle)
+    rng = _getRandom(seed)
+
+    size = puzzle.size
+
+    #The new label of each value.  Anything that is not 1 - size keeps its
+    #value.
+    digits = list(range(1, size + 1))
+    rng.shuffle(digits)
+    labels = list(range(256))
+    labels[1:size + 1] = digits
+
+    #Row i of the new puzzle is row rowOrder[i] of the old puzzle, and the
+    #same for the columns.
+    rowOrder = _getRandomLineOrder(rng, puzzle.boxSize)
+    columnOrder = _getRandomLineOrder(rng, puzzle.boxSize)
+
+    values = puzzle.getValues()
+    if rng.random() < 0.5:
+        #Transposed, the square (i, j) of the new puzzle comes from the square
+        #(j, i) of the shuffled old puzzle.
+        newValues = [labels[values[rowOrder[j] * size + columnOrder[i]]] for i in range(size) for j in range(size)]
+    else:
+        newValues = [labels[values[rowOrder[i] * size + columnOrder[j]]] for i in range(size) for j in range(size)]
+
+    return SudokuBoard(values=newValues)
+
+def _getRandomLineOrder(rng, boxSize = 3):
+    '''
+    Given:
+    A random number generator.
+    The number of rows in each band (defaults to 3).
+
+    Returns a random order of the 9 rows (or columns) of a puzzle that keeps
+    every row inside of a band of 3 rows together.  The bands are shuffled,
+    and then the rows inside of each band are shuffled.
+    '''
+    bands = list(range(boxSize))
+    rng.shuffle(bands)
+
+    order = []
+    for band in bands:
+        lines = list(range(band * boxSize, band * boxSize + boxSize))
+        rng.shuffle(lines)
+        order += lines
+
+    return order
+
+def _getSolvedPatternPuzzle(blankValue, rng = random, boxSize = 3):
+    '''
+    Given:
+    The value of the unsolved squares in the puzzle.
+    The random number generator to use (defaults to the random module).
+    The number of rows (and columns) of squares in each box (defaults to 3).
+
+    Generates a valid completed Sudoku puzzle using a simple pattern, which is
+    then randomly transformed (see transformPuzzle).
 
     Returns a completed Sudoku puzzle (a SudokuBoard object).
     '''
     #First get a blank sudoku board.
-    puzzle = SudokuBoard(defaultValue=blankValue)
-
-    #Next randomly generate the first row of the puzzle.
-    for i in range(9):
-        ranNum = random.randint(1, 9)
-        #Make sure that we do not include duplicates in the row.
-        while ranNum in puzzle.rows[0]:
-            ranNum = random.randint(1, 9)
+    puzzle = SudokuBoard(defaultValue=blankValue, boxSize=boxSize)
+    size = puzzle.size
 
-        puzzle.setValue((0, i), ranNum)
+    #The first row of the puzzle is simply 1 - 9.  The digits are relabelled
+    #at random by transformPuzzle, so there is no need to shuffle them here.
+    for i in range(size):
+        puzzle.setValue((0, i), i + 1)
 
     #For all following rows of the puzzle shift the index of values of the
-    #previous row by 3, unless the row number is divisible by 3, in which case
-    #we only shift the index by 1 per value.
-    for i in range(1, 9):
-        shift = 3
-        if i % 3 == 0:
+    #previous row by 3 (the boxSize), unless the row number is divisible by 3,
+    #in which case we only shift the index by 1 per value.
+    for i in range(1, size):
+        shift = boxSize
+        if i % boxSize == 0:
             shift = 1
 
-        for j in range(9):
+        for j in range(size):
             index = j + shift
-            if index >= 9:
-                index -= 9
+            if index >= size:
+                index -= size
 
             puzzle.setValue((i, j), puzzle.rows[i - 1][index])
 
     #At this point we have an easy puzzle generated using a simple pattern.
-    #Now we want to do a small bit of shuffling so that the pattern is a little
-    #bit harder to see (especially when solving the puzzle).  To do this we
-    #will shift the position of the first 3 rows of the puzzle with one of the
-    #following: the second 3 rows or the final 3 rows.  This should help to
-    #make the pattern a bit harder to see when solving the puzzle.
+    #Shuffle its digits, rows, columns, bands and stacks so that the pattern
+    #is a lot harder to see when solving the puzzle.
+    return transformPuzzle(puzzle, rng)
     
-    print(getPuzzleAsString(puzzle))
-
-    #Get a random box position (1 or 2)
-    newPosition = random.randint(1, 2)
-
-    #Get a copy of the puzzle, so that we can swap row values.
-    copy = puzzle.getCopy()
-
-    #Switch the values of the first 3 rows with either the second or third
-    #three rows, based on what the value of newPosition is.
-    for i in range(3):
-        otherRow = (newPosition * 3) + i
-        puzzle.setRowValues(i, copy.rows[otherRow])
-        puzzle.setRowValues(otherRow, copy.rows[i])
-
-    #Return the solved puzzle.
-    return puzzle
-    
-def _getAnyUnsolvedPuzzle(solvedPuzzle, numKnownValues, blankValue):
+def _getAnyUnsolvedPuzzle(solvedPuzzle, numKnownValues, blankValue, symmetry = None, rng = random):
     '''
     Given:
     A solved puzzle (a SudokuBoard object).
     A number of known values in the puzzle.
     The value of the unsolved squares in the puzzle (optional).
+    The symmetry the known values should keep (optional, see getHardPuzzle).
+    The random number generator to use (defaults to the random module).
 
     Removes values from the solved sudoku at random until there are only
-    numKnownValues values remaining in the puzzle.
+    numKnownValues values remaining in the puzzle.  With a symmetry, whole
+    symmetry groups are removed for as long as they fit, and then any values
+    still left over are removed one at a time.
 
     Returns a copy of the puzzle with values removed.
     '''
@@ -574,20 +2058,35 @@ def _getAnyUnsolvedPuzzle(solvedPuzzle, numKnownValues, blankValue):
     puzzle = solvedPuzzle.getCopy()
 
     #Get the number of blank values already in the puzzle.
-    numBlanks = 0
-    for key in puzzle.map:
-        if puzzle.map[key] == blankValue:
-            numBlanks += 1
+    numBlanks = puzzle.getValues().count(blankValue)
+    numCells = puzzle.numCells
+
+    #With a symmetry, remove the values of random whole groups that have not
+    #been removed yet, as long as they do not take us past the number of
+    #blank values we want.
+    if symmetry != None:
+        groups = _getRemovalGroups(symmetry, puzzle.geometry)
+        rng.shuffle(groups)
+        for group in groups:
+            if numBlanks + len(group) > (numCells - numKnownValues):
+                continue
+
+            if any(puzzle.getValue(key) == blankValue for key in group):
+                continue
+
+            for key in group:
+                puzzle.setValue(key, blankValue)
+            numBlanks += len(group)
 
     #Set values in the puzzle to the given blank value until the number of
     #blank values in the puzzle is equal to the number we were given.
-    while numBlanks != (81 - numKnownValues):
+    while numBlanks < (numCells - numKnownValues):
         #Get a random square in the grid.
-        ranRow = random.randint(0, 8)
-        ranCol = random.randint(0, 8)
+        ranRow = rng.randint(0, puzzle.size - 1)
+        ranCol = rng.randint(0, puzzle.size - 1)
 
         #Check that the value has not already been set to the blank value.
-        if puzzle.map[(ranRow, ranCol)] == blankValue:
+        if puzzle.getValue((ranRow, ranCol)) == blankValue:
             continue
 
         #Set the value of the square to the blank value, and increase the
@@ -608,16 +2107,14 @@ def getPuzzleAsString(puzzle):
     #Make sure we are working on a valid sudoku object.
     validatePuzzleObject(puzzle)
 
-    string = ""
-    #Apparently I cant put "\n" directly into an fString, so a simple
-    #variable to let me do what I want to do.
-    lineBreak = "\n"
-    for i in range(9):
-        string += f"{lineBreak + lineBreak if i % 3 == 0 else lineBreak}"
-        for j in range(9):
-            string += f"{puzzle.rows[i][j]:>{5 if j % 3 == 0 else 3}}"
+    #Every row is laid out the same way, so build the format of a row once
+    #(with extra space before each box), then join the formatted rows together
+    #rather than adding to a string one value at a time.
+    boxSize = puzzle.boxSize
+    rowFormat = "".join("{:>5}" if j % boxSize == 0 else "{:>3}" for j in range(puzzle.size))
+    lines = [("\n\n" if i % boxSize == 0 else "\n") + rowFormat.format(*row) for i, row in enumerate(puzzle.rows)]
 
-    return string + "\n"
+    return "".join(lines) + "\n"
  
 def getValuesInBox(puzzle, row, column):
     '''
@@ -633,15 +2130,11 @@ def getValuesInBox(puzzle, row, column):
     #Make sure we are working on a valid sudoku object.
     validatePuzzleObject(puzzle)
 
-    #Get the key of the box, based on the given row and column.
-    key = puzzle.gridToBoxMap[(row, column)]
-
-    #Using the key, get the value of position in the grid.
-    values = []
-    for position in puzzle.boxToGridMap[key]:
-        values.append(puzzle.map[position])
-
-    return values        
+    #Get the box unit of the square, and then the values of each square in
+    #that unit.
+    geometry = puzzle.geometry
+    values = puzzle.getValues()
+    return [values[i] for i in geometry.units[geometry.cellUnits[row * geometry.size + column][2]]]
 
 def isValidPuzzle(puzzle, blankValue=0):
     '''
@@ -655,8 +2148,17 @@ def isValidPuzzle(puzzle, blankValue=0):
     #Make sure we are working on a valid sudoku object.
     validatePuzzleObject(puzzle)
 
+    #The board keeps count of how many squares hold the numbers 1 - 9, and how
+    #many duplicates it has.  As long as the blank value is not one of the
+    #numbers 1 - 9, the puzzle is valid if there are no duplicates and every
+    #other square is blank.
+    if type(blankValue) is int and blankValue not in puzzle.geometry.valueBits:
+        #A board can only hold values between 0 and 255.
+        numBlanks = puzzle.getValues().count(blankValue) if 0 <= blankValue <= 255 else 0
+        return puzzle.getNumConflicts() == 0 and puzzle.getNumFilled() + numBlanks == puzzle.numCells
+
     #A list of valid moves.
-    validMoves = list(range(1, 10))
+    validMoves = list(range(1, puzzle.size + 1))
     validMoves.append(blankValue)
 
     #First make sure that all squares have a valid value.  If any of them
@@ -717,49 +2219,9 @@ def isSolved(puzzle):
     #Make sure we are working on a valid sudoku object.
     validatePuzzleObject(puzzle)
 
-    #This is very similar to the function which checks if a puzzle is
-    #solved.  However, a solved puzzle cannot have any blank values.
-
-    #A list of valid moves.
-    validMoves = list(range(1, 10))
-
-    #First make sure that all squares have a valid value.  If any of them
-    #do not, return False.
-    for key in puzzle.map:
-        if puzzle.map[key] not in validMoves:
-            return False
-
-    #Next check for duplicates within each row of the puzzle.
-    for row in puzzle.rows:
-        #For each value in the row check how many times the value occures 
-        #the row.  If it occures in the row more than once, then the puzze
-        #is invalid.
-        for value in row:
-            if row.count(value) > 1:
-                return False
-
-    #Next check for duplicates within each column of the puzzle.
-    for column in puzzle.columns:
-        #Same process as what we did for the rows.
-        for value in column:
-            if column.count(value) > 1:
-                return False
-
-    #Finally check for duplicates within each 3x3 box of the puzzle.
-    for key in puzzle.boxToGridMap:
-        values = []
-        #For each grid position (x,y) in the 3x3 box, check if the list
-        #of values already has a given value in it.  If it does, then the
-        #value is a duplicate and we return False.
-        for mapKey in puzzle.boxToGridMap[key]:
-            value = puzzle.map[mapKey]
-            if value in values:
-                return False
-            else:
-                values.append(value)
-
-    #If none of the above, the puzzle is valid, return True.
-    return True
+    #The board keeps count of how many squares hold the numbers 1 - 9, and how
+    #many duplicates it has, so it already knows if it is solved.
+    return puzzle.isComplete()
 
 def isValidMove(puzzle, row, column, value):
     '''
@@ -777,6 +2239,12 @@ def isValidMove(puzzle, row, column, value):
     #Make sure we are working on a valid sudoku object.
     validatePuzzleObject(puzzle)
 
+    #Values between 1 and 9 are tracked by the masks of the board, so we only
+    #need to check if the bit of the value is used by the row, column or box.
+    valueBits = puzzle.geometry.valueBits
+    if value in valueBits:
+        return not puzzle.getUsedMask(row, column) & valueBits[value]
+
     #First check if the value already exists within the 3x3 box that the
     #move was made in.
     if value in getValuesInBox(puzzle, row, column):
@@ -808,12 +2276,6 @@ def getValidMovesAt(puzzle, row, column):
     #Make sure we are working on a valid sudoku object.
     validatePuzzleObject(puzzle)
 
-    #Using a list of possible values (1-9) check each value to see if it
-    #is valid.  If it is, add it to the return list of values.
-    values = []
-    possibleValues = list(range(1, 10))
-    for value in possibleValues:
-        if isValidMove(puzzle, row, column, value):
-            values.append(value)
-
-    return values
+    #The values that are valid are the ones that are not used by the row,
+    #column, or 3x3 box of the square.
+    return list(getMaskValues(puzzle.getCandidateMask(row, column)))
@@ -0,0 +1,233 @@
+#Sudoku Geometry
+#The shape of a Sudoku grid never changes, so instead of every board (or every
+#function) working out which squares share a row, column or box, the tables in
+#this file are built once and then shared by everything that needs them.
+#Every table is immutable (tuples or read only dictionaries) so that sharing
+#them is safe.
+
+#A grid is made of boxSize x boxSize boxes, each holding boxSize x boxSize
+#squares.  The usual 9x9 grid has a boxSize of 3, but a boxSize of 2 gives a
+#4x4 grid, 4 gives a 16x16 grid and 5 gives a 25x25 grid.  The size of a grid
+#(the number of rows, columns, boxes and values) is boxSize * boxSize.
+#The tables of a grid are held by a Geometry object, and getGeometry() builds
+#the Geometry of each boxSize the first time it is asked for.  The tables of
+#the 9x9 grid are also available as the constants at the bottom of this file.
+
+#Squares are described in 2 ways:
+#   A key (x, y) which is the (row, column) position of the square.
+#   An index (0 - 80 in a 9x9 grid) which is the position of the square in row
+#   order (index = row * size + column).
+
+#Units are the groups of squares that must each hold the numbers 1 - size (27
+#groups of 9 squares in a 9x9 grid).  The first size units are the rows, the
+#next size units are the columns and the last size units are the boxes
+#(numbered in row order).  In a 9x9 grid units 0 - 8 are the rows, units 9 -
+#17 are the columns and units 18 - 26 are the 3x3 boxes.
+
+#The peers of a square are the other squares that share a row, column or box
+#with it (20 in a 9x9 grid).
+
+#The symmetry groups are the squares that a rotation or mirroring of the grid
+#moves onto each other.  Removing whole groups of values from a puzzle keeps
+#its layout symmetric.
+
+from types import MappingProxyType
+
+#The smallest and largest boxSize a grid can have.  None of the solvers can
+#fill in a 36x36 grid in a reasonable time, so grids stop at 25x25.
+MIN_BOX_SIZE = 2
+MAX_BOX_SIZE = 5
+
+#Symmetries that a puzzle's layout of known values can have.  Each symmetry is
+#a list of ways of moving a square (row, column) to another square, where last
+#is the number of the last row (and column) of the grid.  A layout has the
+#symmetry if moving every square in these ways never moves a known value onto
+#a blank square (or the reverse).
+#   "rotational" - turning the grid half way around (180 degrees).
+#   "rotational90" - turning the grid a quarter of the way around (90 degrees).
+#   "mirror" - flipping the grid left to right.
+#   "diagonal" - flipping the grid over its main diagonal.
+#   "quad" - flipping the grid both left to right and top to bottom.
+SYMMETRIES = {
+    "rotational": (lambda row, column, last: (last - row, last - column),),
+    "rotational90": (lambda row, column, last: (column, last - row),),
+    "mirror": (lambda row, column, last: (row, last - column),),
+    "diagonal": (lambda row, column, last: (column, row),),
+    "quad": (lambda row, column, last: (row, last - column), lambda row, column, last: (last - row, column)),
+}
+
+def _getSymmetryGroups(moves, cellKeys, cellIndex, size):
+    '''
+    Given:
+    A list of functions that move a square (row, column) to another square.
+    The keys of the squares of a grid (in row order).
+    A dictionary of key (x,y) to the index of the square.
+    The size of the grid.
+
+    Splits the squares into groups, where each group is every square that a
+    square can be moved to by using the moves any number of times.
+
+    Returns a tuple of groups, where each group is a sorted tuple of square
+    indexes.
+    '''
+    groups = []
+    seen = set()
+    for i in range(len(cellKeys)):
+        if i in seen:
+            continue
+
+        group = {i}
+        toVisit = [i]
+        while len(toVisit) > 0:
+            row, column = cellKeys[toVisit.pop()]
+            for move in moves:
+                other = cellIndex[move(row, column, size - 1)]
+                if other not in group:
+                    group.add(other)
+                    toVisit.append(other)
+
+        seen |= group
+        groups.append(tuple(sorted(group)))
+
+    return tuple(groups)
+
+
+class Geometry:
+    '''The shared tables of a grid with a given boxSize.  Use getGeometry to
+    get one, rather than making a new one, so that every board of the same
+    size shares the same tables.'''
+
+    __slots__ = ("boxSize", "size", "numCells", "numUnits", "cellKeys", "cellIndex", "cellBox",
+                 "rowUnits", "columnUnits", "boxUnits", "units", "cellUnits", "peers",
+                 "gridToBox", "boxToGrid", "symmetryGroups", "valueBits", "allValuesMask")
+
+    def __init__(self, boxSize):
+        '''
+        Given:
+        The number of rows (and columns) of squares in each box.
+
+        Builds every table of the grid.
+        '''
+        size = boxSize * boxSize
+        self.boxSize = boxSize
+        self.size = size
+        self.numCells = size * size
+        self.numUnits = size * 3
+
+        #The key (x,y) of each square, in row order.
+        self.cellKeys = tuple((i // size, i % size) for i in range(self.numCells))
+
+        #A dictionary of key (x,y) to the index of the square.
+        self.cellIndex = MappingProxyType({key: i for i, key in enumerate(self.cellKeys)})
+
+        #The box number (in row order) of each square (by index).
+        self.cellBox = tuple((key[0] // boxSize) * boxSize + key[1] // boxSize for key in self.cellKeys)
+
+        #The indexes of the squares in each unit.
+        self.rowUnits = tuple(tuple(row * size + column for column in range(size)) for row in range(size))
+        self.columnUnits = tuple(tuple(row * size + column for row in range(size)) for column in range(size))
+        self.boxUnits = tuple(tuple(i for i in range(self.numCells) if self.cellBox[i] == box) for box in range(size))
+        self.units = self.rowUnits + self.columnUnits + self.boxUnits
+
+        #The row, column and box unit of each square (by index).
+        self.cellUnits = tuple((i // size, size + i % size, size * 2 + self.cellBox[i]) for i in range(self.numCells))
+
+        #The indexes of the peers of each square (by index), in row order.
+        self.peers = tuple(tuple(sorted(set(self.units[self.cellUnits[i][0]] + self.units[self.cellUnits[i][1]] +
+                                            self.units[self.cellUnits[i][2]]) - {i}))
+                           for i in range(self.numCells))
+
+        #A dictionary of key (x,y) to box position (x2,y2).
+        self.gridToBox = MappingProxyType({key: (key[0] // boxSize, key[1] // boxSize) for key in self.cellKeys})
+
+        #A dictionary of box positions (x,y) to the keys (x2,y2) of the squares
+        #inside of the box.
+        self.boxToGrid = MappingProxyType({(box // boxSize, box % boxSize): tuple(self.cellKeys[i] for i in self.boxUnits[box])
+                                           for box in range(size)})
+
+        #The groups of squares (by index) that must be removed together to keep
+        #each symmetry.  Every group has 1, 2 or 4 squares in it.
+        self.symmetryGroups = MappingProxyType({name: _getSymmetryGroups(moves, self.cellKeys, self.cellIndex, size)
+                                                for name, moves in SYMMETRIES.items()})
+
+        #Each value between 1 and size is given its own bit in a mask, value 1
+        #is bit 0, value 2 is bit 1 and so on (see SudokuGenerator_5).
+        self.valueBits = MappingProxyType({value: 1 << (value - 1) for value in range(1, size + 1)})
+
+        #A mask with the bit of every value set.
+        self.allValuesMask = (1 << size) - 1
+
+    def __repr__(self):
+        return f"Geometry({self.boxSize})"
+
+
+#The Geometry of each boxSize that has been asked for so far.
+_GEOMETRIES = {}
+
+def getGeometry(boxSize = 3):
+    '''
+    Given:
+    The number of rows (and columns) of squares in each box (defaults to 3,
+    for a 9x9 grid).
+
+    Returns the Geometry of the grid.  It is only built the first time it is
+    asked for, so every caller gets the same object.
+    '''
+    geometry = _GEOMETRIES.get(boxSize)
+    if geometry == None:
+        if type(boxSize) is not int or boxSize < MIN_BOX_SIZE or boxSize > MAX_BOX_SIZE:
+            raise Exception(f"Sudoku Geometry - getGeometry: boxSize must be between {MIN_BOX_SIZE} and {MAX_BOX_SIZE} ({boxSize}).")
+
+        geometry = Geometry(boxSize)
+        _GEOMETRIES[boxSize] = geometry
+
+    return geometry
+
+def getGeometryOfNumCells(numCells):
+    '''
+    Given:
+    The number of squares in a grid (such as 81).
+
+    Returns the Geometry of the grid with that many squares, or None if no grid
+    has that many squares.
+    '''
+    for boxSize in range(MIN_BOX_SIZE, MAX_BOX_SIZE + 1):
+        if boxSize ** 4 == numCells:
+            return getGeometry(boxSize)
+
+    return None
+
+#The tables of the usual 9x9 grid.
+_GEOMETRY = getGeometry(3)
+
+#The key (x,y) of each of the 81 squares, in row order.
+CELL_KEYS = _GEOMETRY.cellKeys
+
+#A dictionary of key (x,y) to the index of the square (0 - 80).
+CELL_INDEX = _GEOMETRY.cellIndex
+
+#The 3x3 box number (0 - 8, in row order) of each square (by index).
+CELL_BOX = _GEOMETRY.cellBox
+
+#The indexes of the squares in each of the 27 units.
+ROW_UNITS = _GEOMETRY.rowUnits
+COLUMN_UNITS = _GEOMETRY.columnUnits
+BOX_UNITS = _GEOMETRY.boxUnits
+UNITS = _GEOMETRY.units
+
+#The row, column and box unit of each square (by index).
+CELL_UNITS = _GEOMETRY.cellUnits
+
+#The indexes of the 20 peers of each square (by index), in row order.
+PEERS = _GEOMETRY.peers
+
+#A dictionary of key (x,y) to 3x3 box position (x2,y2).
+GRID_TO_BOX = _GEOMETRY.gridToBox
+
+#A dictionary of 3x3 box positions (x,y) to the keys (x2,y2) of the squares
+#inside of the box.
+BOX_TO_GRID = _GEOMETRY.boxToGrid
+
+#The groups of squares (by index) that must be removed together to keep each
+#symmetry.  Every group has 1, 2 or 4 squares in it.
+SYMMETRY_GROUPS = _GEOMETRY.symmetryGroups
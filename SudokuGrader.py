@@ -0,0 +1,652 @@
+#Sudoku Grader
+#The number of known values is a poor guide to how hard a puzzle is.  Some 22
+#value puzzles can be solved by only ever looking for the one square a value
+#fits in, while some 30 value puzzles need techniques that most people never
+#learn.  This file grades a puzzle the way a person would solve it: it tries a
+#list of solving techniques, from easiest to hardest, always using the easiest
+#one that makes progress, and reports the hardest technique that was needed.
+#
+#The techniques (see TECHNIQUES) are:
+#   Singles - a square with only 1 value left (naked), or a value with only 1
+#   square left in a row, column or box (hidden).
+#   Locked candidates - a value whose squares in a unit are all in the same
+#   other unit, so the value can be removed from the rest of that other unit.
+#   Pairs and triples - 2 or 3 squares of a unit that share 2 or 3 values
+#   between them (naked), or 2 or 3 values that share 2 or 3 squares (hidden).
+#   Fish (X-Wing, Swordfish and Jellyfish) - a value in 2, 3 or 4 rows that
+#   only fits in the same 2, 3 or 4 columns (or the other way around).
+#   Chains - XY-Wing, simple coloring and XY-Chains, which follow a chain of
+#   "if this square is not a, then that square is b" links.
+#
+#A puzzle that cannot be finished with these techniques needs guessing (or a
+#technique this file does not know), and is graded as BRUTE_FORCE.
+#
+#The candidates (the values each square can still be) are kept up to date as
+#values are placed and removed, along with how many squares of each unit each
+#value still fits in.  Singles are found from a queue of the squares and units
+#that just changed, so most of a puzzle is solved without looking at every
+#square again.  The harder techniques look at the whole grid, but they are only
+#used when there are no singles left.
+#
+#   grade = gradePuzzle(puzzle)
+#   grade.hardestTechnique, grade.rating, grade.score
+#
+#A GradeCache can be given to gradePuzzle (or gradePuzzles) so that grading
+#the same puzzle again is a dictionary lookup.  The grade includes every step
+#that was taken (the trace), so the steps are cached as well.
+
+from itertools import combinations
+
+from SudokuGenerator_5 import LRUCache, validatePuzzleObject
+
+#The techniques the grader uses, from easiest to hardest, with the rating of
+#each.  The ratings are close to those of Sudoku Explainer, so a puzzle only
+#needing hidden singles rates 1.5 and one needing an X-Wing rates 3.2.
+TECHNIQUES = (
+    ("hiddenSingle", 1.5),
+    ("nakedSingle", 2.3),
+    ("lockedCandidates", 2.8),
+    ("nakedPair", 3.0),
+    ("xWing", 3.2),
+    ("hiddenPair", 3.4),
+    ("nakedTriple", 3.6),
+    ("swordfish", 3.8),
+    ("hiddenTriple", 4.0),
+    ("xyWing", 4.2),
+    ("simpleColoring", 4.5),
+    ("jellyfish", 5.2),
+    ("xyChain", 6.0),
+)
+
+#A dictionary of the name of each technique to its rating.
+TECHNIQUE_RATINGS = dict(TECHNIQUES)
+
+#The hardest technique of a puzzle that the techniques above cannot finish.
+BRUTE_FORCE = "bruteForce"
+BRUTE_FORCE_RATING = 10.0
+
+#The most squares an XY-Chain can have.
+MAX_CHAIN_LENGTH = 12
+
+
+class GradeResult:
+    '''The grade of a puzzle.  A grade is shared with the cache it came from,
+    so it should not be changed.
+
+    hardestTechnique - the name of the hardest technique that was needed
+    (BRUTE_FORCE if the techniques could not finish the puzzle, or None if
+    the puzzle had no blank squares).
+    rating - the rating of the hardest technique (see TECHNIQUES).
+    score - the sum of the ratings of every step, plus BRUTE_FORCE_RATING if
+    the puzzle could not be finished.  Two puzzles with the same hardest
+    technique are told apart by how often they need it (and everything
+    easier).
+    isSolved - True if the techniques finished the puzzle.
+    techniqueCounts - a dictionary of the name of each technique used to the
+    number of steps it was used for.
+    steps - a tuple of every step, in order.  Each step is a tuple of (the
+    name of the technique, a tuple of the ((x, y), value) placed, a tuple of
+    the ((x, y), value) removed from the candidates of a square).'''
+
+    __slots__ = ("hardestTechnique", "rating", "score", "isSolved", "techniqueCounts", "steps")
+
+    def __init__(self, hardestTechnique, rating, score, isSolved, techniqueCounts, steps):
+        self.hardestTechnique = hardestTechnique
+        self.rating = rating
+        self.score = score
+        self.isSolved = isSolved
+        self.techniqueCounts = techniqueCounts
+        self.steps = steps
+
+    def __repr__(self):
+        return f"GradeResult({self.hardestTechnique!r}, rating={self.rating}, score={self.score}, isSolved={self.isSolved})"
+
+
+def _getGradeKey(puzzle, blankValue):
+    '''Returns the key a GradeCache stores the grade of a puzzle under.'''
+    return (puzzle.getValues(), blankValue)
+
+class GradeCache(LRUCache):
+    '''An LRUCache of the grades of puzzles (including their steps).
+    Puzzles are looked up by their values and blank value.'''
+
+    def __init__(self, maxSize = 4096):
+        '''
+        Given:
+        The maximum number of puzzles to remember (defaults to 4096).
+
+        Creates an empty cache.'''
+        super().__init__(maxSize, _getGradeKey)
+
+
+#The peers of every square as sets, for each boxSize (built the first time a
+#puzzle of that size is graded).
+_PEER_SETS = {}
+
+def _getPeerSets(geometry):
+    '''Returns a tuple of the set of peers of each square (by index).'''
+    peerSets = _PEER_SETS.get(geometry.boxSize)
+    if peerSets == None:
+        peerSets = tuple(frozenset(peers) for peers in geometry.peers)
+        _PEER_SETS[geometry.boxSize] = peerSets
+    return peerSets
+
+def _getNumBits(mask):
+    '''Returns the number of bits set in a mask.'''
+    return bin(mask).count("1")
+
+def _getBits(mask):
+    '''Returns a list of the digits (bit numbers) set in a mask.'''
+    digits = []
+    while mask:
+        low = mask & -mask
+        digits.append(low.bit_length() - 1)
+        mask ^= low
+    return digits
+
+
+class _CandidateState:
+    '''The candidates of every square of a puzzle that is being graded.
+
+    Digits are numbered from 0, so the digit d is the value d + 1, and is bit d
+    of a mask (the same as VALUE_BITS in SudokuGenerator_5).'''
+
+    __slots__ = ("geometry", "size", "values", "masks", "places", "placed", "numUnsolved",
+                 "nakedQueue", "hiddenQueue", "isBroken", "placements", "eliminations")
+
+    def __init__(self, puzzle, blankValue):
+        '''
+        Given:
+        A puzzle (a SudokuBoard object).
+        The value of the unsolved squares in the puzzle.
+
+        Starts every square with every candidate, then places the known values
+        of the puzzle.
+        '''
+        geometry = puzzle.geometry
+        size = geometry.size
+        self.geometry = geometry
+        self.size = size
+        #The value of each square (0 if it is not solved yet).
+        self.values = bytearray(geometry.numCells)
+        #The candidates of each square (0 once it is solved).
+        self.masks = [geometry.allValuesMask] * geometry.numCells
+        #The number of unsolved squares of each unit that each digit still
+        #fits in, at index (unit * size + digit).
+        self.places = [size] * (geometry.numUnits * size)
+        #The mask of the digits placed in each unit.
+        self.placed = [0] * geometry.numUnits
+        self.numUnsolved = geometry.numCells
+        #Squares that have just been left with a single candidate, and
+        #(unit * size + digit) indexes that have just been left with a single
+        #square.  Both can hold entries that are no longer true.
+        self.nakedQueue = []
+        self.hiddenQueue = []
+        #True once a square has no candidates, or a unit has a digit that
+        #fits nowhere, which means the puzzle has no solution.
+        self.isBroken = False
+        #The placements and eliminations of the current step.
+        self.placements = []
+        self.eliminations = []
+
+        for i, value in enumerate(puzzle.getValues()):
+            if value == blankValue:
+                continue
+            if value not in geometry.valueBits:
+                raise Exception(f"Sudoku Grader - gradePuzzle: the puzzle has a value that is not blank ({blankValue}) and not between 1 and {size} ({value}).")
+            self.place(i, value - 1)
+
+        self.placements = []
+
+    def __removePlace(self, unit, digit):
+        '''Counts one less square of the unit that the digit fits in.'''
+        index = unit * self.size + digit
+        count = self.places[index] - 1
+        self.places[index] = count
+        if count == 1:
+            self.hiddenQueue.append(index)
+        elif count == 0 and not self.placed[unit] & (1 << digit):
+            self.isBroken = True
+
+    def __removeCandidate(self, i, digit):
+        '''Removes a digit from the candidates of a square.  Returns False if it
+        was not a candidate.'''
+        bit = 1 << digit
+        mask = self.masks[i]
+        if not mask & bit:
+            return False
+
+        mask ^= bit
+        self.masks[i] = mask
+        if mask == 0:
+            self.isBroken = True
+        elif mask & (mask - 1) == 0:
+            self.nakedQueue.append(i)
+
+        for unit in self.geometry.cellUnits[i]:
+            self.__removePlace(unit, digit)
+        return True
+
+    def eliminate(self, i, digit):
+        '''Removes a digit from the candidates of a square as part of the
+        current step.  Returns True if it was a candidate.'''
+        if self.__removeCandidate(i, digit):
+            self.eliminations.append((i, digit))
+            return True
+        return False
+
+    def place(self, i, digit):
+        '''Places a digit in a square as part of the current step, removing it
+        from the candidates of every peer of the square.'''
+        bit = 1 << digit
+        mask = self.masks[i]
+        if not mask & bit:
+            self.isBroken = True
+            return
+
+        self.values[i] = digit + 1
+        self.masks[i] = 0
+        self.numUnsolved -= 1
+        self.placements.append((i, digit))
+
+        #The square no longer fits any of its other candidates.
+        cellUnits = self.geometry.cellUnits[i]
+        for other in _getBits(mask ^ bit):
+            for unit in cellUnits:
+                self.__removePlace(unit, other)
+        for unit in cellUnits:
+            self.placed[unit] |= bit
+
+        for peer in self.geometry.peers[i]:
+            if self.masks[peer] & bit:
+                self.__removeCandidate(peer, digit)
+
+    def getSquares(self, unit, digit):
+        '''Returns a list of the unsolved squares of a unit that the digit
+        fits in.'''
+        bit = 1 << digit
+        masks = self.masks
+        return [i for i in self.geometry.units[unit] if masks[i] & bit]
+
+    def isOpen(self, unit, digit):
+        '''Returns True if the digit is not placed in the unit yet.'''
+        return not self.placed[unit] & (1 << digit)
+
+
+def _findHiddenSingle(state):
+    '''Places a digit that only fits in 1 square of a unit.'''
+    size = state.size
+    while len(state.hiddenQueue) > 0:
+        index = state.hiddenQueue.pop()
+        unit, digit = divmod(index, size)
+        if state.places[index] != 1 or not state.isOpen(unit, digit):
+            continue
+
+        state.place(state.getSquares(unit, digit)[0], digit)
+        return True
+    return False
+
+def _findNakedSingle(state):
+    '''Places the only candidate of a square.'''
+    while len(state.nakedQueue) > 0:
+        i = state.nakedQueue.pop()
+        mask = state.masks[i]
+        if state.values[i] != 0 or mask == 0 or mask & (mask - 1) != 0:
+            continue
+
+        state.place(i, mask.bit_length() - 1)
+        return True
+    return False
+
+def _findLockedCandidates(state):
+    '''If every square of a unit that a digit fits in is also in another unit
+    (a box and a row or column), the digit can be removed from the rest of
+    that other unit.'''
+    geometry = state.geometry
+    size = state.size
+    for unit in range(geometry.numUnits):
+        for digit in range(size):
+            count = state.places[unit * size + digit]
+            if count < 2 or count > geometry.boxSize or not state.isOpen(unit, digit):
+                continue
+
+            squares = state.getSquares(unit, digit)
+            shared = set(geometry.cellUnits[squares[0]])
+            for i in squares[1:]:
+                shared.intersection_update(geometry.cellUnits[i])
+            shared.discard(unit)
+
+            for other in shared:
+                changed = False
+                for i in state.getSquares(other, digit):
+                    if i not in squares:
+                        changed |= state.eliminate(i, digit)
+                if changed:
+                    return True
+    return False
+
+def _findNakedSubset(state, size):
+    '''If size squares of a unit only have size candidates between them, those
+    candidates can be removed from the rest of the unit.'''
+    masks = state.masks
+    for unit in state.geometry.units:
+        squares = [i for i in unit if masks[i] != 0 and _getNumBits(masks[i]) <= size]
+        if len(squares) < size:
+            continue
+
+        for subset in combinations(squares, size):
+            union = 0
+            for i in subset:
+                union |= masks[i]
+            if _getNumBits(union) != size:
+                continue
+
+            changed = False
+            for i in unit:
+                if masks[i] & union and i not in subset:
+                    for digit in _getBits(masks[i] & union):
+                        changed |= state.eliminate(i, digit)
+            if changed:
+                return True
+    return False
+
+def _findHiddenSubset(state, size):
+    '''If size digits of a unit only fit in size squares between them, every
+    other candidate can be removed from those squares.'''
+    geometry = state.geometry
+    masks = state.masks
+    for unit in range(geometry.numUnits):
+        #The position (within the unit) of each square each digit fits in.
+        positions = {}
+        for digit in range(state.size):
+            count = state.places[unit * state.size + digit]
+            if 2 <= count <= size and state.isOpen(unit, digit):
+                bit = 1 << digit
+                positions[digit] = sum(1 << j for j, i in enumerate(geometry.units[unit]) if masks[i] & bit)
+        if len(positions) < size:
+            continue
+
+        for digits in combinations(positions, size):
+            union = 0
+            for digit in digits:
+                union |= positions[digit]
+            if _getNumBits(union) != size:
+                continue
+
+            keep = sum(1 << digit for digit in digits)
+            changed = False
+            for j in _getBits(union):
+                i = geometry.units[unit][j]
+                for digit in _getBits(masks[i] & ~keep):
+                    changed |= state.eliminate(i, digit)
+            if changed:
+                return True
+    return False
+
+def _findFish(state, size):
+    '''If a digit only fits in the same size columns of size rows, it can be
+    removed from the rest of those columns (and the same with rows and
+    columns swapped).  A size of 2 is an X-Wing, 3 a Swordfish and 4 a
+    Jellyfish.'''
+    geometry = state.geometry
+    gridSize = state.size
+    masks = state.masks
+    #The first gridSize units are the rows, the next gridSize the columns.
+    for baseStart, coverStart in ((0, gridSize), (gridSize, 0)):
+        for digit in range(gridSize):
+            bit = 1 << digit
+            lines = {}
+            for line in range(gridSize):
+                count = state.places[(baseStart + line) * gridSize + digit]
+                if 2 <= count <= size and state.isOpen(baseStart + line, digit):
+                    lines[line] = sum(1 << j for j, i in enumerate(geometry.units[baseStart + line]) if masks[i] & bit)
+            if len(lines) < size:
+                continue
+
+            for baseLines in combinations(lines, size):
+                union = 0
+                for line in baseLines:
+                    union |= lines[line]
+                if _getNumBits(union) != size:
+                    continue
+
+                changed = False
+                for cover in _getBits(union):
+                    #The square of the cover line in base line j is square j
+                    #of the cover line.
+                    for j, i in enumerate(geometry.units[coverStart + cover]):
+                        if j not in baseLines and masks[i] & bit:
+                            changed |= state.eliminate(i, digit)
+                if changed:
+                    return True
+    return False
+
+def _findXYWing(state):
+    '''A square with candidates ab (the pivot) that sees a square with ac and
+    a square with bc (the pincers): whichever value the pivot is, one of the
+    pincers is c, so c can be removed from every square that sees both
+    pincers.'''
+    masks = state.masks
+    peerSets = _getPeerSets(state.geometry)
+    for pivot in range(state.geometry.numCells):
+        pivotMask = masks[pivot]
+        if pivotMask == 0 or _getNumBits(pivotMask) != 2:
+            continue
+
+        pincers = [i for i in state.geometry.peers[pivot]
+                   if _getNumBits(masks[i]) == 2 and masks[i] != pivotMask and _getNumBits(masks[i] & pivotMask) == 1]
+        for first, second in combinations(pincers, 2):
+            if masks[first] & pivotMask == masks[second] & pivotMask:
+                continue
+            other = masks[first] & ~pivotMask
+            if other != masks[second] & ~pivotMask:
+                continue
+
+            digit = other.bit_length() - 1
+            changed = False
+            for i in peerSets[first] & peerSets[second]:
+                if masks[i] & other:
+                    changed |= state.eliminate(i, digit)
+            if changed:
+                return True
+    return False
+
+def _findSimpleColoring(state):
+    '''Links the squares of a digit that are the only 2 squares of a unit it
+    fits in (conjugate pairs), and colors each chain of links with 2 colors.
+    Exactly one color is the digit, so:
+        If 2 squares of the same color see each other, that color is not the
+        digit, and the digit is removed from all of its squares.
+        A square that sees a square of each color is not the digit.'''
+    geometry = state.geometry
+    size = state.size
+    masks = state.masks
+    peerSets = _getPeerSets(geometry)
+    for digit in range(size):
+        bit = 1 << digit
+        links = {}
+        for unit in range(geometry.numUnits):
+            if state.places[unit * size + digit] == 2 and state.isOpen(unit, digit):
+                first, second = state.getSquares(unit, digit)
+                links.setdefault(first, []).append(second)
+                links.setdefault(second, []).append(first)
+
+        seen = set()
+        for start in links:
+            if start in seen:
+                continue
+
+            #Color the chain of links the start square is in.
+            colors = {start: 0}
+            toVisit = [start]
+            while len(toVisit) > 0:
+                i = toVisit.pop()
+                for other in links[i]:
+                    if other not in colors:
+                        colors[other] = 1 - colors[i]
+                        toVisit.append(other)
+            seen.update(colors)
+            if len(colors) < 3:
+                continue
+
+            groups = ([i for i in colors if colors[i] == 0], [i for i in colors if colors[i] == 1])
+            for group in groups:
+                if any(j in peerSets[i] for i, j in combinations(group, 2)):
+                    changed = False
+                    for i in group:
+                        changed |= state.eliminate(i, digit)
+                    if changed:
+                        return True
+
+            changed = False
+            for i in range(geometry.numCells):
+                if masks[i] & bit and i not in colors:
+                    if any(j in peerSets[i] for j in groups[0]) and any(j in peerSets[i] for j in groups[1]):
+                        changed |= state.eliminate(i, digit)
+            if changed:
+                return True
+    return False
+
+def _findXYChain(state):
+    '''A chain of squares with 2 candidates each, where each square sees the
+    next and shares a candidate with it.  If the first square is not a, then
+    each square in turn is forced, and if that forces the last square to be a,
+    then either the first or the last square is a.  So a can be removed from
+    every square that sees both ends.'''
+    geometry = state.geometry
+    masks = state.masks
+    peerSets = _getPeerSets(geometry)
+    bivalues = [i for i in range(geometry.numCells) if masks[i] != 0 and _getNumBits(masks[i]) == 2]
+    bivalueSet = set(bivalues)
+    for start in bivalues:
+        for digit in _getBits(masks[start]):
+            bit = 1 << digit
+            #Each entry is a square and the value it is forced to be (its "on"
+            #value) if the start is not digit.  Every (square, value) is only
+            #visited once, so the chains found are the shortest.
+            onValue = masks[start] ^ bit
+            visited = {(start, onValue)}
+            layer = [(start, onValue)]
+            for length in range(2, MAX_CHAIN_LENGTH + 1):
+                nextLayer = []
+                for i, on in layer:
+                    for other in geometry.peers[i]:
+                        if other not in bivalueSet or not masks[other] & on:
+                            continue
+                        otherOn = masks[other] ^ on
+                        if (other, otherOn) in visited:
+                            continue
+                        visited.add((other, otherOn))
+                        nextLayer.append((other, otherOn))
+
+                        #Chains of 3 or fewer squares are found by easier
+                        #techniques (naked pairs and XY-Wings).
+                        if otherOn == bit and other != start and length > 3:
+                            changed = False
+                            for j in peerSets[start] & peerSets[other]:
+                                if masks[j] & bit:
+                                    changed |= state.eliminate(j, digit)
+                            if changed:
+                                return True
+                layer = nextLayer
+                if len(layer) == 0:
+                    break
+    return False
+
+#The function that looks for each technique, in the same order as TECHNIQUES.
+_FINDERS = (
+    ("hiddenSingle", _findHiddenSingle),
+    ("nakedSingle", _findNakedSingle),
+    ("lockedCandidates", _findLockedCandidates),
+    ("nakedPair", lambda state: _findNakedSubset(state, 2)),
+    ("xWing", lambda state: _findFish(state, 2)),
+    ("hiddenPair", lambda state: _findHiddenSubset(state, 2)),
+    ("nakedTriple", lambda state: _findNakedSubset(state, 3)),
+    ("swordfish", lambda state: _findFish(state, 3)),
+    ("hiddenTriple", lambda state: _findHiddenSubset(state, 3)),
+    ("xyWing", _findXYWing),
+    ("simpleColoring", _findSimpleColoring),
+    ("jellyfish", lambda state: _findFish(state, 4)),
+    ("xyChain", _findXYChain),
+)
+
+def gradePuzzle(puzzle, blankValue = 0, cache = None):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object).
+    The value of the unsolved squares in the puzzle (defaults to 0).
+    A GradeCache to look up and store grades in (optional).
+
+    Solves the puzzle with the techniques of TECHNIQUES, always using the
+    easiest technique that makes progress.  The puzzle is not changed.
+
+    Raises an exception if the puzzle has no solution (the techniques find a
+    square with no candidates, or a value that fits nowhere in a unit).  A
+    puzzle with more than 1 solution can never be finished by the techniques,
+    so it is graded as BRUTE_FORCE.
+
+    Returns the grade of the puzzle (a GradeResult object).
+    '''
+    #Make sure we are working on a valid sudoku object.
+    validatePuzzleObject(puzzle)
+
+    if cache != None:
+        key = cache.getKey(puzzle, blankValue)
+        grade = cache.get(key)
+        if grade != None:
+            return grade
+
+    state = _CandidateState(puzzle, blankValue)
+    cellKeys = puzzle.geometry.cellKeys
+    steps = []
+    techniqueCounts = {}
+    hardestTechnique = None
+    rating = 0.0
+    score = 0.0
+    isSolved = True
+
+    while state.numUnsolved > 0:
+        if state.isBroken:
+            raise Exception("Sudoku Grader - gradePuzzle: the puzzle has no solution.")
+
+        for technique, find in _FINDERS:
+            if find(state):
+                break
+        else:
+            isSolved = False
+            break
+
+        steps.append((technique, tuple((cellKeys[i], digit + 1) for i, digit in state.placements),
+                      tuple((cellKeys[i], digit + 1) for i, digit in state.eliminations)))
+        state.placements = []
+        state.eliminations = []
+
+        techniqueCounts[technique] = techniqueCounts.get(technique, 0) + 1
+        score += TECHNIQUE_RATINGS[technique]
+        if TECHNIQUE_RATINGS[technique] > rating:
+            hardestTechnique = technique
+            rating = TECHNIQUE_RATINGS[technique]
+
+    if state.isBroken:
+        raise Exception("Sudoku Grader - gradePuzzle: the puzzle has no solution.")
+
+    if not isSolved:
+        hardestTechnique = BRUTE_FORCE
+        rating = BRUTE_FORCE_RATING
+        score += BRUTE_FORCE_RATING
+
+    grade = GradeResult(hardestTechnique, rating, round(score, 1), isSolved, techniqueCounts, tuple(steps))
+    if cache != None:
+        cache.put(key, grade)
+    return grade
+
+def gradePuzzles(puzzles, blankValue = 0, cache = None):
+    '''
+    Given:
+    An iterable of puzzles (SudokuBoard objects).
+    The value of the unsolved squares in the puzzles (defaults to 0).
+    A GradeCache to look up and store grades in (optional).
+
+    Returns a list of the grade of each puzzle (see gradePuzzle).
+    '''
+    return [gradePuzzle(puzzle, blankValue, cache) for puzzle in puzzles]
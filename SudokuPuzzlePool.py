@@ -0,0 +1,308 @@
+#Sudoku Puzzle Pool
+#Generating a hard puzzle can take anywhere from a few milliseconds up to the
+#full maxDuration of getHardPuzzle.  That is fine for a script, but not for
+#something (like a UI or a server) that needs a puzzle right away.  This file
+#contains the class PuzzlePool, which keeps a supply of puzzles ready ahead of
+#time, so asking for a puzzle is usually just taking one off of a queue.
+#
+#A pool keeps a queue of puzzles for each (numKnownValues, difficulty) that it
+#is asked for.  A background thread keeps every queue filled to a target
+#depth, either by generating puzzles itself or by handing the work to a pool
+#of worker processes.  If a queue is empty when a puzzle is asked for, the
+#puzzle is generated right away in the thread that asked for it.
+#
+#If a puzzle cannot be generated in the background (for example because its
+#maxDuration or maxNodes is too small), the error is remembered (see
+#lastError) and that queue is left alone for a while before trying again.  The
+#other queues keep being filled.
+#
+#   pool = PuzzlePool(depth = 8)
+#   pool.register(25, "hard")
+#   solvedPuzzle, puzzle = pool.getPuzzle(25, "hard")
+#   ...
+#   pool.close()
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import SudokuGenerator_5
+
+#How long (in seconds) a queue is left alone after a puzzle for it could not
+#be generated.  The wait doubles after each failure in a row, up to
+#MAX_ERROR_RETRY_DELAY.
+ERROR_RETRY_DELAY = 0.1
+MAX_ERROR_RETRY_DELAY = 30
+
+#How often (in seconds) the background thread checks for new work while it
+#waits for worker processes, when not every worker is busy.
+POLL_INTERVAL = 0.05
+
+class PuzzlePool:
+    '''A thread safe supply of puzzles that is filled in the background.  Every
+    function of the pool can be called from any thread.'''
+
+    def __init__(self, depth = 8, workers = 1, seed = None, **options):
+        '''
+        Given:
+        The number of puzzles to keep ready for each (numKnownValues,
+        difficulty) (defaults to 8).
+        The number of worker processes to generate puzzles with (defaults to 1,
+        which generates them in the background thread of this process).
+        A seed for the random numbers of the puzzles made in the background
+        (optional).  Each puzzle gets its own seed taken from it, the same way
+        as SudokuGenerator_5.generatePuzzles.
+        Any other parameters of getHardPuzzle or getEasyPuzzle (optional).
+
+        Creates the pool and starts its background thread.  Nothing is
+        generated until a (numKnownValues, difficulty) is registered or asked
+        for.
+
+        With 1 worker the background thread shares this process with the
+        callers of getPuzzle, so it slows them down a little while it runs.
+        With more workers the puzzles are made in other processes.
+        '''
+        if depth < 1:
+            raise Exception(f"Sudoku Puzzle Pool - PuzzlePool: depth must be at least 1 ({depth}).")
+
+        self.__depth = depth
+        self.__options = options
+        #A queue of ready (solvedPuzzle, puzzle) pairs for each key.
+        self.__queues = {}
+        #The number of puzzles that were taken from a queue, and the number
+        #that had to be generated because the queue was empty.
+        self.__hits = 0
+        self.__misses = 0
+        #The last exception raised while generating in the background, the
+        #number of exceptions raised, and for each key that failed, the number
+        #of failures in a row and the time (time.monotonic) it can be tried
+        #again.
+        self.__lastError = None
+        self.__numErrors = 0
+        self.__failures = {}
+        self.__retryTimes = {}
+        self.__isClosed = False
+        #Used both to guard the queues, and to wake up the background thread
+        #when a queue needs filling.
+        self.__condition = threading.Condition()
+
+        self.__seedRandom = random.Random(seed)
+        self.__executor = None
+        self.__workers = workers
+        if workers > 1:
+            self.__executor = ProcessPoolExecutor(max_workers = workers)
+
+        self.__thread = threading.Thread(target = self.__fill, name = "PuzzlePool", daemon = True)
+        self.__thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    @property
+    def depth(self):
+        return self.__depth
+
+    @property
+    def lastError(self):
+        return self.__lastError
+
+    def register(self, numKnownValues, difficulty = "hard"):
+        '''
+        Given:
+        A number of known values in the puzzles.
+        The difficulty of the puzzles (one of the keys of
+        SudokuGenerator_5.DIFFICULTIES).
+
+        Starts keeping a queue of puzzles with the given number of known values
+        and difficulty filled.  Registering the same key twice does nothing.
+        '''
+        if difficulty not in SudokuGenerator_5.DIFFICULTIES:
+            raise Exception(f"Sudoku Puzzle Pool - register: unknown difficulty ({difficulty}).")
+
+        with self.__condition:
+            if self.__isClosed:
+                raise Exception("Sudoku Puzzle Pool - register: the pool is closed.")
+
+            if (numKnownValues, difficulty) not in self.__queues:
+                self.__queues[(numKnownValues, difficulty)] = deque()
+                self.__condition.notify_all()
+
+    def getPuzzle(self, numKnownValues, difficulty = "hard"):
+        '''
+        Given:
+        A number of known values in the puzzle.
+        The difficulty of the puzzle (one of the keys of
+        SudokuGenerator_5.DIFFICULTIES).
+
+        Takes a ready puzzle from the queue of the key, and wakes up the
+        background thread to replace it.  If the queue is empty, the puzzle is
+        generated in the calling thread instead (and the key is registered so
+        it will be ready next time).
+
+        Returns both the solved puzzle, as well as an unsolved puzzle (both as
+        a Sudoku Board object).
+        '''
+        if difficulty not in SudokuGenerator_5.DIFFICULTIES:
+            raise Exception(f"Sudoku Puzzle Pool - getPuzzle: unknown difficulty ({difficulty}).")
+
+        with self.__condition:
+            key = (numKnownValues, difficulty)
+            if key not in self.__queues and not self.__isClosed:
+                self.__queues[key] = deque()
+
+            #Wake up the background thread, as the queue is about to be (or
+            #already is) short of puzzles.
+            self.__condition.notify_all()
+
+            queue = self.__queues.get(key, ())
+            if len(queue) > 0:
+                self.__hits += 1
+                return queue.popleft()
+
+            self.__misses += 1
+
+        #The queue was empty, so generate the puzzle now, outside of the lock
+        #so the background thread can keep working.
+        return SudokuGenerator_5.DIFFICULTIES[difficulty](numKnownValues, **self.__options)
+
+    def getStats(self):
+        '''
+        Returns a dictionary of the number of ready puzzles of each key
+        (queues), the number of puzzles that were taken from a queue (hits),
+        the number that had to be generated on the spot (misses) and the number
+        of puzzles that could not be generated in the background (errors).
+        '''
+        with self.__condition:
+            return {"queues": {key: len(queue) for key, queue in self.__queues.items()},
+                    "hits": self.__hits, "misses": self.__misses, "errors": self.__numErrors}
+
+    def close(self):
+        '''
+        Stops the background thread (after the puzzle it is working on is
+        finished) and shuts down the worker processes.  Puzzles already in the
+        queues can still be taken, but empty queues are no longer filled.
+        '''
+        with self.__condition:
+            self.__isClosed = True
+            self.__condition.notify_all()
+
+        if self.__thread is not threading.current_thread():
+            self.__thread.join()
+
+        if self.__executor != None:
+            self.__executor.shutdown(wait = True, cancel_futures = True)
+
+    def __getTasks(self, inFlight, numInFlight):
+        '''
+        Given:
+        A dictionary of the number of puzzles being generated for each key.
+        The number of puzzles being generated in total.
+
+        Chooses the keys to start generating puzzles for, one at a time, each
+        time choosing the key whose queue (counting the puzzles being generated
+        for it) is the shortest, until every worker is busy or every queue will
+        be full.  Keys that are waiting to be tried again after an error are
+        skipped.  The chosen keys are counted in inFlight.  Must be called while
+        holding the lock.
+
+        Returns a list of the chosen keys (a key can be chosen more than once).
+        '''
+        now = time.monotonic()
+        keys = [key for key in self.__queues if self.__retryTimes.get(key, 0) <= now]
+
+        tasks = []
+        while numInFlight + len(tasks) < max(self.__workers, 1) and len(keys) > 0:
+            key = min(keys, key = lambda key: len(self.__queues[key]) + inFlight.get(key, 0))
+            if len(self.__queues[key]) + inFlight.get(key, 0) >= self.__depth:
+                break
+
+            inFlight[key] = inFlight.get(key, 0) + 1
+            tasks.append(key)
+
+        return tasks
+
+    def __getRetryDelay(self):
+        '''
+        Returns the number of seconds until the next key that failed can be
+        tried again, or None if no key is waiting.  Must be called while
+        holding the lock.
+        '''
+        if len(self.__retryTimes) == 0:
+            return None
+        return max(min(self.__retryTimes.values()) - time.monotonic(), 0)
+
+    def __addResult(self, key, result):
+        '''Adds a generated puzzle to the queue of its key.'''
+        with self.__condition:
+            self.__queues[key].append(result)
+            self.__failures.pop(key, None)
+            self.__retryTimes.pop(key, None)
+
+    def __addError(self, key, error):
+        '''Remembers an exception raised while generating a puzzle for a key,
+        and leaves the key alone for a while before trying it again.'''
+        with self.__condition:
+            self.__lastError = error
+            self.__numErrors += 1
+            failures = self.__failures.get(key, 0) + 1
+            self.__failures[key] = failures
+            self.__retryTimes[key] = time.monotonic() + min(ERROR_RETRY_DELAY * 2 ** (failures - 1), MAX_ERROR_RETRY_DELAY)
+
+    def __fill(self):
+        '''
+        The loop of the background thread.  Waits until a queue is not full,
+        then generates puzzles for the emptiest queues until every queue is
+        full again.
+
+        With worker processes, a puzzle is started for each worker (spread over
+        the keys by how short their queues are), and a new one is started as
+        soon as any of them finishes.  Without, puzzles are made one at a time
+        in this thread.
+        '''
+        #The number of puzzles being generated for each key, and the key of
+        #each future of a worker process.
+        inFlight = {}
+        futures = {}
+        while True:
+            with self.__condition:
+                while not self.__isClosed:
+                    tasks = self.__getTasks(inFlight, len(futures))
+                    if len(tasks) > 0 or len(futures) > 0:
+                        break
+                    self.__condition.wait(self.__getRetryDelay())
+
+                if self.__isClosed:
+                    return
+
+            if self.__executor == None:
+                key = tasks[0]
+                try:
+                    result = SudokuGenerator_5._generatePuzzleTask(key[0], key[1], self.__seedRandom.getrandbits(64), self.__options)
+                except Exception as e:
+                    self.__addError(key, e)
+                else:
+                    self.__addResult(key, result)
+                inFlight[key] -= 1
+                continue
+
+            for key in tasks:
+                future = self.__executor.submit(SudokuGenerator_5._generatePuzzleTask, key[0], key[1],
+                                                self.__seedRandom.getrandbits(64), self.__options)
+                futures[future] = key
+
+            #Wait for any puzzle to finish.  If some workers have nothing to
+            #do, wake up every so often in case a queue needs filling.
+            timeout = None if len(futures) >= self.__workers else POLL_INTERVAL
+            done, notDone = wait(futures, timeout = timeout, return_when = FIRST_COMPLETED)
+            for future in done:
+                key = futures.pop(future)
+                inFlight[key] -= 1
+                try:
+                    self.__addResult(key, future.result())
+                except Exception as e:
+                    self.__addError(key, e)
@@ -0,0 +1,307 @@
+#Sudoku Text
+#Most collections of puzzles (on the internet, or made by other programs) store
+#each puzzle as a single line of 81 characters, the values of the squares in
+#row order, with "0" or "." for a blank square:
+#
+#   800000000003600000070090200050007000000045700000100030001000068008500010090000400
+#   8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..
+#
+#This file reads and writes that format, for both SudokuBoard objects (see
+#SudokuGenerator_5) and the list of lists puzzles of SudokuGenerator and
+#Sudoku_Generator_5_0.  Every character is turned into a value (or back) with
+#a single bytes.translate call rather than a loop over the squares, so millions
+#of lines can be read or written per minute.
+#
+#Other sizes of puzzle (see SudokuGeometry) use the same format, with the
+#letters A - Z after 9 for the values 10 - 35 (so a 16x16 puzzle is written
+#with 1 - 9 and A - G).  The size of a puzzle is worked out from the length of
+#its line.  Lower case letters are read the same as upper case letters.
+#
+#There are 6 functions you can use:
+#
+#fromString() turns a line into a SudokuBoard.
+#
+#fromStringAsLists() turns a line into a list of lists (a list of rows).
+#
+#toString() turns a SudokuBoard or a list of lists into a line.
+#
+#readPuzzles() yields the SudokuBoard (or list of lists) of every line of a
+#file, without reading the whole file at once.
+#
+#writePuzzles() writes a line for every puzzle of an iterable to a file.
+#
+#getValues() turns a line into the values of the squares (in row order, as
+#bytes), which is what the other functions are built on.
+
+import io
+
+from SudokuGenerator_5 import SudokuBoard
+from SudokuGeometry import getGeometryOfNumCells
+
+#The character of each value, where the value is the position in the string.
+#Position 0 is never used for a value (it is the default blank character).
+VALUE_CHARACTERS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+#The characters that can mean a blank square.
+BLANK_CHARACTERS = "0."
+
+#How many lines writePuzzles joins together before writing them to the file.
+WRITE_CHUNK_SIZE = 4096
+
+#The translation tables of each (size, blankValue) (see _getReadTables) and of
+#each (size, blankValue, blankCharacter) (see _getWriteTable).
+_READ_TABLES = {}
+_WRITE_TABLES = {}
+
+def _getReadTables(size, blankValue):
+    '''
+    Given:
+    The size of the puzzle (9 for a 9x9 puzzle).
+    The value of a blank square.
+
+    Returns a tuple of (a bytes.translate table turning characters into
+    values, the bytes of every character that is allowed in a line).
+    '''
+    tables = _READ_TABLES.get((size, blankValue))
+    if tables == None:
+        table = bytearray(range(256))
+        allowed = bytearray()
+        for character in BLANK_CHARACTERS:
+            table[ord(character)] = blankValue
+            allowed.append(ord(character))
+        for value in range(1, size + 1):
+            for character in {VALUE_CHARACTERS[value], VALUE_CHARACTERS[value].lower()}:
+                table[ord(character)] = value
+                allowed.append(ord(character))
+
+        tables = (bytes(table), bytes(allowed))
+        _READ_TABLES[(size, blankValue)] = tables
+
+    return tables
+
+def _getWriteTable(size, blankValue, blankCharacter, function):
+    '''
+    Given:
+    The size of the puzzle (9 for a 9x9 puzzle).
+    The value of a blank square.
+    The character to write for a blank square.
+    The name of the function that was called (for error messages).
+
+    Returns a bytes.translate table turning values into characters.  Values
+    that cannot be written become the byte 255.
+    '''
+    table = _WRITE_TABLES.get((size, blankValue, blankCharacter))
+    if table == None:
+        #A blank value of 1 - size would write that value as a blank square.
+        if 1 <= blankValue <= size:
+            raise Exception(f"Sudoku Text - {function}: blankValue must not be between 1 and {size} ({blankValue}).")
+
+        table = bytearray([255]) * 256
+        for value in range(1, size + 1):
+            table[value] = ord(VALUE_CHARACTERS[value])
+        table[blankValue] = ord(blankCharacter)
+
+        table = bytes(table)
+        _WRITE_TABLES[(size, blankValue, blankCharacter)] = table
+
+    return table
+
+def getValues(line, blankValue = 0):
+    '''
+    Given:
+    A puzzle written as a line (a str or bytes), with "0" or "." for each blank
+    square.  Whitespace at either end of the line is ignored.
+    The value to give blank squares (defaults to 0).
+
+    Returns the values of the squares of the puzzle (in row order, as bytes).
+    '''
+    if type(blankValue) is not int or blankValue < 0 or blankValue > 255:
+        raise Exception(f"Sudoku Text - getValues: blankValue must be between 0 and 255 ({blankValue}).")
+
+    if isinstance(line, str):
+        try:
+            line = line.encode("ascii")
+        except UnicodeEncodeError:
+            raise Exception(f"Sudoku Text - getValues: the line has characters that are not allowed ({line!r}).")
+    line = line.strip()
+
+    geometry = getGeometryOfNumCells(len(line))
+    if geometry == None or geometry.size >= len(VALUE_CHARACTERS):
+        raise Exception(f"Sudoku Text - getValues: a puzzle cannot have {len(line)} squares ({line!r}).")
+
+    table, allowed = _getReadTables(geometry.size, blankValue)
+
+    #Deleting every allowed character leaves nothing, unless the line has a
+    #character that is not allowed.
+    if len(line.translate(None, allowed)) > 0:
+        raise Exception(f"Sudoku Text - getValues: the line has characters that are not allowed ({line!r}).")
+
+    return line.translate(table)
+
+def fromString(line, blankValue = 0):
+    '''
+    Given:
+    A puzzle written as a line (a str or bytes), with "0" or "." for each blank
+    square.
+    The value to give blank squares (defaults to 0).
+
+    Returns the puzzle as a SudokuBoard object.
+    '''
+    return SudokuBoard(values = getValues(line, blankValue))
+
+def fromStringAsLists(line, blankValue = 0):
+    '''
+    Given:
+    A puzzle written as a line (a str or bytes), with "0" or "." for each blank
+    square.
+    The value to give blank squares (defaults to 0).
+
+    Returns the puzzle as a list of lists (a list of rows), the same form as
+    the puzzles of SudokuGenerator.
+    '''
+    values = getValues(line, blankValue)
+    size = getGeometryOfNumCells(len(values)).size
+    return [list(values[row:row + size]) for row in range(0, len(values), size)]
+
+def _getBytes(puzzle, blankValue, blankCharacter, function):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object, or a list of lists).
+    The value of a blank square.
+    The character to write for a blank square.
+    The name of the function that was called (for error messages).
+
+    Returns the puzzle written as a line (as bytes, without a line break).
+    '''
+    if isinstance(puzzle, SudokuBoard):
+        values = puzzle.getValues()
+    else:
+        try:
+            values = bytes([value for row in puzzle for value in row])
+        except (TypeError, ValueError):
+            raise Exception(f"Sudoku Text - {function}: every value of the puzzle must be an integer between 0 and 255.")
+
+    geometry = getGeometryOfNumCells(len(values))
+    if geometry == None or geometry.size >= len(VALUE_CHARACTERS):
+        raise Exception(f"Sudoku Text - {function}: a puzzle cannot have {len(values)} squares.")
+
+    line = values.translate(_getWriteTable(geometry.size, blankValue, blankCharacter, function))
+    if 255 in line:
+        raise Exception(f"Sudoku Text - {function}: the puzzle has a value that is not blank ({blankValue}) and not between 1 and {geometry.size}.")
+
+    return line
+
+def toString(puzzle, blankValue = 0, blankCharacter = "0"):
+    '''
+    Given:
+    A puzzle (a SudokuBoard object, or a list of lists such as the puzzles of
+    SudokuGenerator).
+    The value of a blank square in the puzzle (defaults to 0).  It cannot be
+    one of the values 1 - size.
+    The character to write for a blank square (defaults to "0", "." is the
+    other common choice).
+
+    Returns the puzzle written as a single line (without a line break).
+    '''
+    if len(blankCharacter) != 1 or blankCharacter not in BLANK_CHARACTERS:
+        raise Exception(f"Sudoku Text - toString: blankCharacter must be one of {BLANK_CHARACTERS!r} ({blankCharacter!r}).")
+    if type(blankValue) is not int or blankValue < 0 or blankValue > 255:
+        raise Exception(f"Sudoku Text - toString: blankValue must be between 0 and 255 ({blankValue}).")
+
+    return _getBytes(puzzle, blankValue, blankCharacter, "toString").decode("ascii")
+
+def readPuzzles(file, blankValue = 0, asLists = False):
+    '''
+    Given:
+    A path to a file, or a file object opened for reading (in text or binary
+    mode).
+    The value to give blank squares (defaults to 0).
+    If the puzzles should be lists of lists rather than SudokuBoard objects
+    (defaults to False).
+
+    Reads the file one line at a time.  Empty lines, and lines starting with
+    "#", are skipped.  Only the first field of each line is read, so files
+    with more on each line (such as "puzzle,solution" or "puzzle rating") can
+    also be read.  If the first line that is read is not a puzzle and has no
+    digits 1 - 9, it is taken to be a header (such as the "quizzes,solutions"
+    of a CSV file) and skipped.  Any other line that is not a puzzle raises an
+    exception.
+
+    Yields each puzzle as a SudokuBoard object (or a list of lists).
+    '''
+    if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+        with open(file, "rb") as openFile:
+            yield from readPuzzles(openFile, blankValue, asLists)
+        return
+
+    convert = fromStringAsLists if asLists else fromString
+    isFirstLine = True
+    for lineNumber, line in enumerate(file, 1):
+        if isinstance(line, str):
+            line = line.encode("ascii", "replace")
+
+        fields = line.split(None, 1)
+        if len(fields) == 0 or fields[0].startswith(b"#"):
+            continue
+
+        field = fields[0].split(b",", 1)[0]
+        try:
+            puzzle = convert(field, blankValue)
+        except Exception as e:
+            #A header has no values in it, where a damaged puzzle would.
+            if isFirstLine and field.translate(None, b"123456789") == field:
+                isFirstLine = False
+                continue
+            raise Exception(f"Sudoku Text - readPuzzles: line {lineNumber}: {e}")
+
+        isFirstLine = False
+        yield puzzle
+
+def writePuzzles(file, puzzles, blankValue = 0, blankCharacter = "0"):
+    '''
+    Given:
+    A path to a file (any existing file is replaced), or a file object opened
+    for writing (in text or binary mode).
+    An iterable of puzzles (SudokuBoard objects, or lists of lists).
+    The value of a blank square in the puzzles (defaults to 0).  It cannot be
+    one of the values 1 - size.
+    The character to write for a blank square (defaults to "0").
+
+    Writes each puzzle as a line of the file.  Lines are joined together and
+    written WRITE_CHUNK_SIZE at a time, so the puzzles can come from a
+    generator (such as generatePuzzles in SudokuGenerator_5) without keeping
+    them all in memory.
+
+    Returns the number of puzzles written.
+    '''
+    if len(blankCharacter) != 1 or blankCharacter not in BLANK_CHARACTERS:
+        raise Exception(f"Sudoku Text - writePuzzles: blankCharacter must be one of {BLANK_CHARACTERS!r} ({blankCharacter!r}).")
+    if type(blankValue) is not int or blankValue < 0 or blankValue > 255:
+        raise Exception(f"Sudoku Text - writePuzzles: blankValue must be between 0 and 255 ({blankValue}).")
+
+    if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+        with open(file, "wb") as openFile:
+            return writePuzzles(openFile, puzzles, blankValue, blankCharacter)
+
+    #A file opened in text mode needs str, otherwise bytes.
+    isText = isinstance(file, io.TextIOBase)
+
+    count = 0
+    lines = []
+    for puzzle in puzzles:
+        lines.append(_getBytes(puzzle, blankValue, blankCharacter, "writePuzzles"))
+        count += 1
+        if len(lines) == WRITE_CHUNK_SIZE:
+            _writeLines(file, lines, isText)
+            lines = []
+
+    if len(lines) > 0:
+        _writeLines(file, lines, isText)
+
+    return count
+
+def _writeLines(file, lines, isText):
+    '''Writes a list of lines (as bytes) to a file, each followed by a line
+    break.'''
+    chunk = b"\n".join(lines) + b"\n"
+    file.write(chunk.decode("ascii") if isText else chunk)
@@ -3,28 +3,42 @@
 
 import random
 
+from SudokuGeometry import getGeometry
 
 
 class SudokuPuzzle:
     '''This class is designed to be used instead of a simple list of lists to
     represent the sudoku puzzle.  This class allows easy access of rows,
     columns and grid locations (x,y).  In addition, it allows access to all
-    values within any of the 3x3 boxes that make up the 9x9 grid.'''
+    values within any of the 3x3 boxes that make up the 9x9 grid.  Other
+    sizes of grid (such as 16x16, made of 4x4 boxes) can be made by giving a
+    boxSize.'''
 
-    def __init__(self, defaultValue = 0, rows = None, columns = None, map = None, boxLookup = None, reverseLookup = None):
+    def __init__(self, defaultValue = 0, rows = None, columns = None, map = None, boxLookup = None, reverseLookup = None, boxSize = 3):
         '''Given:
         A default value for each sqaure (defaults to 0).
         -OR-
         Several objects used to create a deep clone of this object.
+        The number of rows (and columns) of squares in each box (defaults to
+        3, for a 9x9 grid).
 
         Creates a Sudoku Puzzle and stores the data in multiple different
         connected ways.'''
-        if rows != None and columns != None and map != None and boxLookup != None and reverseLookup != None:
+        #The tables of the grid (see SudokuGeometry).
+        self.__geometry = getGeometry(boxSize)
+        size = self.__geometry.size
+
+        #The dictionaries to lookup box positions of any grid position, or the
+        #reverse, are the same for every puzzle, so they are shared.
+        #A dictionary of grid position (x,y) to 3x3 box position (x2,y2).
+        self.__boxLookup = self.__geometry.gridToBox if boxLookup == None else boxLookup
+        #A dictionary of 3x3 box positions (x,y) to grid position (x2,y2).
+        self.__reverseBoxLookup = self.__geometry.boxToGrid if reverseLookup == None else reverseLookup
+
+        if rows != None and columns != None and map != None:
             self.__rows = rows
             self.__columns = columns
             self.__map = map
-            self.__boxLookup = boxLookup
-            self.__reverseBoxLookup = reverseLookup
             return
                 
         #Standard list of lists that can be used to make up a sudoku puzzle.
@@ -33,49 +47,23 @@ class SudokuPuzzle:
         self.__map = {}
         #A list of values of each column of the puzzle.
         self.__columns = []
-        #A dictionary of grid position (x,y) to 3x3 box position (x2,y2).
-        self.__boxLookup = {}
-        #A dictionary of 3x3 box positions (x,y) to grid position (x2,y2).
-        self.__reverseBoxLookup = {}
-
-        #Make the list of lists and dictionary of values.
-        for i in range(9):
-            self.__rows.append([])
-            self.__columns.append([])
-            for j in range(9):
-                self.__rows[i].append(defaultValue)                
-                self.__map[(i, j)] = defaultValue
-
-        #Make the list of values of the columns.
-        for i in range(9):
-            for j in range(9):
-                self.__columns[i].append(self.__rows[j][i])
-
-        #Using our existing data structures, make the list of columns, as well
-        #as the dictionaries to lookup box positions of any grid position, or
-        #the reverse.
-        for key in self.__map:
-            if key[0] <= 2:
-                xPosition = 0
-            elif key[0] <= 5:
-                xPosition = 1
-            else:
-                xPosition = 2
-
-            if key[1] <= 2:
-                yPosition = 0
-            elif key[1] <= 5:
-                yPosition = 1
-            else:
-                yPosition = 2
-            position = (xPosition, yPosition)
-            if position not in self.__reverseBoxLookup:
-                self.__reverseBoxLookup[position] = []
-            self.__reverseBoxLookup[(xPosition, yPosition)].append(key)
-
-        for key in self.__reverseBoxLookup:
-            for i in range(len(self.__reverseBoxLookup[key])):
-                self.__boxLookup[self.__reverseBoxLookup[key][i]] = key
+
+        #Make the list of lists and list of columns.
+        for i in range(size):
+            self.__rows.append([defaultValue] * size)
+            self.__columns.append([defaultValue] * size)
+
+        #Make the dictionary of values.
+        for key in self.__geometry.cellKeys:
+            self.__map[key] = defaultValue
+
+    @property
+    def boxSize(self):
+        return self.__geometry.boxSize
+
+    @property
+    def size(self):
+        return self.__geometry.size
 
     @property
     def map(self):
@@ -112,35 +100,17 @@ class SudokuPuzzle:
         changing the original.'''
         cRows = []
         cColumns = []
-        cMap = {}
-        cLookup = {}
-        cReverse = {}
 
         #Copy the rows and columns.
-        for i in range(9):
-            cRows.append([])
-            cColumns.append([])
-            for j in range(9):
-                cRows[i].append(self.__rows[i][j])
-                cColumns[i].append(self.__columns[j][i])
-
-        #Copy the dictionaries.
-        for key in self.__map:
-            cMap[key] = self.__map[key]
-
-        for key in self.__boxLookup:
-            cLookup[key] = self.__boxLookup[key]
-
-        #This dictionary is slightly more complicated as it is a dictionary of
-        #lists.
-        for key in self.__reverseBoxLookup:
-            for value in self.__reverseBoxLookup[key]:
-                if key not in cReverse:
-                    cReverse[key] = []
-
-                cReverse[key].append(value)
-
-        return SudokuPuzzle(0, cRows, cColumns, cMap, cLookup, cReverse)
+        for i in range(self.__geometry.size):
+            cRows.append(self.__rows[i][:])
+            cColumns.append(self.__columns[i][:])
+
+        #Copy the dictionary of values.  The box lookups are shared by every
+        #puzzle and never change, so they do not need to be copied.
+        cMap = dict(self.__map)
+
+        return SudokuPuzzle(0, cRows, cColumns, cMap, self.__boxLookup, self.__reverseBoxLookup, self.__geometry.boxSize)
         
 
     def __str__(self):
@@ -191,7 +161,7 @@ class SudokuGenerator:
         #solved.  However, a solved puzzle cannot have any blank values.
 
         #A list of valid moves.
-        validMoves = list(range(1, 10))
+        validMoves = list(range(1, puzzle.size + 1))
 
         #First make sure that all squares have a valid value.  If any of them
         #do not, return False.
@@ -243,7 +213,7 @@ class SudokuGenerator:
         SudokuGenerator._validatePuzzle(puzzle)
 
         #A list of valid moves.
-        validMoves = list(range(1, 10))
+        validMoves = list(range(1, puzzle.size + 1))
         validMoves.append(blankValue)
 
         #First make sure that all squares have a valid value.  If any of them
@@ -337,16 +307,14 @@ class SudokuGenerator:
         #Make sure we are working on a valid sudoku object.
         SudokuGenerator._validatePuzzle(puzzle)
 
-        string = ""
-        #Apparently I cant put "\n" directly into an fString, so a simple
-        #variable to let me do what I want to do.
-        lineBreak = "\n"
-        for i in range(9):
-            string += f"{lineBreak + lineBreak if i % 3 == 0 else lineBreak}"
-            for j in range(9):
-                string += f"{puzzle.rows[i][j]:>{5 if j % 3 == 0 else 3}}"
+        #Every row is laid out the same way, so build the format of a row
+        #once (with extra space before each box), then join the formatted rows
+        #together rather than adding to a string one value at a time.
+        boxSize = puzzle.boxSize
+        rowFormat = "".join("{:>5}" if j % boxSize == 0 else "{:>3}" for j in range(puzzle.size))
+        lines = [("\n\n" if i % boxSize == 0 else "\n") + rowFormat.format(*puzzle.rows[i]) for i in range(puzzle.size)]
 
-        return string + "\n"
+        return "".join(lines) + "\n"
         
     @staticmethod
     def _getValuesInBox(puzzle, row, column):
@@ -381,12 +349,15 @@ class SudokuGenerator:
 
 
 
-puzzle = SudokuPuzzle()
-copy = puzzle.getCopy()
-copy.setValue((3,3), "X")
+#Only run the demo when this file is run directly, so importing it (such as
+#from SudokuBenchmark) does not print anything.
+if __name__ == "__main__":
+    puzzle = SudokuPuzzle()
+    copy = puzzle.getCopy()
+    copy.setValue((3,3), "X")
 
-print(SudokuGenerator.getPuzzleAsString(puzzle))
-print(SudokuGenerator.getPuzzleAsString(copy))
+    print(SudokuGenerator.getPuzzleAsString(puzzle))
+    print(SudokuGenerator.getPuzzleAsString(copy))
 
 
-print("Breakpoint")
+    print("Breakpoint")